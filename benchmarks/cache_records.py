@@ -0,0 +1,116 @@
+"""
+Микро-бенчмарк записей кэша: pydantic-модели против компактных NamedTuple.
+
+Сравнивает память на запись, скорость создания и скорость загрузки/сохранения
+снимка кэша с большим количеством сообщений для удаления.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python benchmarks/cache_records.py [количество записей]
+"""
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import yaml
+from pydantic import BaseModel, ConfigDict
+
+from python import logger as logger_module
+from python.storage.cache import CacheStorage, RemoveMessage
+
+
+class LegacyRemoveMessage(BaseModel):
+    """Прежнее представление записи: pydantic-модель с datetime."""
+    model_config = ConfigDict(frozen=True)
+
+    chat_id: int
+    message_id: int
+    create_time: datetime
+
+
+def measure(title: str, func) -> float:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"  {title:<28} {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+
+def memory_per_record(factory, count: int) -> float:
+    tracemalloc.start()
+    records = [factory(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size / count
+
+
+async def snapshot_roundtrip(count: int) -> None:
+    now = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Прежний путь: safe_load + pydantic на каждую запись, model_dump + safe_dump
+        legacy_path = Path(tmp) / "legacy.yaml"
+        tz = ZoneInfo("Europe/Moscow")
+        legacy = [
+            LegacyRemoveMessage(chat_id=-100, message_id=i, create_time=datetime.fromtimestamp(now + i, tz))
+            for i in range(count)
+        ]
+
+        def legacy_save():
+            legacy_path.write_text(yaml.safe_dump(
+                {"remove_messages": [m.model_dump() for m in legacy]}, allow_unicode=True, sort_keys=False
+            ))
+
+        def legacy_load():
+            data = yaml.safe_load(legacy_path.read_text())
+            [LegacyRemoveMessage(**m) for m in data["remove_messages"]]
+
+        print("pydantic + datetime:")
+        measure("save snapshot", legacy_save)
+        measure("load snapshot", legacy_load)
+
+        # Новый путь: компактные записи, проверка только на границе с диском
+        storage = CacheStorage(path=Path(tmp) / "cache.yaml")
+        storage._reset_remove_messages(RemoveMessage(now + i, -100, i) for i in range(count))
+
+        print("NamedTuple + stamp:")
+        started = time.perf_counter()
+        await storage.save()
+        print(f"  {'save snapshot':<28} {(time.perf_counter() - started) * 1000:9.1f} ms")
+        started = time.perf_counter()
+        await CacheStorage.from_file(str(storage.path))
+        print(f"  {'load snapshot (+ save)':<28} {(time.perf_counter() - started) * 1000:9.1f} ms")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    logging.basicConfig(level=logging.WARNING)
+    logger_module.logger = logger_module.AppLogger(logging.getLogger("benchmark"))
+
+    now = time.time()
+    tz = ZoneInfo("Europe/Moscow")
+    print(f"{count} records")
+    legacy_size = memory_per_record(
+        lambda i: LegacyRemoveMessage(chat_id=-100, message_id=i, create_time=datetime.fromtimestamp(now + i, tz)),
+        count
+    )
+    compact_size = memory_per_record(lambda i: RemoveMessage(now + i, -100, i), count)
+    print(f"memory per record: pydantic {legacy_size:.0f} B, NamedTuple {compact_size:.0f} B")
+
+    print("create records:")
+    measure("pydantic + datetime", lambda: [
+        LegacyRemoveMessage(chat_id=-100, message_id=i, create_time=datetime.fromtimestamp(now + i, tz))
+        for i in range(count)
+    ])
+    measure("NamedTuple + stamp", lambda: [RemoveMessage(now + i, -100, i) for i in range(count)])
+
+    asyncio.run(snapshot_roundtrip(count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Бенчмарк задержки запросов: текстовые запросы против prepared statements
+и последовательные запросы против pipeline-режима.
+
+Нужен локальный PostgreSQL. Бенчмарк работает во временной таблице
+и ничего не меняет в базе.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python benchmarks/db_queries.py "host=localhost dbname=postgres user=postgres" [повторов]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import psycopg
+
+
+async def timed(title: str, repeats: int, func) -> None:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    print(
+        f"  {title:<40} median {statistics.median(samples) * 1e6:8.0f} us, "
+        f"p95 {samples[int(len(samples) * 0.95)] * 1e6:8.0f} us"
+    )
+
+
+async def main() -> None:
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    conninfo = sys.argv[1]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    async with await psycopg.AsyncConnection.connect(conninfo, prepare_threshold=None) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                CREATE TEMPORARY TABLE bench_requests
+                (
+                    id           SERIAL PRIMARY KEY,
+                    user_id      BIGINT    NOT NULL UNIQUE,
+                    created_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    processed    BOOLEAN   NOT NULL DEFAULT FALSE,
+                    greeting_msg INTEGER,
+                    lang         TEXT
+                )
+            """)
+            await cur.execute(
+                "INSERT INTO bench_requests (user_id, greeting_msg, lang) "
+                "SELECT g, g, 'ru' FROM generate_series(1, 10000) g"
+            )
+            await conn.commit()
+
+        select_query = "SELECT user_id, created_at, greeting_msg, lang FROM bench_requests WHERE user_id = %s"
+        delete_query = "DELETE FROM bench_requests WHERE user_id = %s"
+        insert_query = "INSERT INTO bench_requests (user_id, greeting_msg, lang) VALUES (%s, %s, %s)"
+        counter = iter(range(10 ** 9))
+
+        async def select(prepare: bool) -> None:
+            async with conn.cursor() as cur:
+                await cur.execute(select_query, (next(counter) % 10000 + 1,), prepare=prepare)
+                await cur.fetchone()
+
+        async def replace_request(prepare: bool) -> None:
+            user_id = next(counter) % 10000 + 1
+            async with conn.cursor() as cur:
+                await cur.execute(delete_query, (user_id,), prepare=prepare)
+                await cur.execute(insert_query, (user_id, user_id, "ru"), prepare=prepare)
+                await conn.commit()
+
+        async def replace_request_pipeline() -> None:
+            user_id = next(counter) % 10000 + 1
+            async with conn.pipeline():
+                async with conn.cursor() as cur:
+                    await cur.execute(delete_query, (user_id,), prepare=True)
+                    await cur.execute(insert_query, (user_id, user_id, "ru"), prepare=True)
+                    await conn.commit()
+
+        # prepare=True работает только при включенных prepared statements
+        print(f"{repeats} calls per case")
+        print("single SELECT by key:")
+        await timed("text query", repeats, lambda: select(False))
+        conn.prepare_threshold = 0
+        await timed("prepared statement", repeats, lambda: select(True))
+
+        print("create_or_replace_request (DELETE + INSERT + COMMIT):")
+        conn.prepare_threshold = None
+        await timed("sequential, text queries", repeats, lambda: replace_request(False))
+        conn.prepare_threshold = 0
+        await timed("sequential, prepared", repeats, lambda: replace_request(True))
+        await timed("pipeline, prepared", repeats, replace_request_pipeline)
+
+
+if __name__ == "__main__":
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main())
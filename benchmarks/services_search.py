@@ -0,0 +1,166 @@
+"""
+Бенчмарк поиска услуг (/services <запрос> и inline-режим).
+
+Засевает временную таблицу services (по умолчанию 100 000 услуг), создает на ней
+колонку и индексы из миграции 0004_services_search и замеряет SEARCH_QUERY
+из services_repository на наборе типичных запросов: слово, префикс, несколько
+слов, опечатка, запрос без результатов.
+
+Тексты услуг набираются из словаря с распределением Ципфа, как в живом тексте:
+самые частые слова - служебные (их отбрасывает конфигурация russian), слова
+предметной области стоят в середине рейтинга, дальше длинный хвост редких слов.
+Для каждого запроса печатается, сколько услуг ему соответствует, чтобы было видно,
+при какой селективности получены замеры.
+
+Нужен локальный PostgreSQL с доступным расширением pg_trgm. Временная таблица
+перекрывает настоящую services только в рамках соединения бенчмарка, в базе
+ничего не меняется (кроме CREATE EXTENSION IF NOT EXISTS pg_trgm).
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python benchmarks/services_search.py "host=localhost dbname=postgres user=postgres" [услуг] [повторов]
+"""
+import asyncio
+import itertools
+import random
+import statistics
+import sys
+import time
+
+import psycopg
+
+from python.storage.migrations import MIGRATIONS_DIR
+from python.storage.repository.services_repository import SEARCH_QUERY, search_params
+
+# Служебные слова - вершина распределения
+STOP_WORDS = [
+    "и", "в", "на", "с", "по", "для", "от", "до", "за", "к", "у", "о", "из", "не", "или", "под",
+    "все", "без", "при", "очень", "быстро", "недорого", "качественно", "любой", "ваш",
+]
+# Слова предметной области - середина распределения
+DOMAIN_WORDS = [
+    "ремонт", "ноутбуков", "телефонов", "одежды", "обуви", "велосипедов", "стрижка", "маникюр",
+    "педикюр", "репетитор", "английского", "математики", "физики", "программирования", "печать",
+    "распечатка", "сканирование", "доставка", "еды", "продуктов", "уборка", "комнаты", "стирка",
+    "глажка", "фотосессия", "портрет", "дизайн", "логотипа", "верстка", "сайта", "перевод",
+    "текстов", "консультация", "курсовая", "диплом", "чертежи", "3d", "моделирование", "торты",
+    "выпечка", "кофе", "массаж", "тренировки", "йога", "гитара", "вокал", "настройка", "windows",
+    "linux", "сборка", "компьютера", "установка", "игр", "аренда", "самоката", "зарядки", "python",
+    "android", "iphone", "наушников",
+]
+# Длина хвоста редких слов и показатель распределения Ципфа
+TAIL_WORDS = 20_000
+ZIPF_EXPONENT = 1.07
+# Слова предметной области занимают места в рейтинге начиная с этого
+DOMAIN_FIRST_RANK = 40
+QUERIES = [
+    "ремонт",
+    "ремонт ноутбуков",
+    "репет",
+    "маникур",
+    "перевод текстов английского",
+    "python",
+    "несуществующаяуслуга",
+]
+
+
+def make_vocabulary(rng: random.Random) -> tuple[list[str], list[float]]:
+    """Словарь, упорядоченный по частоте, и накопленные веса Ципфа для random.choices."""
+    syllables = [c + v for c in "бвгдзклмнпрстфхшч" for v in "аеиоуыя"]
+    tail = set()
+    while len(tail) < TAIL_WORDS:
+        tail.add("".join(rng.choices(syllables, k=rng.randint(2, 4))))
+    tail = sorted(tail)
+    rng.shuffle(tail)
+    words = STOP_WORDS + tail[:DOMAIN_FIRST_RANK - len(STOP_WORDS)]
+    # Слова предметной области - через одно с хвостом, чтобы не занимать соседние ранги
+    rest = iter(tail[DOMAIN_FIRST_RANK - len(STOP_WORDS):])
+    for word in DOMAIN_WORDS:
+        words += [word, next(rest)]
+    words += list(rest)
+    weights = [1 / rank ** ZIPF_EXPONENT for rank in range(1, len(words) + 1)]
+    return words, list(itertools.accumulate(weights))
+
+
+def make_rows(count: int, rng: random.Random):
+    words, cum_weights = make_vocabulary(rng)
+    for owner in range(1, count + 1):
+        name = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(2, 4)))
+        description = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(6, 30)))
+        status = "published" if rng.random() < 0.9 else "moderation"
+        yield name, rng.randint(0, 1000), "шт", description, owner, status
+
+
+async def seed(conn: psycopg.AsyncConnection, count: int) -> None:
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            CREATE TEMPORARY TABLE services
+            (
+                id          SERIAL PRIMARY KEY,
+                directory   TEXT           NOT NULL DEFAULT '/',
+                name        TEXT           NOT NULL,
+                cost        NUMERIC(10, 2) NOT NULL,
+                cost_per    TEXT           NOT NULL,
+                description TEXT                    DEFAULT NULL,
+                owner       BIGINT         NOT NULL,
+                image       TEXT                    DEFAULT NULL,
+                status      TEXT                    DEFAULT 'moderation'
+            )
+        """)
+        started = time.perf_counter()
+        async with cur.copy("COPY services (name, cost, cost_per, description, owner, status) FROM STDIN") as copy:
+            for row in make_rows(count, random.Random(42)):
+                await copy.write_row(row)
+        print(f"seeded {count} services in {time.perf_counter() - started:.1f} s")
+
+        started = time.perf_counter()
+        await cur.execute((MIGRATIONS_DIR / "0004_services_search.sql").read_text(encoding="utf-8"), prepare=False)
+        await cur.execute("ANALYZE services")
+        print(f"search column and indexes built in {time.perf_counter() - started:.1f} s")
+    await conn.commit()
+
+
+async def main() -> None:
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    conninfo = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    async with await psycopg.AsyncConnection.connect(conninfo, prepare_threshold=0) as conn:
+        # Временная таблица живет в temp_buffers (по умолчанию 8 МБ), а не в shared_buffers;
+        # без этого замеры упираются в вытеснение страниц, которого у настоящей таблицы нет
+        await conn.execute("SET temp_buffers = '256MB'")
+        await seed(conn, count)
+
+        print(f"{repeats} calls per query, page of 10:")
+        async with conn.cursor() as cur:
+            for text in QUERIES:
+                params = search_params(text, 0, 10)
+                await cur.execute(
+                    f"SELECT count(*) FROM ({SEARCH_QUERY}) found",
+                    {**params, "limit": None, "offset": 0}
+                )
+                (matches,) = await cur.fetchone()
+                samples = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    await cur.execute(SEARCH_QUERY, params, prepare=True)
+                    rows = await cur.fetchall()
+                    samples.append(time.perf_counter() - started)
+                samples.sort()
+                print(
+                    f"  {text!r:<32} {matches:6} matches, {len(rows):3} rows, median {statistics.median(samples) * 1000:7.2f} ms, "
+                    f"p95 {samples[int(len(samples) * 0.95)] * 1000:7.2f} ms"
+                )
+
+            print("plan for", repr(QUERIES[1]) + ":")
+            await cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + SEARCH_QUERY, search_params(QUERIES[1], 0, 10))
+            for (line,) in await cur.fetchall():
+                print("  " + line)
+
+
+if __name__ == "__main__":
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main())
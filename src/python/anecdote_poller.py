@@ -1,5 +1,12 @@
 import asyncio
+import json
 import random
+import time
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import partial
+from urllib.parse import urlsplit
 
 import aiohttp
 import yaml
@@ -7,6 +14,7 @@ from bs4 import BeautifulSoup
 
 # === ЗАМЕНА ИМПОРТОВ ===
 import python.logger as logger_module
+from python import metrics
 from python.storage import config as config_module
 
 from python.storage.repository import anecdotes_repository
@@ -19,8 +27,89 @@ with open(
     prompt = yaml.safe_load(f)
 
 
-async def get_anecdote() -> AnecdoteItem:
-    return await anecdotes_repository.poll_anecdote()
+# Если в БД не нашлось анекдотов, следующая попытка пополнить очередь - через столько секунд
+PREFETCH_RETRY_SECONDS = 5
+
+# Анекдоты, уже забранные из БД (used = TRUE) и готовые к выдаче без запросов к БД
+_ready: deque[AnecdoteItem] = deque()
+# Будит обработчики /kek, ждущие анекдот
+_ready_changed = asyncio.Condition()
+# Будит prefetch_loop: очередь опустилась до нижней отметки или в БД появились анекдоты
+_refill_needed = asyncio.Event()
+
+
+def _check_low_water() -> None:
+    if len(_ready) <= config_module.config.anecdote.prefetch_low_water:
+        _refill_needed.set()
+
+
+async def get_anecdote(timeout: float | None = None) -> AnecdoteItem | None:
+    """
+    Взять готовый анекдот из очереди, при необходимости дождавшись пополнения.
+
+    Args:
+        timeout: Максимальное время ожидания в секундах (по умолчанию anecdote.wait_timeout)
+
+    Returns:
+        Анекдот или None, если за timeout он так и не появился
+    """
+    if timeout is None:
+        timeout = config_module.config.anecdote.wait_timeout
+    async with _ready_changed:
+        if not _ready:
+            _refill_needed.set()
+            try:
+                await asyncio.wait_for(_ready_changed.wait_for(lambda: bool(_ready)), timeout)
+            except TimeoutError:
+                return None
+        anecdote = _ready.popleft()
+    _check_low_water()
+    return anecdote
+
+
+def notify_new_anecdotes() -> None:
+    """Сообщить, что в БД появились новые анекдоты (пополнить очередь, если она неполная)."""
+    if len(_ready) < config_module.config.anecdote.prefetch_size:
+        _refill_needed.set()
+
+
+async def prefetch_loop() -> None:
+    """
+    Фоновая задача: держит в памяти до anecdote.prefetch_size готовых анекдотов.
+
+    Очередь пополняется одним запросом, когда опускается до prefetch_low_water.
+    Пока буфер в БД пуст, попытки повторяются раз в PREFETCH_RETRY_SECONDS
+    (анекдоты может добавить и другой экземпляр бота).
+    """
+    _refill_needed.set()
+    while True:
+        try:
+            await asyncio.wait_for(_refill_needed.wait(), PREFETCH_RETRY_SECONDS)
+        except TimeoutError:
+            if len(_ready) > config_module.config.anecdote.prefetch_low_water:
+                continue
+        _refill_needed.clear()
+
+        need = config_module.config.anecdote.prefetch_size - len(_ready)
+        if need <= 0:
+            continue
+        try:
+            anecdotes = await anecdotes_repository.poll_anecdotes(need)
+        except Exception as e:
+            logger_module.logger.error("Anecdote poller: Failed to prefetch anecdotes", e)
+            continue
+        if anecdotes:
+            async with _ready_changed:
+                _ready.extend(anecdotes)
+                _ready_changed.notify_all()
+            logger_module.logger.debug(f"Anecdote poller: Prefetched {len(anecdotes)} anecdotes")
+
+
+async def release_prefetched() -> None:
+    """Вернуть в буфер БД анекдоты, которые были забраны, но не показаны (при остановке бота)."""
+    ids = [anecdote.id for anecdote in _ready]
+    _ready.clear()
+    await anecdotes_repository.release_anecdotes(ids)
 
 
 def parse_payload(original_text: str) -> dict:
@@ -62,112 +151,555 @@ def parse_payload(original_text: str) -> dict:
     }
 
 
-gemini_url = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent'
+# Пакетный режим: вместо одного анекдота модель получает JSON-массив и отвечает массивом
+BATCH_INSTRUCTION = (
+    "Дальше анекдоты приходят пакетом: JSON-массив объектов с полями id и text. "
+    "Обработай каждый анекдот независимо от остальных по тем же правилам. "
+    "Ответь JSON-массивом, по одному объекту на каждый id: id - тот же, что во входном объекте, "
+    "text - обработанный анекдот или код ошибки."
+)
+BATCH_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "INTEGER"},
+            "text": {"type": "STRING"},
+        },
+        "required": ["id", "text"],
+    },
+}
+
+
+def parse_batch_payload(originals: list[str]) -> dict:
+    """Запрос на переписывание нескольких анекдотов: тот же prompt один раз на пакет, ответ - JSON."""
+    items = [{"id": index, "text": original} for index, original in enumerate(originals)]
+    payload = parse_payload(BATCH_INSTRUCTION + "\n\n" + json.dumps(items, ensure_ascii=False))
+    payload["generationConfig"]["responseMimeType"] = "application/json"
+    payload["generationConfig"]["responseSchema"] = BATCH_RESPONSE_SCHEMA
+    return payload
 
 
-async def process_anecdote(original: str) -> str | None:
-    payload: dict = parse_payload(original)
+gemini_url = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent'
+anecdotes_url = 'https://baneks.ru/'
+
+# Анекдоты на baneks.ru пронумерованы от 0 до ANECDOTE_ID_LIMIT - 1
+ANECDOTE_ID_LIMIT = 2000
+# Оригиналы короче плохо переписываются, длиннее - не помещаются в сообщение
+ORIGINAL_MIN_LENGTH = 200
+ORIGINAL_MAX_LENGTH = 1000
+# Ответ Gemini короче этого - скорее всего ошибка генерации
+RESULT_MIN_LENGTH = 100
+# Сколько страниц baneks.ru можно загрузить за прогон на каждый недостающий анекдот
+MAX_FETCHES_PER_ANECDOTE = 10
+# Сколько стадия rewrite ждет, пока наберется пакет анекдотов
+REWRITE_BATCH_WAIT_SECONDS = 2
+# Общий таймаут одного HTTP-запроса к baneks.ru или Gemini
+HTTP_TIMEOUT_SECONDS = 60
+
+# Общая HTTP-сессия поллера: соединения к baneks.ru и Gemini переиспользуются между запросами
+_session: aiohttp.ClientSession | None = None
+_rate_limiter: "HostRateLimiter | None" = None
+_id_pool: "AnecdoteIdPool | None" = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Общая HTTP-сессия поллера (создается при первом обращении)."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT_SECONDS))
+    return _session
+
+
+async def close_session() -> None:
+    """Закрыть общую HTTP-сессию (при остановке бота)."""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+class HostRateLimiter:
+    """
+    Ограничение частоты запросов к внешним хостам.
+
+    Запросы к одному хосту выпускаются не чаще rate раз в секунду, сколько бы
+    воркеров конвейера их ни делали. Хосты без лимита не ограничиваются.
+
+    Args:
+        rates: Допустимое число запросов в секунду по имени хоста
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        self._intervals = {host: 1 / rate for host, rate in rates.items() if rate > 0}
+        self._next_slot: dict[str, float] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def wait(self, url: str) -> None:
+        """Дождаться, когда к хосту из url можно сделать следующий запрос."""
+        host = urlsplit(url).hostname
+        interval = self._intervals.get(host)
+        if interval is None:
+            return
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        # Ожидающие встают в очередь на блокировке и получают слоты по одному
+        async with lock:
+            delay = self._next_slot.get(host, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_slot[host] = time.monotonic() + interval
+
+
+def _get_rate_limiter() -> HostRateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = HostRateLimiter(config_module.config.anecdote.host_rate_limits)
+    return _rate_limiter
+
+
+class AnecdoteIdPool:
+    """
+    Id анекдотов baneks.ru, которые еще не встречались поллеру.
+
+    Загружается один раз из таблицы anecdotes; выбранный id сразу убирается из пула,
+    поэтому параллельные воркеры не загружают одну страницу дважды. Если анекдот
+    не удалось обработать по временной причине (сеть, Gemini, БД), id возвращается
+    в пул через release(). Выбор случайного id и удаление - O(1).
+
+    Args:
+        known: Уже известные id (сохраненные в БД)
+    """
+
+    def __init__(self, known: Iterable[int]):
+        known = set(known)
+        self._unseen = [anecdote_id for anecdote_id in range(ANECDOTE_ID_LIMIT) if anecdote_id not in known]
+        self._positions = {anecdote_id: position for position, anecdote_id in enumerate(self._unseen)}
+
+    def __len__(self) -> int:
+        return len(self._unseen)
+
+    def __contains__(self, anecdote_id: int) -> bool:
+        return anecdote_id in self._positions
+
+    def take(self) -> int | None:
+        """Выбрать случайный невиденный id и убрать его из пула (None, если пул исчерпан)."""
+        if not self._unseen:
+            return None
+        anecdote_id = self._unseen[random.randrange(len(self._unseen))]
+        self.discard(anecdote_id)
+        return anecdote_id
+
+    def discard(self, anecdote_id: int) -> None:
+        """Пометить id виденным."""
+        position = self._positions.pop(anecdote_id, None)
+        if position is None:
+            return
+        # Последний элемент встает на место удаленного
+        last = self._unseen.pop()
+        if last != anecdote_id:
+            self._unseen[position] = last
+            self._positions[last] = position
+
+    def release(self, anecdote_id: int) -> None:
+        """Вернуть id в пул: анекдот не обработан и его стоит попробовать еще раз."""
+        if 0 <= anecdote_id < ANECDOTE_ID_LIMIT and anecdote_id not in self._positions:
+            self._positions[anecdote_id] = len(self._unseen)
+            self._unseen.append(anecdote_id)
+
+
+async def _get_id_pool() -> AnecdoteIdPool:
+    global _id_pool
+    if _id_pool is None:
+        _id_pool = AnecdoteIdPool(await anecdotes_repository.get_anecdote_ids())
+        logger_module.logger.info(
+            f"Anecdote poller: {len(_id_pool)} of {ANECDOTE_ID_LIMIT} anecdotes are not loaded yet")
+    return _id_pool
+
+
+async def _generate(session: aiohttp.ClientSession, payload: dict) -> str | None:
+    """Запрос generateContent с повторами; возвращает текст первого кандидата или None после 10 попыток."""
     headers: dict = {
         'x-goog-api-key': config_module.config.anecdote.gemini_token,
         'Content-Type': 'application/json'
     }
     for _ in range(10):
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(gemini_url, json=payload, headers=headers) as response:
-                    if response.status == 429:
-                        await asyncio.sleep(5)
-                        continue
+        await _get_rate_limiter().wait(gemini_url)
+        try:
+            async with session.post(gemini_url, json=payload, headers=headers) as response:
+                if response.status == 429:
+                    await asyncio.sleep(5)
+                    continue
+
+                response.raise_for_status()  # Вызовет исключение для статусов 4xx/5xx
+                content = await response.json()
+                logger_module.logger.debug(f"Anecdote poller: Response content: {content}")  # Log the full content
+
+                return content['candidates'][0]['content']['parts'][0]['text']
+
+        except aiohttp.ClientError as e:
+            logger_module.logger.error(f"Anecdote poller: Error process text: {e}")
+            await asyncio.sleep(2)
+        except Exception as e:
+            logger_module.logger.error(f"Anecdote poller: Unknown error process text: {e}")
+            await asyncio.sleep(1)
+    return None
 
-                    response.raise_for_status()  # Вызовет исключение для статусов 4xx/5xx
-                    content = await response.json()
-                    logger_module.logger.debug(f"Anecdote poller: Response content: {content}")  # Log the full content
 
-                    text = content['candidates'][0]['content']['parts'][0]['text']
+async def process_anecdote(session: aiohttp.ClientSession, original: str) -> str | None:
+    """
+    Переписать анекдот через Gemini.
+
+    Returns:
+        Текст ответа или None, если Gemini не ответил за 10 попыток
+    """
+    return await _generate(session, parse_payload(original))
+
+
+async def process_anecdotes(session: aiohttp.ClientSession, originals: list[str]) -> list[str | None]:
+    """
+    Переписать несколько анекдотов одним запросом к Gemini.
+
+    Длинный prompt отправляется один раз на пакет, ответ приходит JSON-массивом
+    по схеме BATCH_RESPONSE_SCHEMA. Проверять тексты (длину) должен вызывающий.
+
+    Returns:
+        Тексты в порядке originals; None для анекдотов, которых нет в ответе,
+        или для всех, если запрос не удался или ответ не разобрался
+    """
+    results: list[str | None] = [None] * len(originals)
+    content = await _generate(session, parse_batch_payload(originals))
+    if content is None:
+        return results
+    try:
+        items = json.loads(content)
+    except ValueError as e:
+        logger_module.logger.error(f"Anecdote poller: Invalid batch response: {e}")
+        return results
+    if not isinstance(items, list):
+        logger_module.logger.error(f"Anecdote poller: Invalid batch response: {content[:200]}")
+        return results
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index, text = item.get("id"), item.get("text")
+        if isinstance(index, int) and 0 <= index < len(originals) and isinstance(text, str):
+            results[index] = text
+    return results
+
+
+async def get_original(session: aiohttp.ClientSession, id_pool: AnecdoteIdPool) -> tuple[int, str] | None:
+    """
+    Загрузить с baneks.ru случайный анекдот из тех, что еще не встречались.
+
+    Returns:
+        (id анекдота, текст) или None, если страницу не удалось загрузить за 10 попыток
+        или невиденных анекдотов не осталось
+    """
+    for _ in range(10):
+        page_id = id_pool.take()
+        if page_id is None:
+            return None
+        url = anecdotes_url + str(page_id)
+        await _get_rate_limiter().wait(url)
+        try:
+            async with session.get(url) as response:
+                response.raise_for_status()
+
+                # конечный URL после редиректа
+                final_url = str(response.url)
+                # ID — это последняя часть пути
+                anecdote_id = int(final_url.rsplit('/', 1)[-1])
+                if anecdote_id != page_id:
+                    if anecdote_id not in id_pool:
+                        # Редирект на уже известный анекдот
+                        continue
+                    id_pool.discard(anecdote_id)
 
-                    if len(text) < 100:
-                        logger_module.logger.info(
-                            f"Anecdote poller: Result text is too small (l={len(text)}). Perhabs proccess error. "
-                            f"Input: {original} Output: {text}")
-                        return None
+                html_content = await response.text()
+                soup = BeautifulSoup(html_content, 'html.parser')
 
-                    return text
+                # Анекдот находится внутри <article><p>
+                anecdote_tag = soup.find('article').find('p')  # type: ignore
 
-            except aiohttp.ClientError as e:
-                logger_module.logger.error(f"Anecdote poller: Error process text: {e}")
-                await asyncio.sleep(2)
-            except Exception as e:
-                logger_module.logger.error(f"Anecdote poller: Unknown error process text: {e}")
-                await asyncio.sleep(1)
+                if anecdote_tag:
+                    anekdot_text = anecdote_tag.get_text(strip=True)  # type: ignore
+                    return anecdote_id, anekdot_text
+
+        except aiohttp.ClientError as e:
+            id_pool.release(page_id)
+            logger_module.logger.error(f"Anecdote poller: Error access page: {e}")
+            await asyncio.sleep(5)
+        except Exception as e:
+            logger_module.logger.error(f"Anecdote poller: Error loading page: {e}")
+            await asyncio.sleep(2)
     return None
 
 
-anecdotes_url = 'https://baneks.ru/'
-
+@dataclass(slots=True)
+class StageStats:
+    """
+    Статистика одной стадии конвейера за прогон.
+
+    Attributes:
+        passed: Сколько элементов стадия обработала и передала дальше
+        failed: Сколько элементов потеряно из-за ошибок (сеть, Gemini, БД)
+        rejected: Сколько элементов отброшено, по причинам
+        busy: Суммарное время обработки элементов всеми воркерами стадии в секундах
+    """
+    passed: int = 0
+    failed: int = 0
+    rejected: dict[str, int] = field(default_factory=dict)
+    busy: float = 0.0
+
+
+class PipelineStats:
+    """
+    Статистика прогона конвейера по стадиям.
+
+    Каждое событие также увеличивает счетчик anecdote_pipeline_items_total{stage, result}.
+
+    Attributes:
+        stages: Статистика по имени стадии
+        elapsed: Длительность прогона в секундах
+    """
+    STAGES = ("fetch", "filter", "rewrite", "insert")
+
+    def __init__(self):
+        self.stages = {stage: StageStats() for stage in self.STAGES}
+        self.elapsed = 0.0
+
+    @property
+    def inserted(self) -> int:
+        return self.stages["insert"].passed
+
+    def passed(self, stage: str, busy: float) -> None:
+        self.stages[stage].passed += 1
+        self.stages[stage].busy += busy
+        metrics.inc("anecdote_pipeline_items_total", labels={"stage": stage, "result": "passed"})
+
+    def failed(self, stage: str, busy: float) -> None:
+        self.stages[stage].failed += 1
+        self.stages[stage].busy += busy
+        metrics.inc("anecdote_pipeline_items_total", labels={"stage": stage, "result": "failed"})
+
+    def rejected(self, stage: str, reason: str, busy: float) -> None:
+        rejected = self.stages[stage].rejected
+        rejected[reason] = rejected.get(reason, 0) + 1
+        self.stages[stage].busy += busy
+        metrics.inc("anecdote_pipeline_items_total", labels={"stage": stage, "result": reason})
+
+    def summary(self) -> str:
+        """Строка для лога: по каждой стадии - результаты, пропускная способность и время работы."""
+        parts = []
+        for stage, stats in self.stages.items():
+            rate = stats.passed / self.elapsed if self.elapsed else 0.0
+            part = f"{stage}: {stats.passed} passed, {stats.failed} failed"
+            if stats.rejected:
+                reasons = ", ".join(f"{reason}={count}" for reason, count in stats.rejected.items())
+                part += f", rejected {reasons}"
+            part += f", {rate:.2f}/s, busy {stats.busy:.1f} s"
+            parts.append(part)
+        return "; ".join(parts)
+
+
+class _Rejected(Exception):
+    """
+    Элемент отброшен стадией конвейера (не ошибка).
+
+    Args:
+        reason: Причина для статистики
+        retry: Анекдот стоит попробовать еще раз в следующих прогонах
+    """
+
+    def __init__(self, reason: str, retry: bool = False):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry = retry
+
+
+async def run_pipeline(need: int) -> PipelineStats:
+    """
+    Загрузить, переписать и сохранить в БД need анекдотов.
+
+    Стадии работают параллельно и связаны ограниченными очередями:
+    fetch (страницы baneks.ru) -> filter (длина оригинала) -> rewrite (Gemini) -> insert (БД).
+    Стадия rewrite переписывает анекдоты пакетами до anecdote.rewrite_batch_size штук
+    за запрос (process_anecdotes); анекдоты, не прошедшие проверку в пакете,
+    переписываются поштучно.
+    Число воркеров стадий задается в конфиге, частота запросов к внешним хостам
+    ограничивается HostRateLimiter. Прогон заканчивается, когда вставлено need
+    анекдотов, загружено need * MAX_FETCHES_PER_ANECDOTE страниц или на сайте
+    не осталось невиденных анекдотов (см. AnecdoteIdPool).
+
+    Args:
+        need: Сколько анекдотов добавить
+
+    Returns:
+        Статистика прогона
+    """
+    anecdote_config = config_module.config.anecdote
+    session = get_session()
+    id_pool = await _get_id_pool()
+    stats = PipelineStats()
+    started = time.monotonic()
+    # Короткие очереди: стадии не убегают вперед, и к моменту выполнения плана в них остается мало лишнего
+    originals: asyncio.Queue[tuple[int, str]] = asyncio.Queue(maxsize=anecdote_config.fetch_concurrency)
+    accepted: asyncio.Queue[tuple[int, str]] = asyncio.Queue(
+        maxsize=anecdote_config.rewrite_concurrency * anecdote_config.rewrite_batch_size)
+    rewritten: asyncio.Queue[tuple[int, str, str]] = asyncio.Queue(maxsize=anecdote_config.insert_concurrency)
+    done = asyncio.Event()
+    fetch_budget = need * MAX_FETCHES_PER_ANECDOTE
+    inserted = 0
+
+    async def fetch_worker() -> None:
+        nonlocal fetch_budget
+        while fetch_budget > 0 and id_pool and not done.is_set():
+            fetch_budget -= 1
+            fetch_started = time.monotonic()
+            original = await get_original(session, id_pool)
+            if original is None:
+                if id_pool:
+                    stats.failed("fetch", time.monotonic() - fetch_started)
+                continue
+            stats.passed("fetch", time.monotonic() - fetch_started)
+            await originals.put(original)
+
+    async def filter_original(item: tuple[int, str]) -> tuple[int, str]:
+        anecdote_id, original = item
+        if len(original) < ORIGINAL_MIN_LENGTH:
+            raise _Rejected("too_short")
+        if len(original) > ORIGINAL_MAX_LENGTH:
+            raise _Rejected("too_long")
+        return item
+
+    async def rewrite(item: tuple[int, str], batched: bool, text: str | None) -> tuple[int, str, str] | None:
+        anecdote_id, original = item
+        if text is None or len(text) < RESULT_MIN_LENGTH:
+            if batched:
+                # Анекдота нет в ответе на пакет или он не прошел проверку - переписываем отдельным запросом
+                metrics.inc("anecdote_rewrite_fallbacks_total")
+            text = await process_anecdote(session, original)
+        if text is None:
+            return None
+        if len(text) < RESULT_MIN_LENGTH:
+            logger_module.logger.info(
+                f"Anecdote poller: Result text is too small (l={len(text)}). Perhabs proccess error. "
+                f"Input: {original} Output: {text}")
+            raise _Rejected("result_too_short", retry=True)
+        logger_module.logger.debug(f"Anecdote poller: {original}\nProcessed: {text}")
+        return anecdote_id, original, text
+
+    async def insert(item: tuple[int, str, str]) -> tuple[int, str, str]:
+        nonlocal inserted
+        await anecdotes_repository.insert_anecdote(*item)
+        notify_new_anecdotes()
+        inserted += 1
+        if inserted >= need:
+            done.set()
+        return item
+
+    async def process_item(stage: str, item: tuple, handle, outbox: asyncio.Queue | None) -> None:
+        item_started = time.monotonic()
+        # Нужное количество уже вставлено - оставшееся в очередях не обрабатываем
+        if done.is_set():
+            id_pool.release(item[0])
+            return
+        try:
+            result = await handle(item)
+        except _Rejected as e:
+            if e.retry:
+                id_pool.release(item[0])
+            stats.rejected(stage, e.reason, time.monotonic() - item_started)
+        except Exception as e:
+            id_pool.release(item[0])
+            stats.failed(stage, time.monotonic() - item_started)
+            logger_module.logger.error(f"Anecdote poller: Stage {stage} failed", e)
+        else:
+            if result is None:
+                id_pool.release(item[0])
+                stats.failed(stage, time.monotonic() - item_started)
+            else:
+                stats.passed(stage, time.monotonic() - item_started)
+                if outbox is not None:
+                    await outbox.put(result)
 
-async def get_original() -> tuple[int, str] | None:
-    for _ in range(10):
-        async with aiohttp.ClientSession() as session:
+    async def stage_worker(stage: str, inbox: asyncio.Queue, handle, outbox: asyncio.Queue | None) -> None:
+        while True:
+            item = await inbox.get()
             try:
-                async with session.get(anecdotes_url + str(random.randrange(0, 2000))) as response:
-                    response.raise_for_status()
-
-                    # конечный URL после редиректа
-                    final_url = str(response.url)
-                    # ID — это последняя часть пути
-                    anecdote_id = int(final_url.rsplit('/', 1)[-1])
-
-                    html_content = await response.text()
-                    soup = BeautifulSoup(html_content, 'html.parser')
-
-                    # Анекдот находится внутри <article><p>
-                    anecdote_tag = soup.find('article').find('p')  # type: ignore
-
-                    if anecdote_tag:
-                        anekdot_text = anecdote_tag.get_text(strip=True)  # type: ignore
-                        return anecdote_id, anekdot_text
-
-            except aiohttp.ClientError as e:
-                logger_module.logger.error(f"Anecdote poller: Error access page: {e}")
-                await asyncio.sleep(5)
-            except Exception as e:
-                logger_module.logger.error(f"Anecdote poller: Error loading page: {e}")
-                await asyncio.sleep(2)
-    return None
+                await process_item(stage, item, handle, outbox)
+            finally:
+                inbox.task_done()
+
+    async def rewrite_worker() -> None:
+        batch_size = anecdote_config.rewrite_batch_size
+        while True:
+            batch = [await accepted.get()]
+            try:
+                # Добираем пакет из того, что успело подойти за REWRITE_BATCH_WAIT_SECONDS
+                deadline = time.monotonic() + REWRITE_BATCH_WAIT_SECONDS
+                while len(batch) < batch_size and not done.is_set():
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(accepted.get(), timeout))
+                    except TimeoutError:
+                        break
+
+                texts: list[str | None] = [None] * len(batch)
+                batched = len(batch) > 1 and not done.is_set()
+                if batched:
+                    batch_started = time.monotonic()
+                    texts = await process_anecdotes(session, [original for _, original in batch])
+                    stats.stages["rewrite"].busy += time.monotonic() - batch_started
+                    metrics.inc("anecdote_rewrite_batches_total")
+                for item, text in zip(batch, texts):
+                    await process_item("rewrite", item, partial(rewrite, batched=batched, text=text), rewritten)
+            finally:
+                for _ in batch:
+                    accepted.task_done()
+
+    workers = [asyncio.create_task(stage_worker("filter", originals, filter_original, accepted))]
+    workers += [
+        asyncio.create_task(rewrite_worker())
+        for _ in range(anecdote_config.rewrite_concurrency)
+    ]
+    workers += [
+        asyncio.create_task(stage_worker("insert", rewritten, insert, None))
+        for _ in range(anecdote_config.insert_concurrency)
+    ]
+    try:
+        await asyncio.gather(*(fetch_worker() for _ in range(anecdote_config.fetch_concurrency)))
+        # Очереди дочищаются по порядку стадий: элемент попадает в следующую очередь раньше task_done
+        for queue in (originals, accepted, rewritten):
+            await queue.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        stats.elapsed = time.monotonic() - started
+    return stats
 
 
 async def anecdote_loop_check() -> None:
     logger_module.logger.trace("Anecdote poller: Check loop")
-    need = config_module.config.anecdote.buffer_size - (await anecdotes_repository.count_unused_anecdotes())
-    if need > 0:
-        logger_module.logger.info(f"Anecdote poller: Need {need} anecdotes, loading")
-
-        i = 0
-        while i < need:
-            logger_module.logger.debug(f"Anecdote poller: Proccessing {i}")
-            resp = await get_original()
-            if resp is None:
-                logger_module.logger.debug("Anecdote poller: Anecdote is None")
-                continue
-            anecdote_id, original_text = resp
-            anecodete_len = len(original_text)
-            if anecodete_len < 200:
-                logger_module.logger.debug(f"Anecdote poller: Anecdote anecodete_len={anecodete_len} is too small")
-                continue
-            if anecodete_len > 1000:
-                logger_module.logger.debug(f"Anecdote poller: Anecdote anecodete_len={anecodete_len} is too big")
-                continue
-            processed_text = await process_anecdote(original_text)
-
-            if processed_text is None:
-                logger_module.logger.debug("Anecdote poller: Anecdote is None")
-                continue
-            else:
-                logger_module.logger.debug(f"Anecdote poller: {original_text}\nProcessed: {processed_text}")
-                await anecdotes_repository.insert_anecdote(anecdote_id, original_text, processed_text)
-
-            await asyncio.sleep(5)
-            i += 1
-        logger_module.logger.info("Anecdote poller: Load complete")
+    try:
+        need = config_module.config.anecdote.buffer_size - (await anecdotes_repository.count_unused_anecdotes())
+        if need > 0:
+            logger_module.logger.info(f"Anecdote poller: Need {need} anecdotes, loading")
+            stats = await run_pipeline(need)
+            logger_module.logger.info(
+                f"Anecdote poller: Load complete, inserted {stats.inserted}/{need} in {stats.elapsed:.1f} s, "
+                f"{len(_id_pool)} unseen left ({stats.summary()})")
+            if stats.inserted < need and not _id_pool:
+                # Все анекдоты сайта уже загружены - /kek начинает повторять показанные
+                recycled = await anecdotes_repository.recycle_anecdotes(need - stats.inserted)
+                if recycled:
+                    notify_new_anecdotes()
+                logger_module.logger.warning(
+                    f"Anecdote poller: No unseen anecdotes left on the site, recycled {recycled} shown ones")
+    except Exception as e:
+        logger_module.logger.error("Anecdote poller: Check loop failed", e)
 
     asyncio.create_task(await_and_run(config_module.config.anecdote.buffer_check_time, anecdote_loop_check))
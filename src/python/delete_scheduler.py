@@ -0,0 +1,201 @@
+import asyncio
+import math
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Generic, Hashable, TypeVar
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+
+from python import logger as logger_module
+from python.storage import cache as cache_module
+from python.storage import config as config_module
+from python.storage.cache import RemoveMessage
+
+# Шаг колеса в секундах: сообщения удаляются не позже чем через TICK_SECONDS после дедлайна
+TICK_SECONDS = 1.0
+# Количество слотов колеса (дедлайны дальше одного оборота ждут следующих оборотов)
+WHEEL_SLOTS = 1024
+# Telegram deleteMessages принимает не больше 100 id за вызов
+DELETE_BATCH_SIZE = 100
+# Через сколько секунд повторить удаление после временной ошибки API
+RETRY_SECONDS = 60
+# Сообщения, которые не удается удалить дольше этого времени, забываются
+GIVE_UP_SECONDS = 60 * 60
+# Как часто сверять колесо с кэшем (сообщения других реплик при общем Redis-кэше)
+SWEEP_SECONDS = 60
+
+T = TypeVar("T", bound=Hashable)
+
+
+class TimerWheel(Generic[T]):
+    """
+    Хешированное колесо таймеров.
+
+    Время разбито на тики длиной tick секунд, тик с номером n попадает в слот
+    n % slots. Добавление и извлечение элемента стоят O(1), продвижение колеса
+    просматривает только слоты прошедших тиков.
+
+    Attributes:
+        tick: Длина тика в секундах
+    """
+
+    def __init__(self, tick: float = TICK_SECONDS, slots: int = WHEEL_SLOTS):
+        self.tick = tick
+        self._slots: list[dict[T, int]] = [{} for _ in range(slots)]
+        # Элемент -> номер тика, на который он запланирован
+        self._ticks: dict[T, int] = {}
+        # Номер следующего необработанного тика
+        self._cursor = math.floor(time.time() / tick)
+
+    def __len__(self) -> int:
+        return len(self._ticks)
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._ticks
+
+    def schedule(self, deadline: float, item: T) -> None:
+        """
+        Запланировать элемент на момент deadline (unix timestamp).
+
+        Просроченные элементы попадают в ближайший тик.
+        Повторное планирование переносит элемент на новый срок.
+        """
+        old = self._ticks.get(item)
+        if old is not None:
+            del self._slots[old % len(self._slots)][item]
+        n = max(math.ceil(deadline / self.tick), self._cursor)
+        self._slots[n % len(self._slots)][item] = n
+        self._ticks[item] = n
+
+    def advance(self, now: float) -> list[T]:
+        """
+        Провернуть колесо до момента now и вернуть все наступившие элементы.
+        """
+        due: list[T] = []
+        target = math.floor(now / self.tick)
+        # Если спали дольше оборота - достаточно один раз обойти все слоты
+        last = min(target, self._cursor + len(self._slots) - 1)
+        for n in range(self._cursor, last + 1):
+            slot = self._slots[n % len(self._slots)]
+            if not slot:
+                continue
+            ready = [item for item, item_tick in slot.items() if item_tick <= target]
+            for item in ready:
+                del slot[item]
+                del self._ticks[item]
+            due.extend(ready)
+        self._cursor = max(self._cursor, target + 1)
+        return due
+
+
+_bot: Bot
+_wheel: TimerWheel[RemoveMessage] = TimerWheel()
+
+
+async def init(bot: Bot):
+    global _bot
+    _bot = bot
+
+
+def _deadline(msg: RemoveMessage) -> float:
+    return msg.stamp + config_module.config.chat_config.echo_auto_delete_secs
+
+
+def schedule(msg: RemoveMessage) -> None:
+    """Запланировать удаление сообщения через echo_auto_delete_secs после его создания."""
+    _wheel.schedule(_deadline(msg), msg)
+
+
+async def rebuild() -> None:
+    """
+    Заполнить колесо сообщениями из кэша.
+
+    Вызывается при старте: сообщения, чей срок истек пока бот был выключен,
+    удаляются на первом же тике.
+    """
+    for msg in await cache_module.cache.get_remove_messages():
+        schedule(msg)
+    logger_module.logger.info(f"Delete scheduler: {len(_wheel)} message(s) scheduled from cache")
+
+
+async def _sweep() -> None:
+    """
+    Запланировать просроченные сообщения, которых нет в колесе.
+
+    Нужна, когда кэш общий (Redis): сообщения, созданные другой репликой,
+    которая успела остановиться, иначе остались бы неудаленными.
+    """
+    for msg in await cache_module.cache.get_old_messages(
+            config_module.config.chat_config.echo_auto_delete_secs
+    ):
+        if msg not in _wheel:
+            schedule(msg)
+
+
+async def _delete_chat_messages(chat_id: int, messages: list[RemoveMessage]) -> None:
+    """
+    Удалить сообщения одного чата пачками через deleteMessages.
+
+    Перед вызовом API сообщения забираются из кэша (claim_messages): при общем
+    Redis-кэше все реплики планируют одни и те же сообщения, но удаляет каждое
+    только та, что успела его забрать. При временной ошибке пачка возвращается
+    в кэш и планируется повторно, а слишком старые сообщения забываются.
+    """
+    for start in range(0, len(messages), DELETE_BATCH_SIZE):
+        batch = await cache_module.cache.claim_messages(*messages[start:start + DELETE_BATCH_SIZE])
+        if not batch:
+            continue
+        message_ids = [msg.message_id for msg in batch]
+        try:
+            await _bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+            logger_module.logger.debug(f"Deleted messages: chat_id={chat_id}, message_ids={message_ids}")
+        except TelegramBadRequest as e:
+            # Сообщения уже удалены, слишком старые или чат недоступен - повторять бессмысленно
+            logger_module.logger.debug(
+                f"Can't delete messages: chat_id={chat_id}, message_ids={message_ids}, error: {e}"
+            )
+        except Exception as e:
+            # Временные проблемы с API
+            now = time.time()
+            expired = [msg for msg in batch if now - msg.stamp > GIVE_UP_SECONDS]
+            retry = [msg for msg in batch if msg not in expired]
+            for msg in retry:
+                await cache_module.cache.insert_message(msg.chat_id, msg.message_id, datetime.fromtimestamp(msg.stamp))
+                _wheel.schedule(now + RETRY_SECONDS, msg)
+            logger_module.logger.warning(
+                f"Failed to delete {len(batch)} message(s) in Telegram: chat_id={chat_id}, "
+                f"error: {type(e).__name__}: {e}. Retry {len(retry)}, force-removed {len(expired)}"
+            )
+
+
+async def _fire(due: list[RemoveMessage]) -> None:
+    by_chat: dict[int, list[RemoveMessage]] = defaultdict(list)
+    for msg in due:
+        by_chat[msg.chat_id].append(msg)
+
+    logger_module.logger.debug(f"Delete scheduler: {len(due)} message(s) in {len(by_chat)} chat(s) are due")
+    await asyncio.gather(*(
+        _delete_chat_messages(chat_id, messages) for chat_id, messages in by_chat.items()
+    ))
+
+
+async def run() -> None:
+    """
+    Фоновая задача: раз в тик проворачивает колесо и удаляет наступившие сообщения.
+    """
+    last_sweep = time.time()
+    while True:
+        now = time.time()
+        # Спим до начала следующего тика
+        await asyncio.sleep(_wheel.tick - now % _wheel.tick)
+        try:
+            if time.time() - last_sweep >= SWEEP_SECONDS:
+                last_sweep = time.time()
+                await _sweep()
+            due = _wheel.advance(time.time())
+            if due:
+                await _fire(due)
+        except Exception as e:
+            logger_module.logger.error(f"Unexpected error in delete scheduler: {type(e).__name__}: {e}", e)
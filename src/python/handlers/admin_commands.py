@@ -1,9 +1,12 @@
+import html
 from asyncio import sleep
 
 from aiogram import Router, Bot
 from aiogram.filters import Command
-from aiogram.types import Message, ReactionTypeEmoji
+from aiogram.types import Message, ReactionTypeEmoji, BufferedInputFile
 
+from python import metrics
+from python.storage import database
 from python.storage.strings import get_string
 from python.utils import log_exception
 
@@ -174,3 +177,78 @@ async def blacklist(message: Message) -> None:
         await message.delete()
     except Exception as e:
         await log_exception(e, message)
+
+
+def format_db_stats() -> str:
+    """Сводка по пулу соединений и запросам: состояние пула, ожидание и удержание соединений, самые затратные запросы."""
+    pool = database.get_pool_stats()
+    acquire = metrics.histogram("db_pool_acquire_ms")
+    lines = [
+        f"pool: size {pool.get('pool_size', 0)}/{pool.get('pool_max', 0)}, "
+        f"available {pool.get('pool_available', 0)}, waiting {pool.get('requests_waiting', 0)}",
+        f"checkouts {metrics.counter('db_pool_checkouts_total')}, "
+        f"timeouts {metrics.counter('db_pool_timeouts_total')}",
+        f"acquire ms: p50 {acquire.quantile(0.5):.1f}, p95 {acquire.quantile(0.95):.1f}, max {acquire.max:.1f}",
+        "",
+        "hold ms by caller (count, p50, p95, max):",
+    ]
+    holds = sorted(metrics.histograms("db_pool_hold_ms").items(), key=lambda item: item[1].total, reverse=True)
+    for labels, hist in holds[:15]:
+        caller = dict(labels).get("caller", "?")
+        lines.append(
+            f"{caller}: {hist.count}, {hist.quantile(0.5):.1f}, {hist.quantile(0.95):.1f}, {hist.max:.1f}"
+        )
+    lines += ["", "queries by total time (count, p50, p95, max):"]
+    for stats in database.get_query_stats()[:10]:
+        fingerprint = stats.fingerprint if len(stats.fingerprint) <= 120 else stats.fingerprint[:117] + "..."
+        lines.append(
+            f"{fingerprint}: {stats.count}, {stats.p50_ms:.1f}, {stats.p95_ms:.1f}, {stats.max_ms:.1f}"
+        )
+    return "\n".join(lines)
+
+
+@router.message(Command("dbstats"))
+async def db_stats(message: Message) -> None:
+    try:
+        if not config_module.config.chat_config.owner:
+            reply = await message.reply(get_string(message.from_user.language_code, "admin_commands.admin_not_install"))
+            await sleep(3)
+            await reply.delete()
+            await message.delete()
+            return
+        if config_module.config.chat_config.owner != message.from_user.id:
+            reply = await message.reply(get_string(message.from_user.language_code, "admin_commands.not_admin"))
+            await sleep(3)
+            await reply.delete()
+            await message.delete()
+            return
+
+        await message.reply(f"<pre>{html.escape(format_db_stats())}</pre>")
+    except Exception as e:
+        await log_exception(e, message)
+
+
+@router.message(Command("metrics"))
+async def metrics_dump(message: Message) -> None:
+    """Все внутренние метрики (счетчики и гистограммы) в текстовом формате Prometheus, файлом."""
+    try:
+        if not config_module.config.chat_config.owner:
+            reply = await message.reply(get_string(message.from_user.language_code, "admin_commands.admin_not_install"))
+            await sleep(3)
+            await reply.delete()
+            await message.delete()
+            return
+        if config_module.config.chat_config.owner != message.from_user.id:
+            reply = await message.reply(get_string(message.from_user.language_code, "admin_commands.not_admin"))
+            await sleep(3)
+            await reply.delete()
+            await message.delete()
+            return
+
+        text = metrics.render_text()
+        if not text:
+            await message.reply(get_string(message.from_user.language_code, "admin_commands.no_metrics"))
+            return
+        await message.reply_document(BufferedInputFile((text + "\n").encode("utf-8"), filename="metrics.txt"))
+    except Exception as e:
+        await log_exception(e, message)
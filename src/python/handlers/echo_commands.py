@@ -1,19 +1,20 @@
 import asyncio
 import datetime
 import random
+import time
 from dataclasses import dataclass
 from typing import List
 
 from aiogram import Router, Bot
 from aiogram.enums import ChatMemberStatus
-from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+from aiogram.exceptions import TelegramAPIError
 from aiogram.filters import Command, CommandStart, CommandObject, BaseFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, InputMediaPhoto, FSInputFile, ChatMemberRestricted
 from aiogram.utils.payload import decode_payload
 
 import python.logger as logger_module
-from python import utils
+from python import utils, delete_scheduler, media_cache
 from python.handlers.hype_collector import start_collector_command
 from python.handlers.services_handlers.add_service_commands import on_addservice
 from python.handlers.services_handlers.join_service import on_accept_join_process
@@ -23,7 +24,7 @@ from python.storage.command_loader import get_echo_commands, EchoCommand, TimeIn
 from python.storage.repository.users_repository import check_user, UserRecord
 from python.storage.strings import get_string, get_strings
 from python.storage.times import get_time_status
-from python.utils import check_blacklisted, log_exception, await_and_run
+from python.utils import check_blacklisted, log_exception
 from python.utils import TriggerFilter
 
 router = Router()
@@ -37,6 +38,8 @@ async def init(bot: Bot):
 
 _echo_commands_cache = None
 _handlers_registered = False  # Флаг для отслеживания регистрации
+# Сколько раз пытаться отправить группу изображений
+SEND_TRIES = 3
 
 
 def get_echo_commands_cached():
@@ -56,8 +59,9 @@ async def create_delete_task(*messages: Message) -> None:
     """Добавить сообщения в кэш для автоматического удаления."""
     for message in messages:
         if message.chat.type in ('group', 'supergroup'):
-            await cache_module.cache.insert_message(message.chat.id, message.message_id)
-    await cache_module.cache.save()
+            delete_scheduler.schedule(
+                await cache_module.cache.insert_message(message.chat.id, message.message_id)
+            )
 
 
 @dataclass(frozen=True)
@@ -67,6 +71,7 @@ class ImagePath:
 
 @dataclass(frozen=True)
 class ImageId:
+    path: str
     id: str
 
 
@@ -74,14 +79,13 @@ async def get_file_list(*files: ImageFileInfo) -> list[ImagePath | ImageId]:
     result = []
     for info in files:
         if info.file is not None:
-            if info.file in cache_module.cache.images_caches:
-                result.append(ImageId(cache_module.cache.images_caches[info.file]))
+            file_id = await media_cache.get_file_id(info.file)
+            if file_id is not None:
+                result.append(ImageId(info.file, file_id))
             else:
                 result.append(ImagePath(info.file))
         elif info.cycle is not None:
-            index = (cache_module.cache.image_index.get(info.cycle.name, 0) + 1) % len(info.cycle.files)
-            cache_module.cache.image_index[info.cycle.name] = index
-            await cache_module.cache.save()
+            index = await cache_module.cache.next_image_index(info.cycle.name, len(info.cycle.files))
 
             result.extend(
                 await get_file_list(info.cycle.files[index])
@@ -108,18 +112,15 @@ def make_image_handler(command_info: EchoCommand):
                     message.from_user.full_name,
                     message.from_user.language_code,
                 ))
-            # global images_caches, image_index
             delete_messages = [message]
 
-            tries = 0
-            while True:
-                tries += 1
-                file_list: list[ImagePath | ImageId] = await get_file_list(*command_info.images.files)
+            file_list: list[ImagePath | ImageId] = await get_file_list(*command_info.images.files)
+            caption = get_string(
+                message.from_user.language_code, command_info.message_path,
+                **build_kwargs(command_info.times, message.from_user.language_code)
+            )
+            for tries in range(1, SEND_TRIES + 1):
                 media: list[InputMediaPhoto] = []
-                caption = get_string(
-                    message.from_user.language_code, command_info.message_path,
-                    **build_kwargs(command_info.times, message.from_user.language_code)
-                )
                 for i, file in enumerate(file_list):
                     if i == 0:
                         cap = caption
@@ -144,27 +145,29 @@ def make_image_handler(command_info: EchoCommand):
                         media=media,
                         reply_to_message_id=message.message_id
                     )
-
-                    for message, file in zip(reply, file_list):
-                        if isinstance(file, ImagePath):
-                            cache_module.cache.images_caches[file.path] = message.photo[-1].file_id
-                    await cache_module.cache.save()
-                    delete_messages.extend(reply)
                 except Exception as e:
-                    logger_module.logger.error(f"{e}")
-                    affected = 0
-                    for file in file_list:
-                        if isinstance(file, ImageId):
-                            affected += 1
-                            del cache_module.cache.images_caches[file.id]
-                            await cache_module.cache.save()
-                    if affected == 0:
-                        logger_module.logger.warning(f"Tried {tries} times send images")
-                        if tries >= 10:
-                            raise IOError("Too many tries to send images") from e
+                    if tries >= SEND_TRIES:
+                        raise IOError(f"Failed to send images after {tries} tries") from e
+                    # Загружаем заново только те изображения, чьи File ID устарели
+                    stale = await media_cache.invalidate_failed(
+                        _bot, *((file.path, file.id) for file in file_list if isinstance(file, ImageId))
+                    )
+                    logger_module.logger.warning(
+                        f"Failed to send images (try {tries}): {type(e).__name__}: {e}. "
+                        f"Re-uploading {len(stale)} stale file(s)"
+                    )
+                    file_list = [
+                        ImagePath(file.path) if isinstance(file, ImageId) and file.id in stale else file
+                        for file in file_list
+                    ]
                     await asyncio.sleep(0.2)
                     continue
 
+                for sent, file in zip(reply, file_list):
+                    if isinstance(file, ImagePath):
+                        await media_cache.remember(file.path, sent.photo[-1].file_id)
+                media_cache.mark_sent(*(file.id for file in file_list if isinstance(file, ImageId)))
+                delete_messages.extend(reply)
                 break
             asyncio.create_task(create_delete_task(*delete_messages))
 
@@ -241,6 +244,57 @@ def register_echo_handlers():
     logger_module.logger.info(f"Registered {len(get_echo_commands_cached())} echo command handlers")
 
 
+def collect_image_paths(*files: ImageFileInfo) -> set[str]:
+    """Собрать пути всех изображений, включая вложенные циклы и случайные выборки."""
+    paths = set()
+    for info in files:
+        if info.file is not None:
+            paths.add(info.file)
+        if info.cycle is not None:
+            paths |= collect_image_paths(*info.cycle.files)
+        if info.random is not None:
+            paths |= collect_image_paths(*info.random.files)
+    return paths
+
+
+async def warm_up_images() -> None:
+    """
+    Заранее загрузить в Telegram изображения всех эхо-команд.
+
+    Изображения без сохраненного File ID отправляются в служебный чат
+    media.warmup_chat_id с ограниченной параллельностью, File ID запоминаются
+    в media_cache, а служебные сообщения удаляются.
+    """
+    media_config = config_module.config.media
+    started = time.perf_counter()
+    paths = set()
+    for echo_command in get_echo_commands_cached():
+        if echo_command.images:
+            paths |= collect_image_paths(*echo_command.images.files)
+
+    missing = [path for path in sorted(paths) if await media_cache.get_file_id(path) is None]
+    semaphore = asyncio.Semaphore(media_config.warmup_concurrency)
+    failed = 0
+
+    async def upload(path: str) -> None:
+        nonlocal failed
+        async with semaphore:
+            try:
+                sent = await _bot.send_photo(chat_id=media_config.warmup_chat_id, photo=FSInputFile(path))
+                await media_cache.remember(path, sent.photo[-1].file_id)
+                await sent.delete()
+            except Exception as e:
+                failed += 1
+                logger_module.logger.warning(f"Images warm-up: failed to upload {path}: {type(e).__name__}: {e}")
+
+    await asyncio.gather(*(upload(path) for path in missing))
+
+    logger_module.logger.info(
+        f"Images warm-up: {len(paths)} image(s), {len(missing) - failed} uploaded, "
+        f"{failed} failed in {time.perf_counter() - started:.2f}s"
+    )
+
+
 @router.message(CommandStart(deep_link=True))
 async def command_start_handler(message: Message, command: CommandObject, state: FSMContext) -> None:
     try:
@@ -393,73 +447,3 @@ async def command_week_handler(message: Message) -> None:
         asyncio.create_task(create_delete_task(message, sent))
     except Exception as e:
         await log_exception(e, message)
-
-
-async def delete_cycle():
-    try:
-        # 1. Получаем сообщения, которые нужно удалить
-        messages = cache_module.cache.get_old_messages(
-            config_module.config.chat_config.echo_auto_delete_secs
-        )
-
-        if not messages:
-            logger_module.logger.trace("Delete cycle: No messages to delete (cache empty or all fresh)")
-            return
-
-        logger_module.logger.debug(f"Delete cycle: Found {len(messages)} message(s) to delete")
-
-        to_remove_from_cache = []
-        failed_messages = []
-
-        # 2. Удаляем каждое сообщение в Telegram
-        for msg in messages:
-            try:
-                await _bot.delete_message(chat_id=msg.chat_id, message_id=msg.message_id)
-                logger_module.logger.debug(f"Deleted message: chat_id={msg.chat_id}, message_id={msg.message_id}")
-                to_remove_from_cache.append(msg)
-
-            except TelegramBadRequest:
-                # Сообщение не найдено - уже удалено или никогда не существовало
-                logger_module.logger.debug(f"Message not found: chat_id={msg.chat_id}, message_id={msg.message_id}")
-                to_remove_from_cache.append(msg)
-
-            except Exception as e:
-                # Другие ошибки - временные проблемы с API
-                logger_module.logger.warning(
-                    f"Failed to delete message in Telegram: chat_id={msg.chat_id}, "
-                    f"message_id={msg.message_id}, error: {type(e).__name__}: {e}"
-                )
-                failed_messages.append(msg)
-
-        # 3. Удаляем из кэша все обработанные сообщения
-        if to_remove_from_cache:
-            await cache_module.cache.delete_messages(*to_remove_from_cache)
-            logger_module.logger.info(
-                f"Successfully removed {len(to_remove_from_cache)} message(s) from cache"
-            )
-
-        # 4. Принудительно удаляем из кэша старые проблемные сообщения (>1 час)
-        if failed_messages:
-            from datetime import datetime, timedelta
-
-            old_threshold = datetime.now() - timedelta(hours=1)
-            old_failed = [msg for msg in failed_messages if msg.create_time < old_threshold]
-
-            if old_failed:
-                await cache_module.cache.delete_messages(*old_failed)
-                logger_module.logger.warning(
-                    f"Force-removed {len(old_failed)} old failed message(s) from cache "
-                    f"(failed to delete for >1 hour)"
-                )
-
-            # Логируем только свежие ошибки
-            recent_failed = [msg for msg in failed_messages if msg not in old_failed]
-            if recent_failed:
-                failed_ids = [(m.chat_id, m.message_id) for m in recent_failed]
-                logger_module.logger.warning(f"Failed to delete {len(recent_failed)} message(s): {failed_ids}")
-
-    except Exception as e:
-        logger_module.logger.error(f"Unexpected error in delete_cycle: {type(e).__name__}: {e}", exc_info=True)
-    finally:
-        # 5. Перезапуск цикла
-        asyncio.create_task(await_and_run(60, delete_cycle))
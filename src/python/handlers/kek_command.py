@@ -20,12 +20,32 @@ _bot: Bot
 
 kek_last_use = {}
 
+# Как часто обновлять статус "печатает..." во время ожидания анекдота
+TYPING_INTERVAL = 4
+
 
 async def init(bot: Bot):
     global _bot
     _bot = bot
 
 
+async def keep_typing(message: Message) -> None:
+    """Показывать "печатает..." в чате, пока задачу не отменят (статус живет ~5 секунд)."""
+    while True:
+        try:
+            await _bot.send_chat_action(
+                chat_id=message.chat.id,
+                action='typing',
+                message_thread_id=message.message_thread_id
+            )
+        except TelegramRetryAfter:
+            logger_module.logger.warning("Telegram action type status restricted by flood control")
+        except Exception as e:
+            logger_module.logger.warning("Failed to send typing status", e, message=message)
+            return
+        await asyncio.sleep(TYPING_INTERVAL)
+
+
 @router.message(Command("kek"))
 @router.message(lambda message: message.text and message.text.lower() in ["kek", "кек"])
 async def command_anecdote_handler(message: Message) -> None:
@@ -117,28 +137,19 @@ async def command_anecdote_handler(message: Message) -> None:
         kek_last_use[message.chat.id] = datetime.datetime.now()
 
         if config_module.config.anecdote.enabled:
-            for i in range(100):
-                if i % 5 == 0:
-                    try:
-                        await _bot.send_chat_action(
-                            chat_id=message.chat.id,
-                            action='typing',
-                            message_thread_id=message.message_thread_id
-                        )
-                    except TelegramRetryAfter:
-                        logger_module.logger.warning("Telegram action type status restricted by flood control")
-                try:
-                    anecdote = await anecdote_poller.get_anecdote()
-                    if anecdote:
-                        await message.reply(get_string(
-                            message.from_user.language_code,
-                            'echo_commands.kek.anecdote',
-                            anecdote.text,
-                            anecdote.anecdote_id
-                        ))
-                        return
-                except Exception as e:
-                    logger_module.logger.error("Failed to generate anecdote. Retrying...", e, message=message)
+            typing = asyncio.create_task(keep_typing(message))
+            try:
+                anecdote = await anecdote_poller.get_anecdote()
+            finally:
+                typing.cancel()
+            if anecdote:
+                await message.reply(get_string(
+                    message.from_user.language_code,
+                    'echo_commands.kek.anecdote',
+                    anecdote.text,
+                    anecdote.anecdote_id
+                ))
+                return
         await message.reply(get_string(
             message.from_user.language_code,
             'echo_commands.kek.not_found'
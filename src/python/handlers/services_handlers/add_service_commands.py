@@ -1,6 +1,4 @@
 import asyncio
-import base64
-import io
 from dataclasses import replace
 
 from aiogram import Bot, Router
@@ -10,17 +8,19 @@ from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto, Message, \
-    FSInputFile, BufferedInputFile, KeyboardButton, ReplyKeyboardRemove
+    FSInputFile, KeyboardButton, ReplyKeyboardRemove
 from aiogram.utils.deep_linking import create_start_link
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 
-from python import utils
+from python import utils, media_cache
 from python.handlers.services_handlers import moderate_service
 from python.storage.repository import services_repository
 from python.storage.repository.services_repository import Service
 from python.storage.strings import get_string
 from python.utils import log_exception
 
+NO_IMAGE = './src/res/images/services/no_image.jpg'
+
 _bot_username: str
 _bot: Bot
 
@@ -258,13 +258,15 @@ async def on_picture_chosen(message: Message, state: FSMContext) -> None:
         )
 
         largest_photo = message.photo[-1]
-        photo_base64: str = (await utils.download_photos(
+        photo_ref: str = (await utils.download_photos(
             _bot,
             [largest_photo.file_id]
         ))[0]
+        # Фото уже есть в Telegram - превью и модерация отправят его по File ID без загрузки
+        await media_cache.remember_stored(photo_ref, largest_photo.file_id)
 
         await state.update_data(
-            image=photo_base64
+            image=photo_ref
         )
 
         await reply.delete()
@@ -278,12 +280,6 @@ async def on_picture_chosen(message: Message, state: FSMContext) -> None:
 async def process_create_service(message: Message, state: FSMContext) -> None:
     try:
         data = await state.get_data()
-        if data['image']:
-            image_bytes = base64.b64decode(data['image'])
-            image_stream = io.BytesIO(image_bytes)
-            media = BufferedInputFile(image_stream.read(), filename=f"preview.jpg")
-        else:
-            media = FSInputFile('./src/res/images/services/no_image.jpg')
 
         if not message.from_user:
             return
@@ -334,11 +330,17 @@ async def process_create_service(message: Message, state: FSMContext) -> None:
             callback_data='a'
         )).as_markup()
 
-        reply = await message.reply_photo(
-            photo=media,
-            caption=caption,
-            reply_markup=keyboard,
-        )
+        async def send(media: str | FSInputFile) -> Message:
+            return await message.reply_photo(
+                photo=media,
+                caption=caption,
+                reply_markup=keyboard,
+            )
+
+        if data['image']:
+            reply = await media_cache.send_stored(data['image'], send, filename="preview.jpg")
+        else:
+            reply = await media_cache.send_cached(NO_IMAGE, send)
 
         update_keyboard = InlineKeyboardBuilder().row(InlineKeyboardButton(
             text=get_string(message.from_user.language_code, "services.add_command.edit_buttons.edit_name"),
@@ -432,7 +434,7 @@ async def callbacks_edit_service(
                     text=get_string(callback.from_user.language_code, "services.add_command.edit_picture"))
                 await state.update_data(callback_data=callback_data.pack(), reply=reply.message_id)
             case "publish":
-                service = await services_repository.find_service(service_id=callback_data.service_id)
+                service = await services_repository.find_service(service_id=callback_data.service_id, with_image=True)
                 await _bot.edit_message_caption(
                     chat_id=callback.message.chat.id,
                     message_id=callback_data.original_msg,
@@ -525,29 +527,29 @@ async def update_preview_text(
         service: Service, update_image: bool = False
 ):
     if update_image:
+        def edit_media(media: str | FSInputFile):
+            return _bot.edit_message_media(
+                media=InputMediaPhoto(
+                    media=media,
+                    caption=get_string(
+                        lang,
+                        'services.add_command.preview',
+                        service.name,
+                        service.cost, service.cost_per,
+                        service.description if service.description else get_string(
+                            lang, 'services.service_no_description'
+                        )
+                    ),
+                ),
+                chat_id=chat,
+                message_id=preview_message,
+                reply_markup=create_preview_keyboard(preview_message, service.id, lang)
+            )
+
         if service.image:
-            image_bytes = base64.b64decode(service.image)
-            image_stream = io.BytesIO(image_bytes)
-            media = BufferedInputFile(image_stream.read(), filename=f"{service.id}.jpg")
+            await media_cache.send_stored(service.image, edit_media, filename=f"{service.id}.jpg")
         else:
-            media = FSInputFile('./src/res/images/services/no_image.jpg')
-        await _bot.edit_message_media(
-            media=InputMediaPhoto(
-                media=media,
-                caption=get_string(
-                    lang,
-                    'services.add_command.preview',
-                    service.name,
-                    service.cost, service.cost_per,
-                    service.description if service.description else get_string(
-                        lang, 'services.service_no_description'
-                    )
-                ),
-            ),
-            chat_id=chat,
-            message_id=preview_message,
-            reply_markup=create_preview_keyboard(preview_message, service.id, lang)
-        )
+            await media_cache.send_cached(NO_IMAGE, edit_media)
     else:
         await _bot.edit_message_caption(
             chat_id=chat,
@@ -721,16 +723,17 @@ async def on_picture_edit(message: Message, state: FSMContext) -> None:
 
         largest_photo = message.photo[-1]
 
-        photo_base64 = (await utils.download_photos(
+        photo_ref = (await utils.download_photos(
             _bot,
             [largest_photo.file_id]
         ))[0]
+        await media_cache.remember_stored(photo_ref, largest_photo.file_id)
 
         callback_data: EditServiceCallbackFactory = EditServiceCallbackFactory.unpack(
             await state.get_value("callback_data")
         )
         reply_message: int = await state.get_value("reply")
-        service = await services_repository.update_service_fields(callback_data.service_id, image=photo_base64)
+        service = await services_repository.update_service_fields(callback_data.service_id, image=photo_ref)
         if service:
             await update_preview_text(message.from_user.language_code, message.chat.id, callback_data.original_msg,
                                       service,
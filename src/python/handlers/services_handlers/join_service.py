@@ -1,5 +1,3 @@
-import base64
-import io
 from enum import Enum
 
 from aiogram import Bot
@@ -9,14 +7,14 @@ from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.storage.base import StorageKey
-from aiogram.types import ChatJoinRequest, Message, KeyboardButton, FSInputFile, BufferedInputFile, \
+from aiogram.types import ChatJoinRequest, Message, KeyboardButton, FSInputFile, \
     InlineKeyboardButton, ReplyKeyboardRemove, User
 from aiogram.utils.deep_linking import create_start_link
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 
 # === ЗАМЕНА ИМПОРТОВ ===
 from python.storage import config as config_module
-from python import logger as logger_module
+from python import logger as logger_module, media_cache
 
 from python.storage.repository import users_repository
 from python.storage.strings import get_string
@@ -318,12 +316,13 @@ async def on_picture_chosen(message: Message, state: FSMContext) -> None:
             return
 
         largest_photo = message.photo[-1]
-        await state.update_data(
-            image=(await download_photos(
-                _bot,
-                [largest_photo.file_id]
-            ))[0]
-        )
+        image = (await download_photos(
+            _bot,
+            [largest_photo.file_id]
+        ))[0]
+        # Фото уже есть в Telegram - для модерации оно отправится по этому File ID без загрузки
+        await media_cache.remember_stored(image, largest_photo.file_id)
+        await state.update_data(image=image)
         await message.reply_photo(
             photo=largest_photo.file_id,
             caption=get_string(
@@ -379,32 +378,34 @@ async def on_send_chosen(message: Message, state: FSMContext) -> None:
                 image=image,
                 lang=message.from_user.language_code
             )
-            image_bytes = base64.b64decode(image)
-            image_stream = io.BytesIO(image_bytes)
-            media = BufferedInputFile(image_stream.read(), filename=f"preview.jpg")
-            send = await _bot.send_photo(
-                chat_id=config_module.config.chat_config.admin.chat_id,
-                photo=media,
-                caption=new_request_message(
-                    message.from_user.language_code,
-                    message.from_user.full_name,
-                    message.from_user.username,
-                    message.from_user.id,
-                    get_string(message.from_user.language_code, "user_service.moderation.request_status.on_moderation"),
-                    await state.get_value("name"),
-                    await state.get_value("surname"),
-                    await state.get_value("room"),
-                    get_string(message.from_user.language_code, 'user_service.moderation.actions.choose')
-                ),
-                reply_markup=InlineKeyboardBuilder().row(InlineKeyboardButton(
-                    text='Отклонить',
-                    callback_data='.'
-                )).row(InlineKeyboardButton(
-                    text='Одобрить',
-                    callback_data='.'
-                )).as_markup(),
-                message_thread_id=config_module.config.chat_config.admin.topics.join
+            caption = new_request_message(
+                message.from_user.language_code,
+                message.from_user.full_name,
+                message.from_user.username,
+                message.from_user.id,
+                get_string(message.from_user.language_code, "user_service.moderation.request_status.on_moderation"),
+                await state.get_value("name"),
+                await state.get_value("surname"),
+                await state.get_value("room"),
+                get_string(message.from_user.language_code, 'user_service.moderation.actions.choose')
             )
+
+            async def send_preview(media: str | FSInputFile) -> Message:
+                return await _bot.send_photo(
+                    chat_id=config_module.config.chat_config.admin.chat_id,
+                    photo=media,
+                    caption=caption,
+                    reply_markup=InlineKeyboardBuilder().row(InlineKeyboardButton(
+                        text='Отклонить',
+                        callback_data='.'
+                    )).row(InlineKeyboardButton(
+                        text='Одобрить',
+                        callback_data='.'
+                    )).as_markup(),
+                    message_thread_id=config_module.config.chat_config.admin.topics.join
+                )
+
+            send = await media_cache.send_stored(image, send_preview, filename="preview.jpg")
             await send.edit_reply_markup(reply_markup=InlineKeyboardBuilder().row(InlineKeyboardButton(
                 text='Отклонить',
                 callback_data=ModerateUserCallbackFactory(
@@ -1,18 +1,20 @@
 import asyncio
-import base64
-import io
+import html
+import math
 import urllib.parse
 from enum import Enum
 
 from aiogram import Bot, Router
 from aiogram import types
-from aiogram.filters import Command
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InaccessibleMessage, InlineKeyboardButton, InputMediaPhoto, Message, \
-    FSInputFile, BufferedInputFile
+    FSInputFile, InlineQuery, InlineQueryResultArticle, InputTextMessageContent
 from aiogram.utils.deep_linking import create_start_link
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from python import media_cache
 from python.handlers.echo_commands import create_delete_task
 from python.handlers.services_handlers import add_service_commands, my_services_command
 from python.storage.repository import services_repository
@@ -49,16 +51,99 @@ class ServicesHandlerFactory(CallbackData, prefix="servicesbuttons"):
 class ServicesCallbackFactory(CallbackData, prefix="services"):
     path: str
     is_service: bool = False
-    offset: int = 0
+    cursor: str = ""
+    backward: bool = False
+
+
+class ServicesSearchCallbackFactory(CallbackData, prefix="servicesearch"):
+    # Сам запрос не помещается в callback data, он берется из сообщения с командой
+    offset: int
 
 
 PAGE_SIZE = 5
+# Результатов на страницу в inline-режиме (Telegram принимает до 50)
+INLINE_PAGE_SIZE = 20
+
+HEADER_IMAGE = './src/res/images/services/header.jpg'
+NO_IMAGE = './src/res/images/services/no_image.jpg'
+
+
+def service_button_text(lang: str, service: services_repository.ServiceItem) -> str:
+    cost_text = get_string(
+        lang,
+        'services.negotiated_price_button'
+    ) if int(service.cost) == -1 else get_string(
+        lang,
+        'services.price_placeholder',
+        int(service.cost)
+    )
+
+    return get_string(
+        lang,
+        "services.service_button",
+        service.name, cost_text, service.cost_per,
+        service.owner
+    )
+
+
+def extract_search_query(text: str | None) -> str:
+    """Текст запроса из сообщения '/services <запрос>' (пустая строка, если запроса нет)."""
+    if not text or not text.startswith("/"):
+        return ""
+    parts = text.split(maxsplit=1)
+    return parts[1].strip() if len(parts) > 1 else ""
+
+
+async def parse_search_keyboard(lang: str, query: str, offset: int = 0) -> tuple[InlineKeyboardBuilder, str, bool]:
+    """
+    Клавиатура и подпись страницы результатов поиска.
+
+    Returns:
+        Клавиатура, подпись и признак того, что на странице есть результаты
+    """
+    search_page = await services_repository.search_services(query, offset, PAGE_SIZE)
+    builder = InlineKeyboardBuilder()
+    for service in search_page.items:
+        builder.row(
+            InlineKeyboardButton(
+                text=service_button_text(lang, service),
+                callback_data=ServicesCallbackFactory(
+                    path=str(service.service_id),
+                    is_service=True
+                ).pack()
+            )
+        )
 
+    row = []
+    if offset > 0:
+        row.append(
+            InlineKeyboardButton(
+                text=get_string(lang, "services.prev_button"),
+                callback_data=ServicesSearchCallbackFactory(offset=max(offset - PAGE_SIZE, 0)).pack()
+            )
+        )
+    if search_page.next_offset is not None:
+        row.append(
+            InlineKeyboardButton(
+                text=get_string(lang, "services.next_button"),
+                callback_data=ServicesSearchCallbackFactory(offset=search_page.next_offset).pack()
+            )
+        )
+    if row:
+        builder.row(*row)
+
+    caption_lines = [get_string(lang, "services.search.caption", html.escape(query)).strip()]
+    if row:
+        caption_lines.append(get_string(lang, "services.search.page", offset // PAGE_SIZE + 1).strip())
+    return builder, "\n".join(caption_lines), bool(search_page.items)
 
-async def parse_folder_keyboard(lang: str, path: str, offset=0, is_pm=False) -> tuple[InlineKeyboardBuilder, int, int]:
-    services = await services_repository.get_service_list(path)
+
+async def parse_folder_keyboard(
+        lang: str, path: str, cursor: str = "", backward: bool = False, is_pm=False
+) -> tuple[InlineKeyboardBuilder, int, int]:
+    services_page = await services_repository.get_service_page(path, cursor, backward, PAGE_SIZE)
     builder = InlineKeyboardBuilder()
-    logger_module.logger.debug(f"{path}: {services}")
+    logger_module.logger.debug(f"{path}: {services_page}")
 
     if path == "/":
         if is_pm:
@@ -82,33 +167,13 @@ async def parse_folder_keyboard(lang: str, path: str, offset=0, is_pm=False) ->
                 )
             )
 
-    if len(services) > PAGE_SIZE:
-        cropped_services = services[offset:offset + PAGE_SIZE]
-    else:
-        cropped_services = services
-
-    for service in cropped_services:
+    for service in services_page.items:
         if service.is_folder:
             button_path = service.folder_dest
             text = get_string(lang, "services.folder_button", service.name)
         else:
             button_path = service.service_id
-
-            cost_text = get_string(
-                lang,
-                'services.negotiated_price_button'
-            ) if int(service.cost) == -1 else get_string(
-                lang,
-                'services.price_placeholder',
-                int(service.cost)
-            )
-
-            text = get_string(
-                lang,
-                "services.service_button",
-                service.name, cost_text, service.cost_per,
-                service.owner
-            )
+            text = service_button_text(lang, service)
 
         if button_path is not None:
             builder.row(
@@ -121,25 +186,26 @@ async def parse_folder_keyboard(lang: str, path: str, offset=0, is_pm=False) ->
                 )
             )
 
-    if len(services) > PAGE_SIZE:
+    if services_page.total > PAGE_SIZE:
         row = []
-        if offset > 0:
+        if services_page.prev_cursor is not None:
             row.append(
                 InlineKeyboardButton(
                     text=get_string(lang, "services.prev_button"),
                     callback_data=ServicesCallbackFactory(
                         path=path,
-                        offset=offset - PAGE_SIZE
+                        cursor=services_page.prev_cursor,
+                        backward=True
                     ).pack()
                 )
             )
-        if offset + PAGE_SIZE < len(services):
+        if services_page.next_cursor is not None:
             row.append(
                 InlineKeyboardButton(
                     text=get_string(lang, "services.next_button"),
                     callback_data=ServicesCallbackFactory(
                         path=path,
-                        offset=offset + PAGE_SIZE
+                        cursor=services_page.next_cursor
                     ).pack()
                 )
             )
@@ -157,7 +223,7 @@ async def parse_folder_keyboard(lang: str, path: str, offset=0, is_pm=False) ->
             ).pack()
         ))
 
-    return builder, offset // PAGE_SIZE + 1, len(services) // PAGE_SIZE + 1
+    return builder, math.ceil(services_page.start / PAGE_SIZE) + 1, max(math.ceil(services_page.total / PAGE_SIZE), 1)
 
 
 @router.callback_query(ServicesHandlerFactory.filter())
@@ -184,10 +250,14 @@ async def add_service_button(
 
 @router.message(Command("services"))
 @router.message(lambda message: message.text and message.text.lower() in ["услуги"])
-async def command_services_handler(message: Message) -> None:
+async def command_services_handler(message: Message, command: CommandObject | None = None) -> None:
     try:
         if await check_blacklisted(message):
             return
+        query = command.args.strip() if command and command.args else ""
+        if query:
+            await send_search_results(message, query)
+            return
         builder, page, pages = await parse_folder_keyboard(message.from_user.language_code, "/",
                                                            is_pm=message.chat.type == 'private')
 
@@ -201,11 +271,11 @@ async def command_services_handler(message: Message) -> None:
                 ).strip()
             )
 
-        await message.reply_photo(
-            photo=FSInputFile('./src/res/images/services/header.jpg'),
+        await media_cache.send_cached(HEADER_IMAGE, lambda photo: message.reply_photo(
+            photo=photo,
             caption='\n'.join(caption_lines),
             reply_markup=builder.as_markup()
-        )
+        ))
     except Exception as e:
         asyncio.create_task(create_delete_task(
             message, await message.reply(
@@ -219,6 +289,112 @@ async def command_services_handler(message: Message) -> None:
         ))
 
 
+async def send_search_results(message: Message, query: str) -> None:
+    lang = message.from_user.language_code
+    builder, caption, found = await parse_search_keyboard(lang, query)
+    if not found:
+        await message.reply(get_string(lang, "services.search.not_found", html.escape(query)))
+        return
+
+    # Результаты - ответ на команду: при листании запрос берется из нее
+    await media_cache.send_cached(HEADER_IMAGE, lambda photo: message.reply_photo(
+        photo=photo,
+        caption=caption,
+        reply_markup=builder.as_markup()
+    ))
+
+
+@router.callback_query(ServicesSearchCallbackFactory.filter())
+async def callbacks_search_page(
+        callback: types.CallbackQuery,
+        callback_data: ServicesSearchCallbackFactory
+) -> None:
+    try:
+        lang = callback.from_user.language_code
+        if not callback.message or isinstance(callback.message, InaccessibleMessage):
+            await callback.answer(get_string(lang, "services.search.expired"), show_alert=True)
+            return
+        # Запрос берется из сообщения с командой. Если его удалили (вручную или автоудалением),
+        # Telegram не присылает reply_to_message - листать больше нечего
+        command_message = callback.message.reply_to_message
+        if command_message is None or not command_message.text:
+            await callback.answer(get_string(lang, "services.search.expired"), show_alert=True)
+            return
+        query = extract_search_query(command_message.text)
+        if not query:
+            await callback.answer(get_string(lang, "services.search.expired"), show_alert=True)
+            return
+
+        builder, caption, _ = await parse_search_keyboard(lang, query, callback_data.offset)
+        try:
+            await callback.message.edit_caption(caption=caption, reply_markup=builder.as_markup())
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                await callback.answer()
+                return
+            # Сообщение с результатами удалили, пока пользователь нажимал кнопку
+            logger_module.logger.debug(f"Cannot edit search results: {e}")
+            await callback.answer(get_string(lang, "services.search.expired"), show_alert=True)
+            return
+        await callback.answer()
+    except Exception as e:
+        await log_exception(e, callback)
+
+
+@router.inline_query()
+async def inline_services_search(inline_query: InlineQuery) -> None:
+    try:
+        lang = inline_query.from_user.language_code
+        try:
+            offset = max(int(inline_query.offset or 0), 0)
+        except ValueError:
+            offset = 0
+        search_page = await services_repository.search_services(inline_query.query, offset, INLINE_PAGE_SIZE)
+
+        results = []
+        for service in search_page.items:
+            cost_text = get_string(
+                lang,
+                'services.negotiated_price'
+            ) if int(service.cost) == -1 else get_string(
+                lang,
+                'services.price_placeholder',
+                int(service.cost)
+            )
+            text = get_string(
+                lang,
+                "services.author_page_description",
+                service.name, cost_text, service.cost_per, service.description
+            ) if service.description else get_string(
+                lang,
+                "services.author_page",
+                service.name, cost_text, service.cost_per
+            )
+            results.append(InlineQueryResultArticle(
+                id=str(service.service_id),
+                title=service.name,
+                description=f"{cost_text} / {service.cost_per}",
+                input_message_content=InputTextMessageContent(message_text=text),
+                reply_markup=InlineKeyboardBuilder().row(InlineKeyboardButton(
+                    text=get_string(lang, "services.go_button.title"),
+                    url=get_string(
+                        lang,
+                        "services.go_button.url_placeholder",
+                        service.owner,
+                        urllib.parse.quote(service.name)
+                    )
+                )).as_markup()
+            ))
+
+        await inline_query.answer(
+            results,
+            cache_time=60,
+            next_offset=str(search_page.next_offset) if search_page.next_offset is not None else ""
+        )
+    except Exception as e:
+        logger_module.logger.error(e, inline_query)
+
+
 @router.callback_query(ServicesCallbackFactory.filter())
 async def callbacks_num_change_fab(
         callback: types.CallbackQuery,
@@ -228,7 +404,7 @@ async def callbacks_num_change_fab(
         if not callback.message:
             return
         if callback_data.is_service:
-            service = await services_repository.find_service(int(callback_data.path))
+            service = await services_repository.find_service(int(callback_data.path), with_image=True)
             if service is None:
                 return
             builder = InlineKeyboardBuilder()
@@ -269,32 +445,32 @@ async def callbacks_num_change_fab(
             )
 
             try:
+                def edit_media(media: str | FSInputFile):
+                    return callback.message.edit_media(
+                        InputMediaPhoto(
+                            media=media,
+                            caption=get_string(
+                                callback.from_user.language_code,
+                                "services.author_page_description",
+                                service.name,
+                                cost_text,
+                                service.cost_per,
+                                service.description
+                            ) if service.description else get_string(
+                                callback.from_user.language_code,
+                                "services.author_page",
+                                service.name,
+                                cost_text,
+                                service.cost_per
+                            ),
+                        ),
+                        reply_markup=builder.as_markup()
+                    )
+
                 if service.image:
-                    image_bytes = base64.b64decode(service.image)
-                    image_stream = io.BytesIO(image_bytes)
-                    media = BufferedInputFile(image_stream.read(), filename=f"{service.id}.jpg")
+                    await media_cache.send_stored(service.image, edit_media, filename=f"{service.id}.jpg")
                 else:
-                    media = FSInputFile('./src/res/images/services/no_image.jpg')
-                await callback.message.edit_media(
-                    InputMediaPhoto(
-                        media=media,
-                        caption=get_string(
-                            callback.from_user.language_code,
-                            "services.author_page_description",
-                            service.name,
-                            cost_text,
-                            service.cost_per,
-                            service.description
-                        ) if service.description else get_string(
-                            callback.from_user.language_code,
-                            "services.author_page",
-                            service.name,
-                            cost_text,
-                            service.cost_per
-                        ),
-                    ),
-                    reply_markup=builder.as_markup()
-                )
+                    await media_cache.send_cached(NO_IMAGE, edit_media)
             except Exception as e:
                 logger_module.logger.error(f"Cannot proccess image: {e}")
                 await callback.message.edit_caption(
@@ -326,7 +502,8 @@ async def callbacks_num_change_fab(
             new_keyboard, page, pages = await parse_folder_keyboard(
                 callback.from_user.language_code,
                 callback_data.path,
-                callback_data.offset,
+                callback_data.cursor,
+                callback_data.backward,
                 callback.message.chat.type == 'private'
             )
 
@@ -350,16 +527,16 @@ async def callbacks_num_change_fab(
                 )
 
             try:
-                await callback.message.edit_media(
+                await media_cache.send_cached(HEADER_IMAGE, lambda media: callback.message.edit_media(
                     InputMediaPhoto(
-                        media=FSInputFile('./src/res/images/services/header.jpg'),
+                        media=media,
                         caption='\n'.join(caption_lines)
                     ),
                     reply_markup=new_keyboard.as_markup()
-                )
+                ))
             except Exception:
                 await callback.message.edit_caption(
-                    photo=FSInputFile('./src/res/images/services/header.jpg'),
+                    photo=FSInputFile(HEADER_IMAGE),
                     caption='\n'.join(caption_lines),
                     reply_markup=new_keyboard.as_markup()
                 )
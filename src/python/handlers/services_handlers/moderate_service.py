@@ -1,17 +1,15 @@
-import base64
-import io
-
 from aiogram import Bot, Router, types
 from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
-from aiogram.types import FSInputFile, BufferedInputFile, InlineKeyboardButton, Message, InlineKeyboardMarkup, \
+from aiogram.types import FSInputFile, InlineKeyboardButton, Message, InlineKeyboardMarkup, \
     ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 
 # === ЗАМЕНА ИМПОРТА ===
 from python.storage import config as config_module
 
+from python import media_cache
 from python.storage.repository import services_repository
 from python.storage.repository.services_repository import Service
 from python.storage.strings import get_string
@@ -98,29 +96,28 @@ def create_caption(lang: str, service: Service, author_name: str) -> str:
 
 
 async def send_to_moderation(service: Service, sender_name: str, sender_lang) -> None:
+    async def send(media: str | FSInputFile) -> Message:
+        return await _bot.send_photo(
+            chat_id=config_module.config.chat_config.admin.chat_id,
+            photo=media,
+            caption=create_caption(config_module.config.chat_config.admin.chat_lang, service, sender_name),
+            reply_markup=InlineKeyboardBuilder().row(InlineKeyboardButton(
+                text='Установить категорию',
+                callback_data='.'
+            )).row(InlineKeyboardButton(
+                text='Отклонить',
+                callback_data='.'
+            )).row(InlineKeyboardButton(
+                text='Одобрить',
+                callback_data='.'
+            )).as_markup(),
+            message_thread_id=config_module.config.chat_config.admin.topics.service
+        )
+
     if service.image:
-        image_bytes = base64.b64decode(service.image)
-        image_stream = io.BytesIO(image_bytes)
-        media = BufferedInputFile(image_stream.read(), filename=f"preview.jpg")
+        reply = await media_cache.send_stored(service.image, send, filename="preview.jpg")
     else:
-        media = FSInputFile('./src/res/images/services/no_image.jpg')
-
-    reply = await _bot.send_photo(
-        chat_id=config_module.config.chat_config.admin.chat_id,
-        photo=media,
-        caption=create_caption(config_module.config.chat_config.admin.chat_lang, service, sender_name),
-        reply_markup=InlineKeyboardBuilder().row(InlineKeyboardButton(
-            text='Установить категорию',
-            callback_data='.'
-        )).row(InlineKeyboardButton(
-            text='Отклонить',
-            callback_data='.'
-        )).row(InlineKeyboardButton(
-            text='Одобрить',
-            callback_data='.'
-        )).as_markup(),
-        message_thread_id=config_module.config.chat_config.admin.topics.service
-    )
+        reply = await media_cache.send_cached('./src/res/images/services/no_image.jpg', send)
 
     await reply.edit_reply_markup(reply_markup=create_markup(
         service.id, sender_name, reply.message_id, sender_lang
@@ -28,7 +28,7 @@ async def on_start() -> None:
     if config.config.timezone:
         tz = ZoneInfo(config.config.timezone)
     strftime = datetime.datetime.now(tz).strftime("%d.%m.%Y")
-    for pin_message in cache_module.cache.help_pin_messages:
+    for pin_message in await cache_module.cache.get_pin_messages():
         try:
             await _bot.edit_message_text(
                 text=get_string(
@@ -331,7 +331,10 @@ def setup_logger(
             utc=False,
             tz=tz
         )
-        json_handler.setLevel(get_log_level(json_level.upper()))
+        # Медленные запросы пишутся с уровнем WARNING и должны попадать в JSON даже при json_level=error
+        json_log_level = get_log_level(json_level.upper())
+        json_handler.setLevel(min(json_log_level, logging.WARNING))
+        json_handler.addFilter(JsonLevelFilter(json_log_level))
         json_handler.setFormatter(JSONFormatter(tz=tz))
 
         _logger.addHandler(console_handler)
@@ -348,6 +351,57 @@ def setup_logger(
     return _logger
 
 
+# === SQL masking ===
+def mask_value(value):
+    """Параметр запроса в виде SQL-литерала для лога; большие и бинарные значения маскируются."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<bytes {len(value)}B>"
+    if isinstance(value, str):
+        # Wrap strings in single quotes and escape any internal single quotes
+        return "'" + value.replace("'", "''") + "'"
+    if isinstance(value, (list, tuple, set)) and len(value) > 10:
+        return f"<{type(value).__name__} {len(value)} elements>"
+    if isinstance(value, (datetime, date)):
+        return f"'{value.isoformat()}'"  # Wrap datetime in quotes for SQL
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'  # SQL boolean syntax
+    if value is None:
+        return 'NULL'  # SQL NULL
+    # Numbers and other types are returned as is
+    return value
+
+
+def format_query(query: str, args: tuple | list | dict = ()) -> str:
+    """Текст запроса с подставленными замаскированными параметрами (позиционными или именованными)."""
+    if isinstance(args, dict):
+        masked_args = {key: mask_value(value) for key, value in args.items()}
+    else:
+        masked_args = tuple(mask_value(a) for a in args or ())
+    if not masked_args:
+        return str(query)
+    try:
+        return query % masked_args
+    except Exception:
+        return f"{query} {masked_args}"
+
+
+class JsonLevelFilter(logging.Filter):
+    """
+    Пропускает в JSON-лог записи от уровня json_level, а также медленные запросы
+    (slow_query в kwargs), даже если их уровень ниже json_level.
+    """
+
+    def __init__(self, level: int):
+        super().__init__()
+        self.level = level
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+        context = getattr(record, "context", None)
+        return bool(context and context.get("kwargs", {}).get("slow_query"))
+
+
 # === AppLogger wrapper ===
 class AppLogger:
     """
@@ -367,6 +421,9 @@ class AppLogger:
         - возвращает UUID лога.
         """
         log_id = str(uuid.uuid4())
+        if not self.is_enabled_for(level):
+            # Запись никуда не попадет - не собираем стек и контекст
+            return log_id
         context: dict[str, Any] = {"uuid": log_id}
 
         detected_exc: BaseException | None = None
@@ -446,56 +503,59 @@ class AppLogger:
     def error(self, msg: Any, *args, **kwargs) -> str:
         return self._log(logging.ERROR, msg, *args, **kwargs)
 
-    def _log_query(self, query: str, args: tuple | list = (), level: int = logging.INFO) -> str:
+    def is_enabled_for(self, level: int) -> bool:
+        """
+        Попадет ли запись этого уровня хотя бы в один обработчик.
+
+        Уровень базового логгера всегда TRACE, фильтрация идет на обработчиках,
+        поэтому logging.Logger.isEnabledFor здесь не помогает.
+        """
+        if not self.logger.isEnabledFor(level):
+            return False
+        handlers = self.logger.handlers
+        # Без своих обработчиков запись уходит родительским логгерам - решает сам logging
+        return not handlers or any(level >= handler.level for handler in handlers)
+
+    def _log_query(self, query: str, args: tuple | list | dict = (), level: int = logging.INFO, **kwargs) -> str:
         """
         Private method to log database queries at a given level.
         Combines query and args into a single string.
         Large or binary arguments are masked.
         Datetime objects are converted to ISO format.
-        Returns UUID of the log.
+        The query is not formatted at all if no handler accepts the level.
+        Returns UUID of the log (empty string if nothing was logged).
         """
+        if not self.is_enabled_for(level):
+            return ""
+        return self._log(level, format_query(query, args), **kwargs)
 
-        def mask_value(value):
-            if isinstance(value, (bytes, bytearray)):
-                return f"<bytes {len(value)}B>"
-            if isinstance(value, str):
-                # Wrap strings in single quotes and escape any internal single quotes
-                return "'" + value.replace("'", "''") + "'"
-            if isinstance(value, (list, tuple, set)) and len(value) > 10:
-                return f"<{type(value).__name__} {len(value)} elements>"
-            if isinstance(value, (datetime, date)):
-                return f"'{value.isoformat()}'"  # Wrap datetime in quotes for SQL
-            if isinstance(value, bool):
-                return 'TRUE' if value else 'FALSE'  # SQL boolean syntax
-            if value is None:
-                return 'NULL'  # SQL NULL
-            # Numbers and other types are returned as is
-            return value
-
-        masked_args = tuple(mask_value(a) for a in args)
-
-        try:
-            log_query = query % masked_args
-        except Exception:
-            log_query = f"{query} {masked_args}"
-
-        return self._log(level, log_query)
-
-    def trace_db(self, query: str, args: tuple | list = ()) -> str:
+    def trace_db(self, query: str, args: tuple | list | dict = ()) -> str:
         return self._log_query(query, args, level=TRACE_LEVEL)
 
-    def debug_db(self, query: str, args: tuple | list = ()) -> str:
+    def debug_db(self, query: str, args: tuple | list | dict = ()) -> str:
         return self._log_query(query, args, level=logging.DEBUG)
 
-    def info_db(self, query: str, args: tuple | list = ()) -> str:
+    def info_db(self, query: str, args: tuple | list | dict = ()) -> str:
         return self._log_query(query, args, level=logging.INFO)
 
-    def warning_db(self, query: str, args: tuple | list = ()) -> str:
+    def warning_db(self, query: str, args: tuple | list | dict = ()) -> str:
         return self._log_query(query, args, level=logging.WARNING)
 
-    def error_db(self, query: str, args: tuple | list = ()) -> str:
+    def error_db(self, query: str, args: tuple | list | dict = ()) -> str:
         return self._log_query(query, args, level=logging.ERROR)
 
+    def slow_db(
+            self, query: str, args: tuple | list | dict = (), duration_ms: float = 0.0, fingerprint: str = ""
+    ) -> str:
+        """
+        Медленный запрос: пишется в JSON-лог независимо от json_level (см. JsonLevelFilter).
+        Длительность и отпечаток запроса попадают в kwargs записи.
+        """
+        return self._log_query(
+            query, args, level=logging.WARNING,
+            slow_query=True, duration_ms=round(duration_ms, 3), fingerprint=fingerprint
+        )
+
 
 # === Глобальный экземпляр (инициализируется явно после загрузки конфига) ===
 logger: AppLogger | None = None
@@ -11,16 +11,18 @@ from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.types import BotCommand, Message, ReplyKeyboardRemove
 from aiogram.types.link_preview_options import LinkPreviewOptions
 from aiohttp import TCPConnector, ClientTimeout
-from redis.asyncio import from_url
 
-from python import anecdote_poller, join_refuser
+from python import anecdote_poller, join_refuser, delete_scheduler
 from python.handlers import water_random
 from python.storage import command_loader
 from python.storage import config as config_module
+from python.storage import cache as cache_module
 from python.storage.cache import init_cache
 from python.storage.command_loader import TelegramCommandsInfo, init_commands_info
+from python.storage import migrations
+from python.storage import redis_client
 from python.storage.database import open_database_pool, close_database_pool
-from python.storage.repository import services_repository, users_repository, anecdotes_repository, hype_repository
+from python.storage.repository import users_repository
 from python.storage.strings import get_string, init_strings
 from python.utils import await_and_run
 
@@ -177,11 +179,7 @@ async def main() -> None:
     # Выбор хранилища для FSM состояний (Redis или память)
     if config_module.config.redis_config.enabled:
         logger.info("Using Redis storage for FSM")
-        redis = from_url(
-            config_module.config.redis_config.url,
-            decode_responses=config_module.config.redis_config.decode_responses
-        )
-        storage = RedisStorage(redis=redis)
+        storage = RedisStorage(redis=redis_client.get_client())
     else:
         logger.info("Using Memory storage for FSM")
         storage = MemoryStorage()
@@ -233,22 +231,23 @@ async def main() -> None:
         await join_refuser.init(bot=bot, storage=dp.storage)
         await join_service.init(bot=bot)
         await echo_commands.init(bot=bot)
+        await delete_scheduler.init(bot=bot)
         await water_random.init(bot=bot)
         await hype_collector.init(bot_username=bot_username, bot=bot)
         await static_help.init(bot=bot)
 
-        # Инициализация репозиториев базы данных
-        logger.info("Initializing database repositories...")
-        await services_repository.init_database_module()
-        await anecdotes_repository.init_database_module()
-        await users_repository.init_database_module()
-        await hype_repository.init_database_module()
+        # Миграции схемы базы данных
+        logger.info("Migrating database schema...")
+        await migrations.migrate()
 
         # Запуск фоновых задач
         logger.info("Starting background tasks...")
+        asyncio.create_task(users_repository.user_writer())
+
         if config_module.config.anecdote.enabled:
             logger.info("Starting anecdote poller...")
             asyncio.create_task(await_and_run(10, anecdote_poller.anecdote_loop_check))
+            asyncio.create_task(anecdote_poller.prefetch_loop())
 
         if config_module.config.refuser.enabled:
             logger.info("Starting join refuser...")
@@ -275,12 +274,23 @@ async def main() -> None:
         from python.handlers.echo_commands import register_echo_handlers
         register_echo_handlers()
 
+        if config_module.config.media.warmup_enabled:
+            if config_module.config.media.warmup_chat_id is None:
+                logger.warning("Echo images warm-up is enabled, but media.warmup_chat_id is not set, skipping")
+            else:
+                logger.info("Starting echo images warm-up...")
+                asyncio.create_task(echo_commands.warm_up_images())
+
         # Обновление закрепленных справочных сообщений
         logger.info("Updating pinned help messages...")
         await static_help.on_start()
 
-        logger.info("Starting deleting cycle")
-        asyncio.create_task(echo_commands.delete_cycle())
+        logger.info("Starting delete scheduler")
+        await delete_scheduler.rebuild()
+        asyncio.create_task(delete_scheduler.run())
+
+        logger.info("Starting cache flush cycle")
+        asyncio.create_task(cache_module.flush_cycle())
 
         logger.info("Aiogram: bot started successfully")
 
@@ -288,6 +298,25 @@ async def main() -> None:
     async def on_shutdown() -> None:
         """Хук, выполняемый при остановке бота."""
         logger.info("Aiogram: shutting down bot")
+        logger.info("Flushing cache...")
+        try:
+            await cache_module.cache.flush()
+        except Exception as e:
+            logger.error("Failed to flush cache on shutdown", e)
+        logger.info("Saving pending users...")
+        try:
+            await users_repository.flush_users()
+        except Exception as e:
+            logger.error("Failed to save users on shutdown", e)
+        if config_module.config.anecdote.enabled:
+            logger.info("Releasing prefetched anecdotes...")
+            try:
+                await anecdote_poller.release_prefetched()
+            except Exception as e:
+                logger.error("Failed to release prefetched anecdotes on shutdown", e)
+            await anecdote_poller.close_session()
+        stats = users_repository.get_user_cache_stats()
+        logger.info(f"Users cache: {stats.hits} hits, {stats.misses} misses, {stats.size} users")
         logger.info("Closing database pool...")
         await close_database_pool()
         logger.info("Aiogram: bot shutdown complete")
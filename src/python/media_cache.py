@@ -0,0 +1,242 @@
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+import aiofiles
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from python import logger as logger_module
+from python.storage import media_store
+from python.storage.repository import media_repository
+
+# Сколько file_id держать в памяти перед обращением к БД
+LRU_SIZE = 256
+# После скольких неудачных отправок подряд file_id забывается, даже если getFile его принимает
+MAX_FAILURES = 3
+# Сколько File ID проверять через getFile после одной неудачной отправки группы
+MAX_PROBES = 3
+
+# Путь -> (mtime_ns, размер, sha256): файл перехэшируется только после изменения
+_digests: dict[str, tuple[int, int, str]] = {}
+# sha256 -> file_id, порядок - от давно использованных к недавним
+_file_ids: OrderedDict[str, str] = OrderedDict()
+# file_id -> количество неудачных отправок подряд
+_failures: dict[str, int] = {}
+
+
+async def file_digest(path: str) -> str:
+    """
+    Получить SHA-256 содержимого локального файла.
+
+    Результат запоминается по mtime и размеру, поэтому файл читается
+    заново только после его изменения.
+    """
+    stat = os.stat(path)
+    known = _digests.get(path)
+    if known is not None and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+        return known[2]
+
+    async with aiofiles.open(path, "rb") as f:
+        digest = hashlib.sha256(await f.read()).hexdigest()
+    _digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def _drop_file_id(file_id: str) -> None:
+    _failures.pop(file_id, None)
+
+
+def _lru_put(digest: str, file_id: str) -> None:
+    old = _file_ids.get(digest)
+    if old is not None and old != file_id:
+        _drop_file_id(old)
+    _file_ids[digest] = file_id
+    _file_ids.move_to_end(digest)
+    while len(_file_ids) > LRU_SIZE:
+        _, evicted = _file_ids.popitem(last=False)
+        _drop_file_id(evicted)
+
+
+async def _find(digest: str, path: str) -> str | None:
+    file_id = _file_ids.get(digest)
+    if file_id is not None:
+        _file_ids.move_to_end(digest)
+        return file_id
+
+    media = await media_repository.find_media(digest)
+    if media is None:
+        return None
+    _lru_put(digest, media.file_id)
+    return media.file_id
+
+
+async def _remember(digest: str, path: str, file_id: str) -> None:
+    if _file_ids.get(digest) == file_id:
+        return
+    _lru_put(digest, file_id)
+    await media_repository.save_media(digest, file_id)
+
+
+async def _forget(digest: str, path: str) -> None:
+    file_id = _file_ids.pop(digest, None)
+    if file_id is not None:
+        _drop_file_id(file_id)
+    else:
+        media = await media_repository.find_media(digest)
+        if media is None:
+            return
+        file_id = media.file_id
+    await media_repository.delete_media(digest, file_id)
+    logger_module.logger.info(f"Media cache: forgot file_id for {path}")
+
+
+async def get_file_id(path: str) -> str | None:
+    """
+    Получить Telegram File ID для локального файла.
+
+    Сначала ищет в LRU в памяти, затем в таблице media_files.
+
+    Returns:
+        File ID или None, если такое содержимое еще не загружалось
+    """
+    return await _find(await file_digest(path), path)
+
+
+async def remember(path: str, file_id: str) -> None:
+    """Сохранить File ID, полученный после загрузки файла в Telegram."""
+    await _remember(await file_digest(path), path, file_id)
+
+
+async def remember_stored(ref: str, file_id: str) -> None:
+    """
+    Сохранить File ID для файла из хранилища медиафайлов.
+
+    Ссылка хранилища - это SHA-256 содержимого, поэтому файл не перехэшируется.
+    Подходит и для File ID фото, которое прислал пользователь: бот может
+    отправлять его повторно, не загружая файл.
+    """
+    await _remember(ref, str(media_store.path(ref)), file_id)
+
+
+async def forget(path: str) -> None:
+    """Забыть File ID файла, если Telegram его больше не принимает."""
+    await _forget(await file_digest(path), path)
+
+
+def mark_sent(*file_ids: str) -> None:
+    """Сбросить счетчики ошибок File ID после успешной отправки."""
+    for file_id in file_ids:
+        _failures.pop(file_id, None)
+
+
+async def invalidate_failed(bot: Bot, *files: tuple[str, str]) -> set[str]:
+    """
+    Найти и забыть устаревшие File ID после неудачной отправки группы.
+
+    Telegram не сообщает, какой элемент медиагруппы отклонен, поэтому File ID
+    проверяются через getFile - не больше MAX_PROBES за вызов и до первого
+    отклоненного. Сначала проверяются id, реже других попадавшие под подозрение,
+    так что повторные неудачи доходят и до остальных элементов группы.
+    Забываются отклоненные id и те, что слишком много раз подряд прошли проверку
+    после неудачных отправок; непроверенные id не трогаются.
+
+    Args:
+        bot: Бот для проверки File ID
+        *files: Пары (путь к файлу, File ID) из неудачной отправки
+
+    Returns:
+        Множество забытых File ID - их файлы нужно загрузить заново
+    """
+    stale = set()
+    paths = {file_id: path for path, file_id in files}
+    probes = [
+        (file_id, paths[file_id], await file_digest(paths[file_id]))
+        for file_id in sorted(paths, key=lambda file_id: _failures.get(file_id, 0))[:MAX_PROBES]
+    ]
+    for file_id, path, digest in probes:
+        failures = _failures.get(file_id, 0) + 1
+        _failures[file_id] = failures
+        rejected = False
+        try:
+            await bot.get_file(file_id)
+            if failures < MAX_FAILURES:
+                continue
+        except TelegramBadRequest as e:
+            logger_module.logger.warning(f"Media cache: file_id rejected by getFile: {e}")
+            rejected = True
+
+        stale.add(file_id)
+        # Строка media_files удаляется, даже если id уже вытеснен из LRU
+        await _forget(digest, path)
+        _drop_file_id(file_id)
+        if rejected:
+            break
+    return stale
+
+
+async def _send(
+        digest: str,
+        path: str,
+        upload: FSInputFile,
+        send: Callable[[str | FSInputFile], Awaitable[Message | bool]]
+) -> Message | bool:
+    file_id = await _find(digest, path)
+    if file_id is not None:
+        try:
+            return await send(file_id)
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                raise
+            logger_module.logger.warning(f"Media cache: file_id for {path} rejected: {e}")
+            await _forget(digest, path)
+
+    sent = await send(upload)
+    if isinstance(sent, Message) and sent.photo:
+        await _remember(digest, path, sent.photo[-1].file_id)
+    return sent
+
+
+async def send_cached(
+        path: str,
+        send: Callable[[str | FSInputFile], Awaitable[Message | bool]]
+) -> Message | bool:
+    """
+    Отправить локальное изображение, загружая его в Telegram не больше одного раза.
+
+    Вызывает send с сохраненным File ID, а если его нет или Telegram его
+    отклонил - с FSInputFile, после чего запоминает File ID из ответа.
+
+    Args:
+        path: Путь к файлу изображения
+        send: Функция отправки, принимающая значение для параметра photo/media
+
+    Returns:
+        Результат send
+    """
+    return await _send(await file_digest(path), path, FSInputFile(path), send)
+
+
+async def send_stored(
+        ref: str,
+        send: Callable[[str | FSInputFile], Awaitable[Message | bool]],
+        filename: str | None = None
+) -> Message | bool:
+    """
+    Отправить фото из хранилища медиафайлов (фото услуги или резидента).
+
+    Как send_cached, но File ID ищется прямо по ссылке хранилища: после первой
+    загрузки фото отправляется по File ID, а файл загружается снова, только
+    если Telegram отклонил сохраненный id.
+
+    Args:
+        ref: Ссылка на файл в хранилище медиафайлов
+        send: Функция отправки, принимающая значение для параметра photo/media
+        filename: Имя файла при загрузке
+
+    Returns:
+        Результат send
+    """
+    return await _send(ref, str(media_store.path(ref)), media_store.input_file(ref, filename), send)
@@ -0,0 +1,110 @@
+"""
+Внутренние метрики бота: счетчики и гистограммы в памяти процесса.
+
+Метрика идентифицируется именем и необязательным набором меток,
+render_text() отдает все метрики в текстовом формате Prometheus.
+"""
+from bisect import bisect_left
+
+# Верхние границы корзин гистограмм в миллисекундах (последняя корзина - все, что больше)
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """
+    Гистограмма длительностей с фиксированными корзинами.
+
+    Attributes:
+        counts: Количество наблюдений в каждой корзине (последняя - выше BUCKETS_MS[-1])
+        count: Всего наблюдений
+        total: Сумма наблюдений в миллисекундах
+        max: Максимальное наблюдение в миллисекундах
+    """
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля сверху: граница корзины, в которую он попадает."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(BUCKETS_MS, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+_counters: dict[tuple[str, tuple[tuple[str, str], ...]], int] = {}
+_histograms: dict[tuple[str, tuple[tuple[str, str], ...]], Histogram] = {}
+
+
+def _key(name: str, labels: dict[str, str] | None) -> tuple[str, tuple[tuple[str, str], ...]]:
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def inc(name: str, value: int = 1, labels: dict[str, str] | None = None) -> None:
+    """Увеличить счетчик."""
+    key = _key(name, labels)
+    _counters[key] = _counters.get(key, 0) + value
+
+
+def counter(name: str, labels: dict[str, str] | None = None) -> int:
+    """Текущее значение счетчика."""
+    return _counters.get(_key(name, labels), 0)
+
+
+def histogram(name: str, labels: dict[str, str] | None = None) -> Histogram:
+    """Получить (или создать) гистограмму."""
+    key = _key(name, labels)
+    hist = _histograms.get(key)
+    if hist is None:
+        hist = _histograms[key] = Histogram()
+    return hist
+
+
+def histograms(name: str) -> dict[tuple[tuple[str, str], ...], Histogram]:
+    """Все гистограммы с этим именем по наборам меток."""
+    return {labels: hist for (hist_name, labels), hist in _histograms.items() if hist_name == name}
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{label}="{_escape_label(value)}"' for label, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render_text() -> str:
+    """Все метрики в текстовом формате Prometheus."""
+    lines = []
+    for (name, labels), value in sorted(_counters.items()):
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), hist in sorted(_histograms.items(), key=lambda item: item[0]):
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS_MS, hist.counts):
+            cumulative += bucket_count
+            le = _format_labels(labels, 'le="%s"' % bound)
+            lines.append(f"{name}_bucket{le} {cumulative}")
+        le = _format_labels(labels, 'le="+Inf"')
+        lines.append(f"{name}_bucket{le} {hist.count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist.total:.3f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist.count}")
+    return "\n".join(lines)
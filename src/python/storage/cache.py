@@ -1,32 +1,53 @@
+import asyncio
+import heapq
+import json
+import os
 import shutil
-from datetime import datetime, timezone
+import time
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Any, Protocol, NamedTuple
 from zoneinfo import ZoneInfo
 
 import aiofiles
 import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, TypeAdapter
+from typing_extensions import NotRequired, TypedDict
 
 
-class RemoveMessage(BaseModel):
+class RemoveMessage(NamedTuple):
     """
     Представляет сообщение, которое нужно автоматически удалить через определенное время.
 
     Используется для временных сообщений (эхо-команды, уведомления и т.д.), которые
     основной процесс сохраняет в кэш, а фоновая задача периодически проверяет и удаляет.
 
+    Компактная запись на основе кортежа: в кэше их тысячи, поэтому без pydantic
+    и без объекта datetime на каждую запись. Поле stamp стоит первым, чтобы
+    записи сравнивались по времени создания и сами служили элементами кучи.
+
     Attributes:
+        stamp: Время создания сообщения (unix timestamp, для расчета возраста)
         chat_id: ID чата, где находится сообщение
         message_id: ID сообщения для удаления
-        create_time: Время создания сообщения (для расчета возраста)
     """
+    stamp: float
     chat_id: int
     message_id: int
-    create_time: datetime = Field(default_factory=lambda: _get_now())
 
+    @property
+    def key(self) -> tuple[int, int]:
+        """Ключ сообщения (chat_id, message_id)."""
+        return self.chat_id, self.message_id
+
+    @property
+    def create_time(self) -> datetime:
+        """Время создания сообщения во временной зоне из конфига."""
+        return datetime.fromtimestamp(self.stamp, _get_timezone())
 
-class PinMessage(BaseModel):
+
+class PinMessage(NamedTuple):
     """
     Представляет закрепленное справочное сообщение в чате.
 
@@ -44,24 +65,100 @@ class PinMessage(BaseModel):
     lang: str
 
 
+class _RemoveMessageData(TypedDict):
+    """Сообщение для удаления в снимке (create_time - формат старых снимков)."""
+    chat_id: int
+    message_id: int
+    stamp: NotRequired[float]
+    create_time: NotRequired[datetime]
+
+
+class _PinMessageData(TypedDict):
+    """Закрепленное сообщение в снимке."""
+    chat_id: int
+    message_id: int
+    lang: str
+
+
+class _SnapshotData(TypedDict):
+    """Формат снимка кэша: проверяется pydantic только при чтении с диска."""
+    journal_seq: NotRequired[int]
+    remove_messages: NotRequired[list[_RemoveMessageData]]
+    pin_help_messages: NotRequired[list[_PinMessageData]]
+    image_index: NotRequired[dict[str, int]]
+
+
+_snapshot_adapter = TypeAdapter(_SnapshotData)
+
+# libyaml-реализация в разы быстрее чистого Python, если она доступна
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
 def _get_logger():
     """Отложенный импорт logger для избежания циклических зависимостей."""
     from python.logger import logger
     return logger
 
 
+@lru_cache(maxsize=None)
+def _zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
 def _get_timezone() -> ZoneInfo | None:
-    """Получить временную зону из конфига."""
+    """Получить временную зону из конфига (объект ZoneInfo создается один раз)."""
     from python.storage.config import config
     if config and config.timezone:
-        return ZoneInfo(config.timezone)
+        return _zone(config.timezone)
     return None
 
 
-def _get_now() -> datetime:
-    """Получить текущее время с учетом временной зоны из конфига."""
-    tz = _get_timezone()
-    return datetime.now(tz)
+def _get_flush_interval() -> float:
+    """Получить интервал отложенной записи кэша на диск."""
+    from python.storage.config import config
+    if config:
+        return config.cache.flush_interval
+    return 5.0
+
+
+def _get_compact_threshold() -> int:
+    """Получить размер журнала, после которого он сворачивается в снимок."""
+    from python.storage.config import config
+    if config:
+        return config.cache.compact_threshold
+    return 1000
+
+
+class CacheBackend(Protocol):
+    """
+    Интерфейс хранилища кэша.
+
+    Реализации: CacheStorage (локальный YAML-файл с журналом) и
+    RedisCacheStorage (общий для нескольких реплик бота Redis).
+    Выбирается параметром cache.backend в конфиге.
+    """
+
+    async def insert_message(self, chat_id: int, message_id: int,
+                             stamp: Optional[datetime] = None) -> RemoveMessage: ...
+
+    async def get_remove_messages(self) -> List[RemoveMessage]: ...
+
+    async def get_old_messages(self, delta: int) -> List[RemoveMessage]: ...
+
+    async def delete_messages(self, *messages: RemoveMessage) -> None: ...
+
+    async def claim_messages(self, *messages: RemoveMessage) -> List[RemoveMessage]: ...
+
+    async def get_pin_messages(self) -> List[PinMessage]: ...
+
+    async def add_pin_message(self, chat_id: int, message_id: int, lang: str) -> None: ...
+
+    async def remove_pin_message(self, chat_id: int, message_id: int) -> None: ...
+
+    async def next_image_index(self, name: str, length: int) -> int: ...
+
+    async def flush(self) -> None: ...
 
 
 class CacheStorage(BaseModel):
@@ -71,20 +168,48 @@ class CacheStorage(BaseModel):
     Основной процесс записывает сообщения для удаления, фоновая задача их удаляет.
     Автоматически обрабатывает поврежденные или отсутствующие файлы.
 
+    Состояние хранится в двух файлах:
+    - снимок (cache.yaml) - полное состояние на момент последней компактификации;
+    - журнал (cache.journal) - JSON-строки с операциями, выполненными после снимка.
+
+    Каждое изменение дописывает в журнал одну строку, а снимок перезаписывается
+    только при компактификации (когда журнал вырастает до compact_threshold записей).
+    Записи журнала пронумерованы, снимок хранит номер последней примененной записи,
+    поэтому повторное применение журнала после сбоя безопасно.
+
+    Изменения пишутся на диск отложенно (write-behind): операции копятся в памяти
+    и сбрасываются в журнал фоновой задачей flush_cycle() не чаще раза в
+    flush_interval секунд, а также при остановке бота. При аварийном завершении
+    теряются изменения не более чем за flush_interval.
+
+    Сообщения для удаления хранятся в словаре по ключу (chat_id, message_id)
+    и в min-куче по времени создания (записи RemoveMessage сами упорядочены по
+    времени и кладутся в кучу без обертки). Время жизни у всех сообщений одинаковое,
+    поэтому порядок кучи совпадает с порядком дедлайнов удаления, и поиск
+    устаревших сообщений просматривает только их, а не весь список.
+
     Attributes:
-        remove_messages: Список сообщений для автоматического удаления
         help_pin_messages: Список закрепленных справочных сообщений
-        images_caches: File path - Telegram File ID
         image_index: Для ротации изображений соответсвие rotation_id - индекс в списке
         path: Путь к файлу кэша
     """
 
-    remove_messages: List[RemoveMessage] = Field(default_factory=list)
     help_pin_messages: List[PinMessage] = Field(default_factory=list)
-    images_caches: dict[str, str] = Field(default_factory=dict)
     image_index: dict[str, int] = Field(default_factory=dict)
     path: Path = Path("cache.yaml")
 
+    # Номер последней записи журнала и количество записей после последнего снимка
+    _journal_seq: int = PrivateAttr(default=0)
+    _journal_size: int = PrivateAttr(default=0)
+    _lock: asyncio.Lock = PrivateAttr(default_factory=asyncio.Lock)
+    # Сериализованные операции, еще не записанные в журнал (write-behind)
+    _pending: list[str] = PrivateAttr(default_factory=list)
+
+    # (chat_id, message_id) -> сообщение и куча тех же сообщений по времени создания.
+    # Удаленные из словаря записи остаются в куче и отбрасываются лениво.
+    _remove_index: dict[tuple[int, int], RemoveMessage] = PrivateAttr(default_factory=dict)
+    _remove_heap: list[RemoveMessage] = PrivateAttr(default_factory=list)
+
     def __init__(self, path: Optional[str | Path] = None, **data):
         """
         Инициализация кэша.
@@ -96,6 +221,11 @@ class CacheStorage(BaseModel):
         if path:
             self.path = Path(path)
 
+    @property
+    def journal_path(self) -> Path:
+        """Путь к журналу операций рядом с файлом снимка."""
+        return self.path.with_suffix(".journal")
+
     async def async_init(self):
         """Асинхронная инициализация - создание файла кэша, если он не существует."""
         logger = _get_logger()
@@ -124,10 +254,11 @@ class CacheStorage(BaseModel):
 
     async def load(self) -> None:
         """
-        Загрузить данные из файла кэша.
+        Загрузить данные из снимка и применить поверх него журнал операций.
 
         Если файл не существует - создает новый пустой.
         Если файл поврежден - создает бэкап и начинает с чистого листа.
+        После успешной загрузки журнал сворачивается в новый снимок.
         """
         logger = _get_logger()
 
@@ -140,29 +271,190 @@ class CacheStorage(BaseModel):
             # Асинхронное чтение файла
             async with aiofiles.open(self.path, "r", encoding="utf-8") as f:
                 content = await f.read()
-                data = yaml.safe_load(content) or {}
-
-            # Десериализация данных в модели Pydantic
-            self.remove_messages = [RemoveMessage(**m) for m in data.get("remove_messages", [])]
-            self.help_pin_messages = [PinMessage(**p) for p in data.get("pin_help_messages", [])]
-            self.images_caches = data.get("images_caches", {})
+                data = _snapshot_adapter.validate_python(yaml.load(content, Loader=_YamlLoader) or {})
+
+            # Проверенные словари превращаются в компактные записи
+            self._reset_remove_messages(
+                RemoveMessage(
+                    m["stamp"] if "stamp" in m else m["create_time"].timestamp(),
+                    m["chat_id"],
+                    m["message_id"]
+                )
+                for m in data.get("remove_messages", [])
+            )
+            self.help_pin_messages = [
+                PinMessage(p["chat_id"], p["message_id"], p["lang"]) for p in data.get("pin_help_messages", [])
+            ]
             self.image_index = data.get("image_index", {})
+            self._journal_seq = data.get("journal_seq", 0)
+
+            replayed = await self._replay_journal()
 
             logger.info(
-                f"Cache loaded: {len(self.remove_messages)} removable messages, "
-                f"{len(self.help_pin_messages)} pinned messages"
+                f"Cache loaded: {len(self._remove_index)} removable messages, "
+                f"{len(self.help_pin_messages)} pinned messages, "
+                f"{replayed} journal operations replayed"
             )
         except Exception as e:
-            # При любой ошибке - сохраняем поврежденный файл в бэкап
+            # При любой ошибке - сохраняем поврежденные файлы в бэкап
             backup_path = self._make_backup_path()
             shutil.move(self.path, backup_path)
+            if self.journal_path.exists():
+                shutil.move(self.journal_path, backup_path.with_suffix(".journal"))
             logger.error(f"Invalid cache file backed up to: {backup_path}", e)
 
             # Начинаем с пустого кэша
-            self.remove_messages = []
+            self._reset_remove_messages([])
             self.help_pin_messages = []
+            self.image_index = {}
+            self._journal_seq = 0
+
+        await self.save()
+
+    async def _replay_journal(self) -> int:
+        """
+        Применить к загруженному снимку операции из журнала.
+
+        Записи с номером не больше сохраненного в снимке пропускаются (они уже
+        учтены в снимке). Оборванная последняя строка (сбой во время записи)
+        отбрасывается.
+
+        Returns:
+            Количество примененных операций
+        """
+        logger = _get_logger()
+
+        if not self.journal_path.exists():
+            return 0
+
+        async with aiofiles.open(self.journal_path, "r", encoding="utf-8") as f:
+            lines = (await f.read()).splitlines()
+
+        replayed = 0
+        for i, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                if i == len(lines) - 1:
+                    logger.warning(f"Cache journal: dropping torn last record in {self.journal_path}")
+                    break
+                raise
+            if entry["seq"] <= self._journal_seq:
+                continue
+            self._apply(entry)
+            self._journal_seq = entry["seq"]
+            replayed += 1
+        return replayed
+
+    def _apply(self, entry: dict[str, Any]) -> None:
+        """
+        Применить к состоянию в памяти одну операцию журнала.
+
+        Args:
+            entry: Запись журнала с полем op и аргументами операции
+        """
+        match entry["op"]:
+            case "insert":
+                stamp = entry["stamp"] if "stamp" in entry else datetime.fromisoformat(entry["create_time"]).timestamp()
+                self._index_remove_message(RemoveMessage(stamp, entry["chat_id"], entry["message_id"]))
+            case "delete":
+                for chat_id, message_id in entry["keys"]:
+                    self._remove_index.pop((chat_id, message_id), None)
+                self._trim_remove_heap()
+            case "pin_add":
+                self.help_pin_messages.append(PinMessage(entry["chat_id"], entry["message_id"], entry["lang"]))
+            case "pin_remove":
+                self.help_pin_messages = [
+                    pin for pin in self.help_pin_messages
+                    if not (pin.chat_id == entry["chat_id"] and pin.message_id == entry["message_id"])
+                ]
+            case "image_set" | "image_remove":
+                # File ID изображений теперь хранятся в media_files (см. media_cache)
+                pass
+            case "index_set":
+                self.image_index[entry["name"]] = entry["index"]
+            case _:
+                raise ValueError(f"Unknown cache journal operation: {entry['op']}")
+
+    def _record(self, op: str, **args) -> None:
+        """
+        Поставить операцию в очередь на запись в журнал.
+
+        Диск не трогается: операция попадет в журнал при ближайшем flush().
+
+        Args:
+            op: Название операции
+            **args: Аргументы операции (должны сериализоваться в JSON)
+        """
+        self._journal_seq += 1
+        self._pending.append(json.dumps({"seq": self._journal_seq, "op": op, **args}, ensure_ascii=False))
+
+    @property
+    def dirty(self) -> bool:
+        """Есть ли изменения, еще не записанные на диск."""
+        return bool(self._pending)
+
+    async def flush(self) -> None:
+        """
+        Дописать накопленные операции в журнал одной записью.
+
+        Когда журнал достигает порога компактификации, он сворачивается в снимок.
+        Если изменений нет - ничего не делает.
+
+        Raises:
+            Exception: При ошибке записи журнала (операции остаются в очереди)
+        """
+        logger = _get_logger()
+
+        async with self._lock:
+            if not self._pending:
+                return
+            lines, self._pending = self._pending, []
+            try:
+                self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+                async with aiofiles.open(self.journal_path, "a", encoding="utf-8") as f:
+                    await f.write("\n".join(lines) + "\n")
+            except Exception as e:
+                self._pending = lines + self._pending
+                logger.error(f"Failed to append to cache journal {self.journal_path}", e)
+                raise
+            self._journal_size += len(lines)
+            need_compact = self._journal_size >= _get_compact_threshold()
+            logger.trace(f"Cache flushed {len(lines)} operation(s) to {self.journal_path}")
+
+        if need_compact:
             await self.save()
 
+    def _reset_remove_messages(self, messages) -> None:
+        """Заменить все сообщения для удаления и перестроить кучу за O(n)."""
+        self._remove_index = {(m.chat_id, m.message_id): m for m in messages}
+        self._remove_heap = list(self._remove_index.values())
+        heapq.heapify(self._remove_heap)
+
+    def _index_remove_message(self, msg: RemoveMessage) -> None:
+        """Добавить сообщение в словарь и кучу. Повторная вставка заменяет старую запись."""
+        self._remove_index[(msg.chat_id, msg.message_id)] = msg
+        heapq.heappush(self._remove_heap, msg)
+
+    def _is_live(self, entry: RemoveMessage) -> bool:
+        """Проверить, что запись кучи соответствует сообщению, которое еще лежит в словаре."""
+        return self._remove_index.get((entry.chat_id, entry.message_id)) == entry
+
+    def _trim_remove_heap(self) -> None:
+        """Выбросить с вершины кучи записи уже удаленных сообщений."""
+        heap = self._remove_heap
+        while heap and not self._is_live(heap[0]):
+            heapq.heappop(heap)
+        # Если мусора в глубине кучи стало больше, чем живых записей - перестраиваем
+        if len(heap) > 2 * len(self._remove_index) + 64:
+            self._reset_remove_messages(list(self._remove_index.values()))
+
+    async def get_remove_messages(self) -> List[RemoveMessage]:
+        """Все сообщения, ожидающие удаления (в произвольном порядке)."""
+        return list(self._remove_index.values())
+
     def _make_backup_path(self) -> Path:
         """
         Сгенерировать путь для бэкапа с временной меткой.
@@ -176,40 +468,59 @@ class CacheStorage(BaseModel):
 
     async def save(self) -> None:
         """
-        Сохранить текущее состояние кэша в YAML файл.
+        Свернуть журнал: сохранить полное состояние кэша в YAML и очистить журнал.
+
+        Снимок пишется во временный файл и атомарно подменяет старый через os.replace,
+        поэтому сбой во время записи не оставляет поврежденный снимок.
 
         Raises:
             Exception: При ошибке сохранения файла
         """
         logger = _get_logger()
 
-        try:
-            # Убеждаемся, что директория существует
-            self.path.parent.mkdir(parents=True, exist_ok=True)
-
-            # Сериализация данных в YAML
-            yaml_content = yaml.safe_dump(
-                {
-                    "remove_messages": [m.model_dump() for m in self.remove_messages],
-                    "pin_help_messages": [p.model_dump() for p in self.help_pin_messages],
-                    "images_caches": self.images_caches,
-                    "image_index": self.image_index,
-                },
-                allow_unicode=True,
-                sort_keys=False,
-                indent=2,
-            )
-
-            # Асинхронная запись в файл
-            async with aiofiles.open(self.path, "w", encoding="utf-8") as f:
-                await f.write(yaml_content)
-
-            logger.debug(f"Cache saved to {self.path}")
-        except Exception as e:
-            logger.error(f"Failed to save cache to {self.path}", e)
-            raise
-
-    async def insert_message(self, chat_id: int, message_id: int, stamp: Optional[datetime] = None) -> None:
+        async with self._lock:
+            try:
+                # Убеждаемся, что директория существует
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+
+                # Сериализация данных в YAML
+                yaml_content = yaml.dump(
+                    {
+                        "journal_seq": self._journal_seq,
+                        "remove_messages": [
+                            {"chat_id": m.chat_id, "message_id": m.message_id, "stamp": m.stamp}
+                            for m in self._remove_index.values()
+                        ],
+                        "pin_help_messages": [p._asdict() for p in self.help_pin_messages],
+                        "image_index": self.image_index,
+                    },
+                    Dumper=_YamlDumper,
+                    allow_unicode=True,
+                    sort_keys=False,
+                    indent=2,
+                )
+                # Операции, записанные в очередь во время await ниже, в снимок не попали
+                captured = len(self._pending)
+
+                # Асинхронная запись во временный файл и атомарная подмена снимка
+                tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+                async with aiofiles.open(tmp_path, "w", encoding="utf-8") as f:
+                    await f.write(yaml_content)
+                    await f.flush()
+                os.replace(tmp_path, self.path)
+
+                # Журнал и операции очереди до снимка учтены в снимке, более новые остаются в очереди
+                async with aiofiles.open(self.journal_path, "w", encoding="utf-8"):
+                    pass
+                self._journal_size = 0
+                del self._pending[:captured]
+
+                logger.debug(f"Cache saved to {self.path}")
+            except Exception as e:
+                logger.error(f"Failed to save cache to {self.path}", e)
+                raise
+
+    async def insert_message(self, chat_id: int, message_id: int, stamp: Optional[datetime] = None) -> RemoveMessage:
         """
         Добавить сообщение в список для автоматического удаления.
 
@@ -219,48 +530,60 @@ class CacheStorage(BaseModel):
             chat_id: ID чата с сообщением
             message_id: ID сообщения для удаления
             stamp: Время создания (если None - используется текущее время)
+
+        Returns:
+            Добавленное сообщение
         """
         logger = _get_logger()
 
-        if stamp is None:
-            stamp = _get_now()
-
-        msg = RemoveMessage(
-            chat_id=chat_id, message_id=message_id, create_time=stamp
-        )
-        self.remove_messages.append(msg)
+        msg = RemoveMessage(time.time() if stamp is None else stamp.timestamp(), chat_id, message_id)
+        self._index_remove_message(msg)
+        self._record("insert", chat_id=chat_id, message_id=message_id, stamp=msg.stamp)
         logger.debug(f"Inserted message: chat_id={chat_id}, message_id={message_id}")
+        return msg
 
-    def get_old_messages(self, delta: int) -> List[RemoveMessage]:
+    async def get_old_messages(self, delta: int) -> List[RemoveMessage]:
         """
         Получить все сообщения старше указанного количества секунд.
 
-        Используется фоновой задачей, которая раз в минуту проверяет устаревшие сообщения.
-e
+        Используется фоновой задачей, которая проверяет устаревшие сообщения.
+        Обходит только ту часть кучи, где лежат устаревшие записи: если узел
+        кучи еще свежий, то и все его потомки свежие, поэтому сложность O(k),
+        где k - количество устаревших сообщений.
+
         Args:
             delta: Возраст сообщения в секундах (например, 600 для удаления через 10 минут)
 
         Returns:
-            Список сообщений, которые нужно удалить
+            Список сообщений, которые нужно удалить (от старых к новым)
         """
         logger = _get_logger()
 
-        now = datetime.now(timezone.utc)
-        old_messages = [m for m in self.remove_messages if (now - m.create_time).total_seconds() > delta]
+        threshold = time.time() - delta
+        heap = self._remove_heap
+        old_messages: list[RemoveMessage] = []
+        stack = [0] if heap else []
+        while stack:
+            i = stack.pop()
+            if heap[i].stamp >= threshold:
+                continue
+            if self._is_live(heap[i]):
+                old_messages.append(heap[i])
+            stack.extend(child for child in (2 * i + 1, 2 * i + 2) if child < len(heap))
+        old_messages.sort()
 
         if old_messages:
             logger.debug(f"Found {len(old_messages)} old messages (delta={delta}s)")
 
         return old_messages
 
-    # Предполагается, что RemoveMessage — это dataclass или модель с полем message_id
-    # from python.storage.cache import RemoveMessage  # если нужно
-
     async def delete_messages(self, *messages: RemoveMessage) -> None:
         """
         Удалить сообщения из списка после их удаления в Telegram.
 
         Вызывается фоновой задачей после успешного удаления сообщений.
+        Сообщения идентифицируются парой (chat_id, message_id), так как
+        message_id в разных чатах могут совпадать.
 
         Args:
             *messages: Объекты RemoveMessage, которые нужно удалить из кэша
@@ -270,25 +593,38 @@ e
         if not messages:
             return
 
-        # Преобразуем в set для быстрого поиска (по message_id)
-        message_ids_to_remove = {msg.message_id for msg in messages}
-        initial_count = len(self.remove_messages)
+        removed_keys = []
+        for msg in messages:
+            if self._remove_index.pop(msg.key, None) is not None:
+                removed_keys.append(msg.key)
+        self._trim_remove_heap()
 
-        # Фильтруем список, оставляя только те, которых нет в переданных
-        self.remove_messages = [
-            m for m in self.remove_messages
-            if m.message_id not in message_ids_to_remove
-        ]
-        deleted_count = initial_count - len(self.remove_messages)
+        if removed_keys:
+            self._record("delete", keys=removed_keys)
+            logger.info(f"Deleted {len(removed_keys)} messages: {removed_keys}", messages)
+        else:
+            incoming_keys = [msg.key for msg in messages]
+            logger.warning(f"No messages found to delete: {incoming_keys}", messages)
 
-        await self.save()
+    async def claim_messages(self, *messages: RemoveMessage) -> List[RemoveMessage]:
+        """
+        Забрать сообщения на удаление: убрать их из списка и вернуть те, что в нем были.
 
-        if deleted_count > 0:
-            removed_ids = [msg.message_id for msg in messages]
-            logger.info(f"Deleted {deleted_count} messages: {removed_ids}", messages)
-        else:
-            incoming_ids = [msg.message_id for msg in messages]
-            logger.warning(f"No messages found to delete: {incoming_ids}", messages)
+        Args:
+            *messages: Сообщения, которые планировщик собирается удалить в Telegram
+
+        Returns:
+            Сообщения, которые были в списке (их и нужно удалять)
+        """
+        claimed = [msg for msg in messages if self._remove_index.pop(msg.key, None) is not None]
+        if claimed:
+            self._trim_remove_heap()
+            self._record("delete", keys=[msg.key for msg in claimed])
+        return claimed
+
+    async def get_pin_messages(self) -> List[PinMessage]:
+        """Все закрепленные справочные сообщения."""
+        return list(self.help_pin_messages)
 
     async def add_pin_message(self, chat_id: int, message_id: int, lang: str) -> None:
         """
@@ -310,10 +646,8 @@ e
                 logger.debug(f"Pin message already exists: chat_id={chat_id}, message_id={message_id}")
                 return
 
-        self.help_pin_messages.append(PinMessage(
-            chat_id=chat_id, message_id=message_id, lang=lang
-        ))
-        await self.save()
+        self.help_pin_messages.append(PinMessage(chat_id, message_id, lang))
+        self._record("pin_add", chat_id=chat_id, message_id=message_id, lang=lang)
         logger.info(f"Added pin message: chat_id={chat_id}, message_id={message_id}, lang={lang}")
 
     async def remove_pin_message(self, chat_id: int, message_id: int) -> None:
@@ -337,19 +671,35 @@ e
         ]
         removed = initial_count - len(self.help_pin_messages)
 
-        await self.save()
-
         if removed > 0:
+            self._record("pin_remove", chat_id=chat_id, message_id=message_id)
             logger.info(f"Removed pin message: chat_id={chat_id}, message_id={message_id}")
         else:
             logger.warning(f"Pin message not found: chat_id={chat_id}, message_id={message_id}")
 
+    async def next_image_index(self, name: str, length: int) -> int:
+        """
+        Сдвинуть индекс ротации изображений на следующий элемент.
+
+        Args:
+            name: Идентификатор цикла ротации
+            length: Количество изображений в цикле
+
+        Returns:
+            Новый индекс в списке изображений цикла
+        """
+        index = (self.image_index.get(name, 0) + 1) % length
+        self.image_index[name] = index
+        self._record("index_set", name=name, index=index)
+        return index
+
 
 async def init_cache():
     """
     Инициализировать глобальный экземпляр кэша.
 
     Должна быть вызвана при старте приложения перед использованием кэша.
+    Бэкенд выбирается параметром cache.backend: "file" (по умолчанию) или "redis".
 
     Raises:
         Exception: При ошибке загрузки кэша
@@ -357,13 +707,35 @@ async def init_cache():
     global cache
     logger = _get_logger()
     logger.info("Initializing cache storage")
+    from python.storage.config import config
     try:
-        cache = await CacheStorage.from_file("storage/cache.yaml")
+        if config and config.cache.backend == "redis":
+            from python.storage.redis_cache import RedisCacheStorage
+            from python.storage import redis_client
+            cache = await RedisCacheStorage.connect(redis_client.get_client(), config.cache.redis_prefix)
+        else:
+            cache = await CacheStorage.from_file("storage/cache.yaml")
         logger.info("Cache storage initialized successfully")
     except Exception as e:
         logger.error("Failed to initialize cache storage", e)
         raise
 
 
+async def flush_cycle() -> None:
+    """
+    Фоновая задача отложенной записи кэша.
+
+    Раз в flush_interval секунд сбрасывает накопленные изменения на диск,
+    поэтому любое количество изменений за интервал стоит одной записи.
+    """
+    logger = _get_logger()
+    while True:
+        await asyncio.sleep(_get_flush_interval())
+        try:
+            await cache.flush()
+        except Exception as e:
+            logger.error("Failed to flush cache", e)
+
+
 # Глобальный экземпляр кэша (инициализируется через init_cache())
-cache: Optional[CacheStorage] = None
+cache: Optional[CacheBackend] = None
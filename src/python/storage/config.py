@@ -23,6 +23,10 @@ class DatabaseConfig(BaseModel):
         database: Название базы данных
         min_pool_size: Минимальный размер пула соединений
         max_pool_size: Максимальный размер пула соединений
+        prepare_threshold: После скольких выполнений запрос становится prepared statement
+            (None - отключить, например за PgBouncer в режиме transaction)
+        acquire_warning_ms: Ожидание соединения из пула дольше этого значения логируется как предупреждение
+        slow_query_ms: Запросы дольше этого значения пишутся в JSON-лог (None - не писать)
     """
     host: str = Field(default="postgres")
     port: int = Field(default=5432)
@@ -31,6 +35,9 @@ class DatabaseConfig(BaseModel):
     database: str = Field(default="mydatabase")
     min_pool_size: int = Field(default=2)
     max_pool_size: int = Field(default=10)
+    prepare_threshold: int | None = Field(default=5)
+    acquire_warning_ms: float = Field(default=200)
+    slow_query_ms: float | None = Field(default=250)
 
 
 class AdminTopics(BaseModel):
@@ -116,12 +123,31 @@ class AnecdoteConfig(BaseModel):
         buffer_size: Размер буфера предгенерированных анекдотов
         buffer_check_time: Интервал проверки буфера в секундах
         antiflood_time: Антифлуд - минимальное время между запросами в секундах
+        prefetch_size: Сколько готовых анекдотов держать в памяти для мгновенной выдачи /kek
+        prefetch_low_water: При стольких оставшихся в памяти анекдотах очередь пополняется из БД
+        wait_timeout: Сколько секунд /kek ждет анекдот, если очередь пуста
+        fetch_concurrency: Сколько страниц baneks.ru загружается параллельно при пополнении буфера
+        rewrite_concurrency: Сколько запросов к Gemini выполняется параллельно
+        rewrite_batch_size: Сколько анекдотов переписывается одним запросом к Gemini (1 - без пакетов)
+        insert_concurrency: Сколько анекдотов параллельно сохраняется в БД
+        host_rate_limits: Не больше стольких запросов в секунду к каждому внешнему хосту
     """
     enabled: bool = Field(default=False)
     gemini_token: str = Field(default="your_gemini_token_here")
     buffer_size: int = Field(default=30)
     buffer_check_time: int = Field(default=30)
     antiflood_time: int = Field(default=30)
+    prefetch_size: int = Field(default=5)
+    prefetch_low_water: int = Field(default=2)
+    wait_timeout: float = Field(default=20)
+    fetch_concurrency: int = Field(default=4)
+    rewrite_concurrency: int = Field(default=2)
+    rewrite_batch_size: int = Field(default=5)
+    insert_concurrency: int = Field(default=1)
+    host_rate_limits: dict[str, float] = Field(default_factory=lambda: {
+        "baneks.ru": 4.0,
+        "generativelanguage.googleapis.com": 0.5,
+    })
 
 
 class RedisConfig(BaseModel):
@@ -185,6 +211,49 @@ class BlacklistedChat(BaseModel):
     topics: list[int | None] | None = Field(default=None)
 
 
+class CacheConfig(BaseModel):
+    """
+    Конфигурация файлового кэша (storage/cache.yaml).
+
+    Каждое изменение кэша дописывается одной строкой в журнал операций,
+    а полный снимок YAML перезаписывается только при компактификации.
+    Запись на диск отложенная: изменения копятся в памяти и сбрасываются пачкой.
+
+    Для запуска нескольких реплик бота кэш можно хранить в Redis (backend: redis),
+    тогда используется адрес из redis_config.
+
+    Attributes:
+        backend: Хранилище кэша - "file" (storage/cache.yaml) или "redis"
+        redis_prefix: Префикс ключей кэша в Redis
+        flush_interval: Интервал в секундах между сбросами изменений на диск (окно возможной потери данных)
+        compact_threshold: Количество записей в журнале, после которого журнал сворачивается в снимок
+    """
+    backend: str = Field(default="file")
+    redis_prefix: str = Field(default="csohelper:cache")
+    flush_interval: float = Field(default=5.0)
+    compact_threshold: int = Field(default=1000)
+
+
+class MediaConfig(BaseModel):
+    """
+    Конфигурация медиафайлов: загрузка изображений в Telegram и хранилище файлов.
+
+    Если включен прогрев, при старте бот заранее загружает картинки эхо-команд
+    в отдельный служебный чат, чтобы первый пользователь после холодного старта
+    не ждал загрузки.
+
+    Attributes:
+        warmup_enabled: Загружать ли изображения эхо-команд при старте
+        warmup_chat_id: Чат для загрузки; без него прогрев не запускается
+        warmup_concurrency: Сколько изображений загружать одновременно
+        store_dir: Каталог хранилища фото и видео (файлы адресуются SHA-256 содержимого)
+    """
+    warmup_enabled: bool = Field(default=False)
+    warmup_chat_id: int | None = Field(default=None)
+    warmup_concurrency: int = Field(default=3)
+    store_dir: str = Field(default="storage/media")
+
+
 class MonitoringConfig(BaseModel):
     back_hours: int = Field(default=4)
     interval_minutes: int = Field(default=20)
@@ -206,6 +275,8 @@ class AppConfig(BaseModel):
         chat_config: Настройки чатов бота
         refuser: Настройки системы заявок
         blacklisted: Список заблокированных чатов/топиков
+        cache: Настройки файлового кэша
+        media: Настройки загрузки изображений
     """
     timezone: str | None = Field(default=None, description="Using timezone instead of ENV \"TZ\"")
     logger: LoggerConfig = Field(default_factory=LoggerConfig)
@@ -217,6 +288,8 @@ class AppConfig(BaseModel):
     refuser: RefuserConfig = Field(default_factory=RefuserConfig)
     blacklisted: list[BlacklistedChat] = Field(default_factory=list)
     monitoring: MonitoringConfig = Field(default_factory=MonitoringConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    media: MediaConfig = Field(default_factory=MediaConfig)
 
 
 # Путь к файлу конфигурации
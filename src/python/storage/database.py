@@ -1,10 +1,28 @@
+import re
+import sys
+import time
 from contextlib import asynccontextmanager
-from psycopg_pool import AsyncConnectionPool
+from dataclasses import dataclass
+from functools import lru_cache
+
+from psycopg import AsyncCursor
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
 
 import python.logger
+from python import metrics
 
 db_pool: AsyncConnectionPool | None = None
 
+# Модули, кадры которых пропускаются при поиске вызывающей функции
+_SKIP_CALLER_MODULES = {__name__, "contextlib"}
+
+# Порог медленного запроса, задается из конфига при открытии пула (None - не логировать)
+slow_query_ms: float | None = None
+
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s")
+_VALUES_LIST_PATTERN = re.compile(r"\(\?(?:, \?)*\)(?:, \(\?(?:, \?)*\))+")
+_IN_LIST_PATTERN = re.compile(r"\(\?(?:, \?)+\)")
+
 
 def logger():
     return python.logger.logger
@@ -22,8 +40,13 @@ async def open_database_pool() -> None:
         conninfo=conninfo,
         min_size=config.database.min_pool_size,
         max_size=config.database.max_pool_size,
+        # Запросы, выполненные prepare_threshold раз (или с prepare=True), становятся
+        # именованными prepared statements этого соединения
+        kwargs={"prepare_threshold": config.database.prepare_threshold, "cursor_factory": TimedCursor},
         open=False
     )
+    global slow_query_ms
+    slow_query_ms = config.database.slow_query_ms
     await db_pool.open()
     await test_database_connection()
     logger().info("Database: DB connection pool started")
@@ -35,14 +58,166 @@ async def close_database_pool() -> None:
         logger().info("Database: DB connection pool closed")
 
 
+def _caller() -> str:
+    """Имя функции, запросившей соединение, в виде модуль.функция."""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_globals.get("__name__") in _SKIP_CALLER_MODULES:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    module = frame.f_globals.get("__name__", "?").rsplit(".", 1)[-1]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+@lru_cache(maxsize=1024)
+def query_fingerprint(query: str) -> str:
+    """
+    Нормализованный вид запроса для агрегации статистики.
+
+    Пробелы схлопываются, литералы и плейсхолдеры заменяются на ?,
+    списки VALUES из нескольких строк и списки IN - на одну группу,
+    так что запросы, отличающиеся только параметрами, дают один отпечаток.
+    """
+    fingerprint = " ".join(query.split())
+    fingerprint = _LITERAL_PATTERN.sub("?", fingerprint)
+    fingerprint = _VALUES_LIST_PATTERN.sub("(...), ...", fingerprint)
+    return _IN_LIST_PATTERN.sub("(...)", fingerprint)
+
+
+class TimedCursor(AsyncCursor):
+    """
+    Курсор, замеряющий каждый запрос.
+
+    Длительность попадает в гистограмму db_query_ms с меткой query (отпечаток запроса),
+    запросы дольше slow_query_ms пишутся в JSON-лог с замаскированными параметрами.
+    В pipeline-режиме execute только отправляет запрос, поэтому время там - время отправки.
+    """
+
+    async def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            _observe_query(query, params, started)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().executemany(query, params_seq, **kwargs)
+        finally:
+            _observe_query(query, (), started)
+
+
+def _observe_query(query, params, started: float) -> None:
+    duration_ms = (time.perf_counter() - started) * 1000
+    if not isinstance(query, str):
+        query = query.decode() if isinstance(query, bytes) else str(query)
+    fingerprint = query_fingerprint(query)
+    metrics.histogram("db_query_ms", {"query": fingerprint}).observe(duration_ms)
+    if slow_query_ms is not None and duration_ms > slow_query_ms:
+        args = params if isinstance(params, (tuple, list, dict)) else ()
+        logger().slow_db(query, args, duration_ms=duration_ms, fingerprint=fingerprint)
+
+
+@dataclass(frozen=True, slots=True)
+class QueryStats:
+    """
+    Статистика по одному отпечатку запроса.
+
+    Attributes:
+        fingerprint: Нормализованный текст запроса
+        count: Количество выполнений
+        total_ms: Суммарное время
+        p50_ms: Медиана (оценка по корзинам гистограммы)
+        p95_ms: 95-й перцентиль (оценка по корзинам гистограммы)
+        max_ms: Максимальное время
+    """
+    fingerprint: str
+    count: int
+    total_ms: float
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+
+
+def get_query_stats() -> list[QueryStats]:
+    """Статистика запросов по отпечаткам, самые затратные (по суммарному времени) первыми."""
+    stats = [
+        QueryStats(
+            fingerprint=dict(labels).get("query", "?"),
+            count=hist.count,
+            total_ms=hist.total,
+            p50_ms=hist.quantile(0.5),
+            p95_ms=hist.quantile(0.95),
+            max_ms=hist.max,
+        )
+        for labels, hist in metrics.histograms("db_query_ms").items()
+    ]
+    stats.sort(key=lambda item: item.total_ms, reverse=True)
+    return stats
+
+
 @asynccontextmanager
 async def get_db_connection():
+    """
+    Взять соединение из пула.
+
+    Собирает метрики пула: время ожидания соединения (db_pool_acquire_ms),
+    время удержания по вызывающей функции (db_pool_hold_ms), количество
+    выдач и таймаутов. Если ожидание дольше database.acquire_warning_ms,
+    пишет предупреждение.
+    """
     if db_pool is None:
         logger().error("Database: Pool is not initialized. Call open_database_pool first.")
         # В реальном приложении лучше вызвать исключение, а не exit(1)
         raise RuntimeError("Database pool not initialized.")
-    async with db_pool.connection() as conn:
-        yield conn
+    caller = _caller()
+    started = time.perf_counter()
+    try:
+        async with db_pool.connection() as conn:
+            acquired = time.perf_counter()
+            wait_ms = (acquired - started) * 1000
+            metrics.histogram("db_pool_acquire_ms").observe(wait_ms)
+            metrics.inc("db_pool_checkouts_total")
+            from .config import config
+            if wait_ms > config.database.acquire_warning_ms:
+                stats = db_pool.get_stats()
+                logger().warning(
+                    f"Database: {caller} waited {wait_ms:.0f} ms for a connection "
+                    f"(pool size {stats.get('pool_size')}, available {stats.get('pool_available')}, "
+                    f"waiting {stats.get('requests_waiting')})"
+                )
+            try:
+                yield conn
+            finally:
+                metrics.histogram("db_pool_hold_ms", {"caller": caller}).observe(
+                    (time.perf_counter() - acquired) * 1000
+                )
+    except PoolTimeout:
+        metrics.inc("db_pool_timeouts_total")
+        logger().error(f"Database: {caller} timed out waiting for a connection")
+        raise
+
+
+def get_pool_stats() -> dict[str, int]:
+    """Текущее состояние пула от psycopg_pool (размер, свободные соединения, очередь и т.д.)."""
+    if db_pool is None:
+        return {}
+    return db_pool.get_stats()
+
+
+@asynccontextmanager
+async def get_db_pipeline():
+    """
+    Соединение в pipeline-режиме для единицы работы из нескольких запросов.
+
+    Запросы отправляются на сервер, не дожидаясь ответа на предыдущие,
+    поэтому несколько запросов и commit стоят одного обмена с сервером.
+    Чтение результата (fetchone и т.п.) дожидается ответов на все отправленные запросы.
+    """
+    async with get_db_connection() as conn:
+        async with conn.pipeline():
+            yield conn
 
 
 async def test_database_connection():
@@ -0,0 +1,104 @@
+"""
+Хранилище медиафайлов (фото услуг и резидентов, вложения анкет хайпа).
+
+Файлы лежат в каталоге media.store_dir и адресуются SHA-256 содержимого:
+в БД хранится только ссылка (hex-дайджест), одинаковые файлы хранятся один раз.
+Файл пишется потоково во временный файл и атомарно переносится на место,
+поэтому недописанный файл никогда не виден по ссылке.
+"""
+import hashlib
+import re
+import uuid
+from pathlib import Path
+
+import aiofiles
+import aiofiles.os
+from aiogram.types import FSInputFile
+
+from python.storage import config as config_module
+
+_REF_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _root() -> Path:
+    return Path(config_module.config.media.store_dir)
+
+
+def is_ref(value: str | None) -> bool:
+    """Является ли значение ссылкой на файл хранилища (а не, например, старой base64-строкой)."""
+    return bool(value) and _REF_PATTERN.match(value) is not None
+
+
+def path(ref: str) -> Path:
+    """Путь к файлу по ссылке: <store_dir>/ab/abcdef..."""
+    if not is_ref(ref):
+        raise ValueError(f"Invalid media reference: {ref[:16]!r}")
+    return _root() / ref[:2] / ref
+
+
+def input_file(ref: str, filename: str | None = None) -> FSInputFile:
+    """Файл для отправки в Telegram: aiogram читает его с диска по частям."""
+    return FSInputFile(path(ref), filename=filename)
+
+
+class BlobWriter:
+    """
+    Потоковая запись файла в хранилище.
+
+    Использование:
+        async with media_store.BlobWriter() as writer:
+            async for chunk in response.content.iter_chunked(...):
+                await writer.write(chunk)
+        ref = writer.ref
+
+    Если блок завершился исключением, временный файл удаляется.
+
+    Attributes:
+        ref: Ссылка на записанный файл (доступна после выхода из блока)
+        size: Количество записанных байт
+    """
+
+    def __init__(self):
+        self.ref: str | None = None
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._tmp_path = _root() / "tmp" / uuid.uuid4().hex
+        self._file = None
+
+    async def __aenter__(self) -> "BlobWriter":
+        await aiofiles.os.makedirs(self._tmp_path.parent, exist_ok=True)
+        self._file = await aiofiles.open(self._tmp_path, "wb")
+        return self
+
+    async def write(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        await self._file.write(chunk)
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self._file.close()
+        if exc_type is not None:
+            await aiofiles.os.remove(self._tmp_path)
+            return
+        ref = self._hash.hexdigest()
+        target = path(ref)
+        if await aiofiles.os.path.exists(target):
+            # Такое содержимое уже есть в хранилище
+            await aiofiles.os.remove(self._tmp_path)
+        else:
+            await aiofiles.os.makedirs(target.parent, exist_ok=True)
+            await aiofiles.os.replace(self._tmp_path, target)
+        self.ref = ref
+
+
+async def put_bytes(data: bytes) -> str:
+    """
+    Сохранить содержимое в хранилище.
+
+    Returns:
+        Ссылка на файл
+    """
+    async with BlobWriter() as writer:
+        await writer.write(data)
+    return writer.ref
+
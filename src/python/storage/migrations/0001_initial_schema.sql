@@ -0,0 +1,88 @@
+-- Таблицы, которые раньше создавал init_database_module каждого репозитория.
+-- IF NOT EXISTS - чтобы миграция применялась и к уже существующим базам.
+
+CREATE TABLE IF NOT EXISTS users
+(
+    id       SERIAL PRIMARY KEY,
+    user_id  BIGINT NOT NULL UNIQUE,
+    username TEXT   NOT NULL,
+    fullname TEXT   NOT NULL,
+    lang     TEXT
+);
+
+CREATE TABLE IF NOT EXISTS residents
+(
+    id                    SERIAL PRIMARY KEY,
+    user_id               BIGINT    NOT NULL UNIQUE,
+    username              TEXT,
+    fullname              TEXT      NOT NULL,
+    name                  TEXT      NOT NULL,
+    surname               TEXT      NOT NULL,
+    room                  INTEGER,
+    image                 TEXT,
+    status                TEXT               DEFAULT 'moderation',
+    processed_by          BIGINT,
+    processed_by_fullname TEXT,
+    processed_by_username TEXT,
+    refuse_reason         TEXT,
+    created_at            TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    lang                  TEXT
+);
+
+CREATE TABLE IF NOT EXISTS requests
+(
+    id           SERIAL PRIMARY KEY,
+    user_id      BIGINT    NOT NULL UNIQUE,
+    created_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    processed    BOOLEAN   NOT NULL DEFAULT FALSE,
+    greeting_msg INTEGER,
+    lang         TEXT
+);
+
+CREATE TABLE IF NOT EXISTS services
+(
+    id          SERIAL PRIMARY KEY,
+    directory   TEXT           NOT NULL DEFAULT '/',
+    name        TEXT           NOT NULL,
+    cost        NUMERIC(10, 2) NOT NULL,
+    cost_per    TEXT           NOT NULL,
+    description TEXT                    DEFAULT NULL,
+    owner       BIGINT         NOT NULL,
+    image       TEXT                    DEFAULT NULL,
+    status      TEXT                    DEFAULT 'moderation'
+);
+
+CREATE TABLE IF NOT EXISTS anecdotes
+(
+    id          SERIAL PRIMARY KEY,
+    anecdote_id INTEGER NOT NULL UNIQUE,
+    original    TEXT,
+    text        TEXT,
+    used        BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS hype_forms
+(
+    id          SERIAL PRIMARY KEY,
+    userid      BIGINT NOT NULL,
+    username    TEXT,
+    phone       TEXT,
+    vcard       TEXT,
+    fullname    TEXT   NOT NULL,
+    description TEXT
+);
+
+CREATE TABLE IF NOT EXISTS hype_photos
+(
+    id      SERIAL PRIMARY KEY,
+    form_id INT  NOT NULL REFERENCES hype_forms (id) ON DELETE CASCADE,
+    media   TEXT NOT NULL,
+    mime    TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS media_files
+(
+    sha256      TEXT PRIMARY KEY,
+    file_id     TEXT      NOT NULL,
+    uploaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,13 @@
+-- join_refuser: pop_unprocessed_requests_older_than ищет только необработанные заявки
+CREATE INDEX IF NOT EXISTS requests_unprocessed_created_at_idx
+    ON requests (created_at)
+    WHERE NOT processed;
+
+-- Услуги выбираются по папке и статусу публикации
+CREATE INDEX IF NOT EXISTS services_directory_status_idx
+    ON services (directory, status);
+
+-- poll_anecdote и count_unused_anecdotes работают только с неиспользованными анекдотами
+CREATE INDEX IF NOT EXISTS anecdotes_unused_id_idx
+    ON anecdotes (id)
+    WHERE NOT used;
@@ -0,0 +1,68 @@
+"""
+Перенос фото и видео из base64-строк в БД в хранилище медиафайлов (media_store).
+
+В колонках services.image, residents.image и hype_photos.media вместо base64
+остаются ссылки на файлы. Строки читаются пачками по ключу, поэтому в памяти
+одновременно находится не больше MIGRATION_BATCH_SIZE файлов.
+"""
+import base64
+
+from python import logger as logger_module
+from python.storage import media_store
+
+MIGRATION_BATCH_SIZE = 50
+
+# Таблица -> колонка с медиафайлом
+MEDIA_COLUMNS = (
+    ("services", "image"),
+    ("residents", "image"),
+    ("hype_photos", "media"),
+)
+
+
+async def _migrate_column(cur, table: str, column: str) -> int:
+    moved = 0
+    last_id = 0
+    while True:
+        query = f"""
+                SELECT id, {column}
+                FROM {table}
+                WHERE id > %s AND {column} IS NOT NULL
+                ORDER BY id
+                LIMIT %s \
+                """
+        values = (last_id, MIGRATION_BATCH_SIZE)
+        logger_module.logger.trace_db(query, values)
+        await cur.execute(query, values)
+        rows = await cur.fetchall()
+        if not rows:
+            return moved
+
+        updates = []
+        for row_id, value in rows:
+            last_id = row_id
+            if media_store.is_ref(value):
+                continue
+            ref = await media_store.put_bytes(base64.b64decode(value))
+            updates.append((ref, row_id))
+
+        if updates:
+            query = f"UPDATE {table} SET {column} = %s WHERE id = %s"
+            for values in updates:
+                logger_module.logger.trace_db(query, values)
+            await cur.executemany(query, updates)
+            moved += len(updates)
+
+
+async def apply(conn, cur) -> None:
+    for table, column in MEDIA_COLUMNS:
+        moved = await _migrate_column(cur, table, column)
+        logger_module.logger.info(f"Media store migration: moved {moved} files from {table}.{column}")
+
+    query = """
+            COMMENT ON COLUMN services.image IS 'media_store reference (sha256)';
+            COMMENT ON COLUMN residents.image IS 'media_store reference (sha256)';
+            COMMENT ON COLUMN hype_photos.media IS 'media_store reference (sha256)'
+            """
+    logger_module.logger.trace_db(query)
+    await cur.execute(query, prepare=False)
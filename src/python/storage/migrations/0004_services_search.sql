@@ -0,0 +1,19 @@
+-- Поиск по каталогу услуг (/services <запрос> и inline-режим):
+-- полнотекстовый по name и description и триграммный по name для опечаток.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE services
+    ADD COLUMN IF NOT EXISTS search TSVECTOR
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('russian', name), 'A') ||
+            setweight(to_tsvector('russian', COALESCE(description, '')), 'B')
+        ) STORED;
+
+-- Ищутся только опубликованные услуги
+CREATE INDEX IF NOT EXISTS services_search_idx
+    ON services USING GIN (search)
+    WHERE status = 'published';
+
+CREATE INDEX IF NOT EXISTS services_name_trgm_idx
+    ON services USING GIN (name gin_trgm_ops)
+    WHERE status = 'published';
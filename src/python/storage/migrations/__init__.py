@@ -0,0 +1,121 @@
+"""
+Версионированные миграции схемы БД.
+
+Миграции - файлы NNNN_описание.sql или NNNN_описание.py в этом каталоге, применяются
+по порядку номеров. Python-миграция - модуль с функцией async apply(conn, cur) для
+преобразований, которые нельзя выразить в SQL (например, перенос данных в файлы).
+Номер последней примененной миграции хранится в таблице schema_version, поэтому
+при актуальной схеме старт бота не выполняет ни одного DDL-запроса.
+"""
+import importlib
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from python import logger as logger_module
+from python.storage import database
+
+MIGRATIONS_DIR = Path(__file__).parent
+# Ключ advisory-блокировки: реплики, стартующие одновременно, применяют миграции по очереди
+MIGRATION_LOCK_KEY = 0x63736f68
+
+_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.(sql|py)$")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+
+def list_migrations() -> list[Migration]:
+    """Все файлы миграций, отсортированные по номеру."""
+    migrations = []
+    for path in MIGRATIONS_DIR.iterdir():
+        match = _FILE_PATTERN.match(path.name)
+        if match:
+            migrations.append(Migration(version=int(match.group(1)), name=match.group(2), path=path))
+    migrations.sort(key=lambda migration: migration.version)
+    return migrations
+
+
+async def _current_version(cur) -> int:
+    query = "SELECT to_regclass('schema_version') IS NOT NULL"
+    logger_module.logger.trace_db(query)
+    await cur.execute(query)
+    if not (await cur.fetchone())[0]:
+        return 0
+    query = "SELECT COALESCE(MAX(version), 0) FROM schema_version"
+    logger_module.logger.trace_db(query)
+    await cur.execute(query)
+    return (await cur.fetchone())[0]
+
+
+async def _apply(migration: Migration, conn, cur) -> None:
+    if migration.path.suffix == ".py":
+        module = importlib.import_module(f"{__name__}.{migration.path.stem}")
+        await module.apply(conn, cur)
+        return
+    query = migration.path.read_text(encoding="utf-8")
+    logger_module.logger.trace_db(query)
+    await cur.execute(query, prepare=False)
+
+
+async def migrate() -> None:
+    """
+    Применить все миграции новее текущей версии схемы.
+
+    Каждая миграция выполняется в отдельной транзакции вместе с записью
+    в schema_version, так что упавшая миграция не оставляет схему наполовину
+    обновленной и будет повторена при следующем старте.
+
+    Raises:
+        Exception: При ошибке применения миграции
+    """
+    migrations = list_migrations()
+    latest = migrations[-1].version if migrations else 0
+
+    async with database.get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            current = await _current_version(cur)
+            await conn.commit()
+            if current >= latest:
+                logger_module.logger.info(f"Database schema is up to date (version {current})")
+                return
+
+            query = "SELECT pg_advisory_lock(%s)"
+            await cur.execute(query, (MIGRATION_LOCK_KEY,))
+            try:
+                query = """
+                        CREATE TABLE IF NOT EXISTS schema_version
+                        (
+                            version    INTEGER PRIMARY KEY,
+                            name       TEXT      NOT NULL,
+                            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                        ) \
+                        """
+                logger_module.logger.trace_db(query)
+                await cur.execute(query)
+                # Пока ждали блокировку, миграции могла применить другая реплика
+                current = await _current_version(cur)
+                await conn.commit()
+
+                for migration in migrations:
+                    if migration.version <= current:
+                        continue
+                    logger_module.logger.info(f"Applying database migration {migration.version}: {migration.name}")
+                    await _apply(migration, conn, cur)
+                    query = "INSERT INTO schema_version (version, name) VALUES (%s, %s)"
+                    values = (migration.version, migration.name)
+                    logger_module.logger.trace_db(query, values)
+                    await cur.execute(query, values)
+                    await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            finally:
+                await cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+                await conn.commit()
+
+    logger_module.logger.info(f"Database schema migrated from version {current} to {latest}")
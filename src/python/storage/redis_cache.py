@@ -0,0 +1,196 @@
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from redis.asyncio import Redis
+
+from python.storage.cache import RemoveMessage, PinMessage, _get_logger
+
+
+class RedisCacheStorage:
+    """
+    Хранилище кэша в Redis для запуска нескольких реплик бота.
+
+    Все реплики видят одни и те же индексы ротации и сообщения
+    для удаления. Структуры в Redis (prefix - параметр cache.redis_prefix):
+    - {prefix}:image_index - hash: имя цикла -> счетчик ротации (HINCRBY, атомарно)
+    - {prefix}:remove - sorted set: "chat_id:message_id" со score = время создания
+    - {prefix}:pins - hash: "chat_id:message_id" -> язык справки
+
+    Каждая операция сразу пишется в Redis, поэтому flush() ничего не делает.
+    """
+
+    def __init__(self, redis: Redis, prefix: str = "csohelper:cache"):
+        self._redis = redis
+        self._index_key = f"{prefix}:image_index"
+        self._remove_key = f"{prefix}:remove"
+        self._pins_key = f"{prefix}:pins"
+
+    @staticmethod
+    async def connect(redis: Redis, prefix: str = "csohelper:cache") -> "RedisCacheStorage":
+        """
+        Создать кэш поверх существующего клиента Redis и проверить соединение.
+
+        Args:
+            redis: Клиент Redis (общий с FSM, см. redis_client.get_client)
+            prefix: Префикс ключей кэша
+
+        Returns:
+            Готовый экземпляр RedisCacheStorage
+        """
+        logger = _get_logger()
+        await redis.ping()
+        storage = RedisCacheStorage(redis, prefix)
+        logger.info(
+            f"Redis cache connected: {await redis.zcard(storage._remove_key)} removable messages, "
+            f"{await redis.hlen(storage._pins_key)} pinned messages"
+        )
+        return storage
+
+    @staticmethod
+    def _member(chat_id: int, message_id: int) -> str:
+        return f"{chat_id}:{message_id}"
+
+    @staticmethod
+    def _parse_member(member: str | bytes) -> tuple[int, int]:
+        # Клиент общий с FSM и может быть создан без decode_responses
+        if isinstance(member, bytes):
+            member = member.decode()
+        chat_id, message_id = member.split(":")
+        return int(chat_id), int(message_id)
+
+    def _to_remove_message(self, member: str, score: float) -> RemoveMessage:
+        chat_id, message_id = self._parse_member(member)
+        return RemoveMessage(score, chat_id, message_id)
+
+    async def insert_message(self, chat_id: int, message_id: int, stamp: Optional[datetime] = None) -> RemoveMessage:
+        """
+        Добавить сообщение в sorted set для автоматического удаления.
+
+        Args:
+            chat_id: ID чата с сообщением
+            message_id: ID сообщения для удаления
+            stamp: Время создания (если None - используется текущее время)
+
+        Returns:
+            Добавленное сообщение
+        """
+        msg = RemoveMessage(time.time() if stamp is None else stamp.timestamp(), chat_id, message_id)
+        await self._redis.zadd(self._remove_key, {self._member(chat_id, message_id): msg.stamp})
+        _get_logger().debug(f"Inserted message: chat_id={chat_id}, message_id={message_id}")
+        return msg
+
+    async def get_remove_messages(self) -> List[RemoveMessage]:
+        """Все сообщения, ожидающие удаления (от старых к новым)."""
+        rows = await self._redis.zrange(self._remove_key, 0, -1, withscores=True)
+        return [self._to_remove_message(member, score) for member, score in rows]
+
+    async def get_old_messages(self, delta: int) -> List[RemoveMessage]:
+        """
+        Получить все сообщения старше указанного количества секунд (ZRANGEBYSCORE).
+
+        Args:
+            delta: Возраст сообщения в секундах
+
+        Returns:
+            Список сообщений, которые нужно удалить (от старых к новым)
+        """
+        threshold = datetime.now().timestamp() - delta
+        rows = await self._redis.zrangebyscore(self._remove_key, "-inf", f"({threshold}", withscores=True)
+        if rows:
+            _get_logger().debug(f"Found {len(rows)} old messages (delta={delta}s)")
+        return [self._to_remove_message(member, score) for member, score in rows]
+
+    async def delete_messages(self, *messages: RemoveMessage) -> None:
+        """
+        Удалить сообщения из sorted set после их удаления в Telegram.
+
+        Args:
+            *messages: Объекты RemoveMessage, которые нужно удалить из кэша
+        """
+        if not messages:
+            return
+        logger = _get_logger()
+        members = [self._member(msg.chat_id, msg.message_id) for msg in messages]
+        deleted_count = await self._redis.zrem(self._remove_key, *members)
+        if deleted_count > 0:
+            logger.info(f"Deleted {deleted_count} messages: {members}")
+        else:
+            logger.warning(f"No messages found to delete: {members}")
+
+    async def claim_messages(self, *messages: RemoveMessage) -> List[RemoveMessage]:
+        """
+        Забрать сообщения на удаление: ZREM каждого сообщения атомарен, поэтому
+        при общем кэше сообщение достается ровно одной реплике.
+
+        Args:
+            *messages: Сообщения, которые планировщик собирается удалить в Telegram
+
+        Returns:
+            Сообщения, которые эта реплика должна удалить
+        """
+        if not messages:
+            return []
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for msg in messages:
+                pipe.zrem(self._remove_key, self._member(msg.chat_id, msg.message_id))
+            removed = await pipe.execute()
+        return [msg for msg, count in zip(messages, removed) if count]
+
+    async def get_pin_messages(self) -> List[PinMessage]:
+        """Все закрепленные справочные сообщения."""
+        pins = await self._redis.hgetall(self._pins_key)
+        result = []
+        for member, lang in pins.items():
+            chat_id, message_id = self._parse_member(member)
+            result.append(PinMessage(chat_id, message_id, lang.decode() if isinstance(lang, bytes) else lang))
+        return result
+
+    async def add_pin_message(self, chat_id: int, message_id: int, lang: str) -> None:
+        """
+        Добавить закрепленное справочное сообщение (если его еще нет).
+
+        Args:
+            chat_id: ID чата с закрепленным сообщением
+            message_id: ID закрепленного сообщения
+            lang: Язык справки
+        """
+        logger = _get_logger()
+        if await self._redis.hsetnx(self._pins_key, self._member(chat_id, message_id), lang):
+            logger.info(f"Added pin message: chat_id={chat_id}, message_id={message_id}, lang={lang}")
+        else:
+            logger.debug(f"Pin message already exists: chat_id={chat_id}, message_id={message_id}")
+
+    async def remove_pin_message(self, chat_id: int, message_id: int) -> None:
+        """
+        Удалить закрепленное сообщение из списка.
+
+        Args:
+            chat_id: ID чата
+            message_id: ID сообщения для удаления из списка
+        """
+        logger = _get_logger()
+        if await self._redis.hdel(self._pins_key, self._member(chat_id, message_id)):
+            logger.info(f"Removed pin message: chat_id={chat_id}, message_id={message_id}")
+        else:
+            logger.warning(f"Pin message not found: chat_id={chat_id}, message_id={message_id}")
+
+    async def next_image_index(self, name: str, length: int) -> int:
+        """
+        Сдвинуть индекс ротации изображений на следующий элемент.
+
+        Счетчик увеличивается атомарным HINCRBY, поэтому реплики не теряют
+        и не повторяют шаги ротации.
+
+        Args:
+            name: Идентификатор цикла ротации
+            length: Количество изображений в цикле
+
+        Returns:
+            Новый индекс в списке изображений цикла
+        """
+        counter = await self._redis.hincrby(self._index_key, name, 1)
+        return counter % length
+
+    async def flush(self) -> None:
+        """Все изменения уже записаны в Redis."""
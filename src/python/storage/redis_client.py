@@ -0,0 +1,22 @@
+"""
+Общий клиент Redis процесса.
+
+Им пользуются и хранилище FSM, и кэш (cache.backend: redis), поэтому
+бот держит один пул соединений к Redis, а не по пулу на подсистему.
+"""
+from redis.asyncio import Redis, from_url
+
+from python.storage import config as config_module
+
+_client: Redis | None = None
+
+
+def get_client() -> Redis:
+    """Клиент Redis по адресу из redis_config (создается при первом обращении)."""
+    global _client
+    if _client is None:
+        _client = from_url(
+            config_module.config.redis_config.url,
+            decode_responses=config_module.config.redis_config.decode_responses
+        )
+    return _client
@@ -4,23 +4,6 @@ from python import logger as logger_module
 from python.storage import database
 
 
-async def init_database_module() -> None:
-    async with database.get_db_connection() as conn:
-        async with conn.cursor() as cur:
-            query = """
-                CREATE TABLE IF NOT EXISTS anecdotes (
-                    id SERIAL PRIMARY KEY,
-                    anecdote_id INTEGER NOT NULL UNIQUE,
-                    original TEXT,
-                    text TEXT,
-                    used BOOLEAN NOT NULL DEFAULT FALSE
-                )
-            """
-            logger_module.logger.trace_db(query)
-            await cur.execute(query)
-            await conn.commit()
-
-
 @dataclass(frozen=True)
 class AnecdoteItem:
     id: int
@@ -30,41 +13,104 @@ class AnecdoteItem:
     used: bool
 
 
-async def poll_anecdote() -> AnecdoteItem | None:
+async def poll_anecdotes(limit: int) -> list[AnecdoteItem]:
+    """
+    Забрать несколько неиспользованных анекдотов, пометив их использованными.
+
+    SKIP LOCKED позволяет нескольким экземплярам бота забирать анекдоты
+    одновременно, не получая одни и те же.
+
+    :param limit: Сколько анекдотов забрать
+    :return: Забранные анекдоты (меньше limit, если столько нет в буфере)
+    """
     async with database.get_db_connection() as conn:
         async with conn.cursor() as cur:
             query = """
                     UPDATE anecdotes
                     SET used = TRUE
-                    WHERE id = (SELECT id
-                                FROM anecdotes
-                                WHERE used IS FALSE
-                                ORDER BY id
-                                LIMIT 1 FOR UPDATE SKIP LOCKED)
+                    WHERE id IN (SELECT id
+                                 FROM anecdotes
+                                 WHERE NOT used
+                                 ORDER BY id
+                                 LIMIT %s FOR UPDATE SKIP LOCKED)
                     RETURNING id, anecdote_id, original, text, used; \
                     """
+            values = (limit,)
+            logger_module.logger.trace_db(query, values)
+            await cur.execute(query, values, prepare=True)
+            rows = await cur.fetchall()
+            await conn.commit()
+            return sorted(
+                (AnecdoteItem(id=row[0], anecdote_id=row[1], original=row[2], text=row[3], used=row[4])
+                 for row in rows),
+                key=lambda item: item.id
+            )
+
+
+async def release_anecdotes(ids: list[int]) -> None:
+    """
+    Вернуть забранные, но не показанные анекдоты в буфер.
+
+    :param ids: id анекдотов (PRIMARY KEY)
+    """
+    if not ids:
+        return
+    async with database.get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            query = "UPDATE anecdotes SET used = FALSE WHERE id = ANY(%s)"
+            values = (ids,)
+            logger_module.logger.trace_db(query, values)
+            await cur.execute(query, values)
+            await conn.commit()
+
+
+async def recycle_anecdotes(limit: int) -> int:
+    """
+    Вернуть в буфер случайные уже показанные анекдоты (когда новых на сайте не осталось).
+
+    :param limit: Сколько анекдотов вернуть
+    :return: Сколько анекдотов возвращено
+    """
+    async with database.get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            query = """
+                    UPDATE anecdotes
+                    SET used = FALSE
+                    WHERE id IN (SELECT id
+                                 FROM anecdotes
+                                 WHERE used
+                                 ORDER BY random()
+                                 LIMIT %s FOR UPDATE SKIP LOCKED); \
+                    """
+            values = (limit,)
+            logger_module.logger.trace_db(query, values)
+            await cur.execute(query, values)
+            await conn.commit()
+            return cur.rowcount
+
+
+async def get_anecdote_ids() -> list[int]:
+    """
+    Id всех сохраненных анекдотов на baneks.ru.
+
+    :return: Список anecdote_id
+    """
+    async with database.get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            query = "SELECT anecdote_id FROM anecdotes"
             logger_module.logger.trace_db(query)
             await cur.execute(query)
-            row = await cur.fetchone()
-            if row:
-                return AnecdoteItem(
-                    id=row[0],
-                    anecdote_id=row[1],
-                    original=row[2],
-                    text=row[3],
-                    used=row[4]
-                )
-            return None
+            return [row[0] for row in await cur.fetchall()]
 
 
 async def count_unused_anecdotes() -> int:
     async with database.get_db_connection() as conn:
         async with conn.cursor() as cur:
             query = """
-                SELECT COUNT(*) FROM anecdotes WHERE used IS FALSE;
+                SELECT COUNT(*) FROM anecdotes WHERE NOT used;
             """
             logger_module.logger.trace_db(query)
-            await cur.execute(query)
+            await cur.execute(query, prepare=True)
             (count,) = await cur.fetchone()
             return count
 
@@ -82,5 +128,5 @@ async def insert_anecdote(anecdote_id: int, original: str, text: str) -> None:
             """
             values = (anecdote_id, original, text)
             logger_module.logger.trace_db(query, values)
-            await cur.execute(query, values)
+            await cur.execute(query, values, prepare=True)
             await conn.commit()
@@ -2,48 +2,27 @@ from python import logger as logger_module
 from python.storage import database
 
 
-async def init_database_module() -> None:
-    async with database.get_db_connection() as conn:
-        async with conn.cursor() as cur:
-            query = """
-                CREATE TABLE IF NOT EXISTS hype_forms (
-                    id SERIAL PRIMARY KEY,
-                    userid BIGINT NOT NULL,
-                    username TEXT,
-                    phone TEXT,
-                    vcard TEXT,
-                    fullname TEXT NOT NULL,
-                    description TEXT
-                );
-            """
-            logger_module.logger.trace_db(query)
-            await cur.execute(query)
-            query = """
-                CREATE TABLE IF NOT EXISTS hype_photos (
-                    id SERIAL PRIMARY KEY,
-                    form_id INT NOT NULL REFERENCES hype_forms(id) ON DELETE CASCADE,
-                    media TEXT NOT NULL,
-                    mime TEXT NOT NULL
-                );
-            """
-            logger_module.logger.trace_db(query)
-            await cur.execute(query)
-            await conn.commit()
-
-
 async def insert_form(
         userid: int,
         username: str | None,
         phone: str | None,
         vcard: str | None,
         fullname: str,
-        photos_b64: list[str],
+        photo_refs: list[str],
         photo_mime: str,
-        video_b64: str | None,
+        video_ref: str | None,
         video_mime: str | None,
         description: str | None
 ) -> int:
-    async with database.get_db_connection() as conn:
+    """
+    Сохранить анкету вместе с фото и видео.
+
+    :param photo_refs: Ссылки на фото в хранилище медиафайлов (media_store)
+    :param video_ref: Ссылка на видео в хранилище медиафайлов или None
+    :return: id анкеты
+    """
+    # Анкета, все фото и commit отправляются пакетом (pipeline): ждем только id анкеты
+    async with database.get_db_pipeline() as conn:
         async with conn.cursor() as cur:
             query_form = """
                 INSERT INTO hype_forms (userid, username, phone, vcard, fullname, description)
@@ -60,15 +39,12 @@ async def insert_form(
                 INSERT INTO hype_photos (form_id, media, mime)
                 VALUES (%s, %s, %s)
             """
-            for photo_b64 in photos_b64:
-                values = (form_id, photo_b64, photo_mime)
-                logger_module.logger.trace_db(query_photo, values)
-                await cur.execute(query_photo, values)
-
-            if video_b64 and video_mime:
-                values = (form_id, video_b64, video_mime)
+            photo_values = [(form_id, photo_ref, photo_mime) for photo_ref in photo_refs]
+            if video_ref and video_mime:
+                photo_values.append((form_id, video_ref, video_mime))
+            for values in photo_values:
                 logger_module.logger.trace_db(query_photo, values)
-                await cur.execute(query_photo, values)
+            await cur.executemany(query_photo, photo_values)
 
             await conn.commit()
             return form_id
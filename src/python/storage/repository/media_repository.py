@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from python import logger as logger_module
+from python.storage import database
+
+
+@dataclass(frozen=True, slots=True)
+class MediaFile:
+    sha256: str
+    file_id: str
+    uploaded_at: datetime
+
+
+async def find_media(sha256: str) -> MediaFile | None:
+    """
+    Найти Telegram File ID по SHA-256 содержимого файла.
+
+    :param sha256: hex-дайджест содержимого файла
+    :return: MediaFile или None, если файл еще не загружался
+    """
+    async with database.get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            query = """
+                    SELECT sha256, file_id, uploaded_at
+                    FROM media_files
+                    WHERE sha256 = %s \
+                    """
+            values = (sha256,)
+            logger_module.logger.trace_db(query, values)
+            await cur.execute(query, values, prepare=True)
+            row = await cur.fetchone()
+            if row is None:
+                return None
+            return MediaFile(sha256=row[0], file_id=row[1], uploaded_at=row[2])
+
+
+async def save_media(sha256: str, file_id: str) -> None:
+    """
+    Сохранить (или заменить) Telegram File ID для содержимого файла.
+
+    :param sha256: hex-дайджест содержимого файла
+    :param file_id: File ID, полученный после загрузки
+    """
+    async with database.get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            query = """
+                    INSERT INTO media_files (sha256, file_id, uploaded_at)
+                    VALUES (%s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (sha256) DO UPDATE
+                        SET file_id     = EXCLUDED.file_id,
+                            uploaded_at = EXCLUDED.uploaded_at \
+                    """
+            values = (sha256, file_id)
+            logger_module.logger.trace_db(query, values)
+            await cur.execute(query, values, prepare=True)
+            await conn.commit()
+
+
+async def delete_media(sha256: str, file_id: str) -> bool:
+    """
+    Удалить File ID, если он все еще сохранен для этого содержимого.
+
+    Сравнение с file_id не дает затереть id, который другая реплика
+    успела загрузить заново.
+
+    :return: True, если запись была удалена
+    """
+    async with database.get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            query = "DELETE FROM media_files WHERE sha256 = %s AND file_id = %s"
+            values = (sha256, file_id)
+            logger_module.logger.trace_db(query, values)
+            await cur.execute(query, values)
+            deleted = cur.rowcount > 0
+            await conn.commit()
+            return deleted
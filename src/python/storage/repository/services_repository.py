@@ -1,30 +1,14 @@
-from dataclasses import dataclass
+import asyncio
+import math
+import re
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field, replace
 
 from python.storage import database
 from python import logger as logger_module
 
 
-async def init_database_module() -> None:
-    async with database.get_db_connection() as conn:
-        async with conn.cursor() as cur:
-            query = """
-                CREATE TABLE IF NOT EXISTS services (
-                    id SERIAL PRIMARY KEY,
-                    directory TEXT NOT NULL DEFAULT '/',
-                    name TEXT NOT NULL,
-                    cost NUMERIC(10, 2) NOT NULL,
-                    cost_per TEXT NOT NULL,
-                    description TEXT DEFAULT NULL,
-                    owner BIGINT NOT NULL,
-                    image TEXT DEFAULT NULL,
-                    status TEXT DEFAULT 'moderation'
-                )
-            """
-            logger_module.logger.trace_db(query)
-            await cur.execute(query)
-            await conn.commit()
-
-
 @dataclass(frozen=True)
 class ServiceItem:
     name: str
@@ -34,84 +18,347 @@ class ServiceItem:
     cost: float | None = None
     cost_per: str | None = None
     owner: int | None = None
+    # Заполняется только в результатах поиска
+    description: str | None = None
+
+
+# Через сколько секунд каталог перечитывается из БД (изменения, сделанные в обход бота)
+CATALOG_TTL_SECONDS = 5 * 60
+
+
+@dataclass(slots=True)
+class CatalogFolder:
+    """
+    Папка в дереве опубликованных услуг.
+
+    Attributes:
+        path: Полный путь папки ("/" для корня)
+        folders: Подпапки по имени
+        services: Услуги непосредственно в этой папке по id
+        count: Количество услуг в папке вместе со всеми подпапками
+        keys: Отсортированные ключи содержимого для постраничного вывода (строятся лениво)
+    """
+    path: str
+    folders: dict[str, "CatalogFolder"] = field(default_factory=dict)
+    services: dict[int, ServiceItem] = field(default_factory=dict)
+    count: int = 0
+    keys: list[tuple[int, str | int]] | None = field(default=None, repr=False)
+
+    def sorted_keys(self) -> list[tuple[int, str | int]]:
+        """Ключи содержимого: (0, имя) для подпапок, затем (1, id) для услуг."""
+        if self.keys is None:
+            self.keys = sorted([(0, name) for name in self.folders] + [(1, service_id) for service_id in self.services])
+        return self.keys
+
+    def item(self, key: tuple[int, str | int]) -> ServiceItem:
+        if key[0] == 0:
+            return ServiceItem(name=key[1], is_folder=True, folder_dest=self.folders[key[1]].path)
+        return self.services[key[1]]
+
+
+@dataclass(frozen=True)
+class ServicePage:
+    """
+    Страница содержимого папки каталога.
+
+    Attributes:
+        items: Подпапки и услуги на странице
+        start: Позиция первого элемента страницы в папке
+        total: Всего элементов в папке
+        prev_cursor: Курсор для перехода на предыдущую страницу (None на первой)
+        next_cursor: Курсор для перехода на следующую страницу (None на последней)
+    """
+    items: list[ServiceItem]
+    start: int
+    total: int
+    prev_cursor: str | None
+    next_cursor: str | None
+
+
+# Дерево опубликованных услуг и directory каждой услуги в нем (для перемещения при обновлении)
+_catalog: CatalogFolder | None = None
+_catalog_dirs: dict[int, str] = {}
+_catalog_loaded_at = 0.0
+_catalog_lock = asyncio.Lock()
+# Услуги, измененные, пока идет загрузка каталога (None - загрузки нет).
+# Снимок из БД может оказаться старше этих изменений, поэтому они применяются к нему повторно.
+_catalog_patches: list["Service"] | None = None
 
 
-async def get_service_list(path: str = "/") -> list[ServiceItem]:
+def _split_path(path: str) -> list[str]:
+    return [part for part in path.strip("/").split("/") if part]
+
+
+def _catalog_add(root: CatalogFolder, directory: str, item: ServiceItem) -> None:
+    folder = root
+    folder.count += 1
+    for part in _split_path(directory):
+        child = folder.folders.get(part)
+        if child is None:
+            child = CatalogFolder(path=f"{folder.path.rstrip('/')}/{part}")
+            folder.folders[part] = child
+            folder.keys = None
+        folder = child
+        folder.count += 1
+    folder.services[item.service_id] = item
+    folder.keys = None
+    _catalog_dirs[item.service_id] = directory
+
+
+def _catalog_remove(root: CatalogFolder, service_id: int) -> None:
+    directory = _catalog_dirs.pop(service_id, None)
+    if directory is None:
+        return
+    chain = [root]
+    for part in _split_path(directory):
+        chain.append(chain[-1].folders[part])
+    del chain[-1].services[service_id]
+    chain[-1].keys = None
+    for parent, folder in zip(reversed(chain[:-1]), reversed(chain)):
+        folder.count -= 1
+        # Папка существует, пока в ней есть хоть одна услуга
+        if folder.count == 0:
+            del parent.folders[folder.path.rsplit("/", 1)[1]]
+            parent.keys = None
+    root.count -= 1
+
+
+async def _load_catalog() -> CatalogFolder:
+    """Прочитать все опубликованные услуги и построить из них дерево папок."""
+    global _catalog_dirs
     async with database.get_db_connection() as conn:
         async with conn.cursor() as cur:
-            # Get all services directly in the current path
             query = """
-                SELECT id, name, cost, cost_per, owner
+                SELECT id, directory, name, cost, cost_per, owner
                 FROM services
-                WHERE directory = %s AND status = 'published'
+                WHERE status = 'published'
             """
-            values = (path,)
-            logger_module.logger.trace_db(query, values)
-            await cur.execute(query, values)
-            service_rows = await cur.fetchall()
-
-            services = [
-                ServiceItem(
-                    name=row[1],
-                    is_folder=False,
-                    service_id=row[0],
-                    cost=row[2],
-                    cost_per=row[3],
-                    owner=row[4]
-                )
-                for row in service_rows
-            ]
-
-            # Construct the LIKE pattern and regex pattern in Python
-            # This ensures psycopg handles placeholders correctly and avoids '%' issues
-            like_pattern = f"{path}%"  # No need to add '/' if we use `LIKE`
-            if path == "/":
-                regex_pattern_current_level = r'^/[^/]+(/.*)?$'
-            else:
-                # Escape path for regex if it contains special characters, though '/' is fine
-                escaped_path = path.replace('.', r'\.')  # Example: escape dot if your paths use it
-                regex_pattern_current_level = rf'^{escaped_path}/[^/]+(/.*)?$'
-
-            # Get all unique immediate subfolders
-            query = """
-                SELECT DISTINCT
-                    SPLIT_PART(
-                        SUBSTRING(s.directory, LENGTH(%s) + CASE WHEN %s = '/' THEN 1 ELSE 2 END),
-                        '/',
-                        1
-                    )
-                FROM services s
-                WHERE s.directory LIKE %s -- Use the Python-constructed pattern
-                  AND s.directory != %s
-                  AND s.directory ~ %s -- Use the Python-constructed regex pattern
-            """  # Parameters must match placeholders
-            values = (path, path, like_pattern, path, regex_pattern_current_level)
+            logger_module.logger.trace_db(query)
+            await cur.execute(query)
+            rows = await cur.fetchall()
 
-            logger_module.logger.trace_db(query, values)
+    _catalog_dirs = {}
+    root = CatalogFolder(path="/")
+    for row in rows:
+        _catalog_add(root, row[1], ServiceItem(
+            name=row[2],
+            is_folder=False,
+            service_id=row[0],
+            cost=float(row[3]),
+            cost_per=row[4],
+            owner=row[5]
+        ))
+    logger_module.logger.debug(f"Services catalog loaded: {root.count} services")
+    return root
 
-            await cur.execute(query, values)
 
-            folder_rows = await cur.fetchall()
+async def get_catalog() -> CatalogFolder:
+    """
+    Дерево опубликованных услуг.
+
+    Загружается из БД при первом обращении и раз в CATALOG_TTL_SECONDS,
+    а между загрузками поддерживается create_service и update_service_fields.
+    """
+    global _catalog, _catalog_loaded_at, _catalog_patches
+    if _catalog is not None and time.monotonic() - _catalog_loaded_at < CATALOG_TTL_SECONDS:
+        return _catalog
+    async with _catalog_lock:
+        if _catalog is None or time.monotonic() - _catalog_loaded_at >= CATALOG_TTL_SECONDS:
+            _catalog_patches = []
+            try:
+                catalog = await _load_catalog()
+                for service in _catalog_patches:
+                    _apply_patch(catalog, service)
+            finally:
+                _catalog_patches = None
+            _catalog = catalog
+            _catalog_loaded_at = time.monotonic()
+    return _catalog
+
+
+def _patch_catalog(service: "Service") -> None:
+    """Обновить услугу в загруженном каталоге (и в загружаемом, если идет загрузка) после записи в БД."""
+    if _catalog_patches is not None:
+        _catalog_patches.append(service)
+    if _catalog is not None:
+        _apply_patch(_catalog, service)
+
+
+def _apply_patch(root: CatalogFolder, service: "Service") -> None:
+    _catalog_remove(root, service.id)
+    if service.status == "published":
+        _catalog_add(root, service.directory, ServiceItem(
+            name=service.name,
+            is_folder=False,
+            service_id=service.id,
+            cost=service.cost,
+            cost_per=service.cost_per,
+            owner=service.owner
+        ))
+
+
+async def _find_folder(path: str) -> CatalogFolder | None:
+    folder = await get_catalog()
+    for part in _split_path(path):
+        folder = folder.folders.get(part)
+        if folder is None:
+            return None
+    return folder
+
+
+def _format_cursor(key: tuple[int, str | int], position: int) -> str:
+    # Курсор попадает в callback_data (до 64 байт вместе с путем), поэтому имя папки
+    # в него не кладется: для подпапки - ее позиция, для услуги - id
+    return f"f{position}" if key[0] == 0 else f"s{key[1]}"
+
 
-            folders = []
-            for row in folder_rows:
-                folder_name = row[0]
-                if folder_name:  # Filter NULL/empty
-                    # Construct the full path for the subfolder
-                    folder_dest = f"{path.rstrip('/')}/{folder_name}" if path != "/" else f"/{folder_name}"
-                    folders.append(
-                        ServiceItem(
-                            name=folder_name,
-                            is_folder=True,
-                            folder_dest=folder_dest
-                        )
-                    )
+def _cursor_bounds(keys: list[tuple[int, str | int]], cursor: str) -> tuple[int, int]:
+    """Позиции в keys перед граничным элементом курсора и после него (как bisect_left / bisect_right)."""
+    if cursor[0] == "f":
+        position = min(int(cursor[1:]), len(keys))
+        return position, min(position + 1, len(keys))
+    key = (1, int(cursor[1:]))
+    return bisect_left(keys, key), bisect_right(keys, key)
 
-            return folders + services
+
+async def get_service_page(path: str = "/", cursor: str = "", backward: bool = False, limit: int = 5) -> ServicePage:
+    """
+    Страница содержимого папки с keyset-курсором.
+
+    Курсор указывает на граничный элемент соседней страницы: для услуги это ее id,
+    и страница ищется бинарным поиском, так что добавление или удаление услуг
+    не сдвигает уже выданные курсоры; для подпапки - ее позиция в папке
+    (подпапки появляются и исчезают редко).
+
+    :param path: Путь папки
+    :param cursor: Ключ, после которого (или до которого при backward) начинается страница
+    :param backward: True - страница перед курсором, False - после курсора
+    :param limit: Размер страницы
+    :return: ServicePage
+    """
+    folder = await _find_folder(path)
+    if folder is None:
+        return ServicePage(items=[], start=0, total=0, prev_cursor=None, next_cursor=None)
+
+    keys = folder.sorted_keys()
+    if not cursor:
+        start = 0
+    elif backward:
+        start = max(_cursor_bounds(keys, cursor)[0] - limit, 0)
+    else:
+        start = _cursor_bounds(keys, cursor)[1]
+    page_keys = keys[start:start + limit]
+
+    return ServicePage(
+        items=[folder.item(key) for key in page_keys],
+        start=start,
+        total=len(keys),
+        prev_cursor=_format_cursor(page_keys[0], start) if start > 0 and page_keys else None,
+        next_cursor=_format_cursor(page_keys[-1], start + len(page_keys) - 1) if start + limit < len(keys) else None,
+    )
+
+
+# Слова запроса короче этого ищутся целиком, длиннее - по префиксу
+SEARCH_PREFIX_MIN_LENGTH = 3
+# Сколько слов запроса учитывается
+SEARCH_MAX_WORDS = 8
+
+# Полнотекстовое совпадение по name/description (со стеммингом и префиксами слов)
+# или похожее на запрос слово в name (опечатки). Оба условия обслуживаются
+# частичными GIN-индексами из миграции 0004_services_search.
+SEARCH_QUERY = """
+    SELECT id, name, cost, cost_per, owner, description
+    FROM services
+    WHERE status = 'published'
+      AND (search @@ to_tsquery('russian', %(tsquery)s) OR %(text)s <%% name)
+    ORDER BY ts_rank_cd(search, to_tsquery('russian', %(tsquery)s)) DESC,
+             word_similarity(%(text)s, name) DESC,
+             id
+    LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+
+@dataclass(frozen=True)
+class ServiceSearchPage:
+    """
+    Страница результатов поиска услуг.
+
+    Attributes:
+        items: Найденные услуги, от более релевантных к менее
+        offset: Позиция первого результата страницы
+        next_offset: Позиция следующей страницы (None на последней)
+    """
+    items: list[ServiceItem]
+    offset: int
+    next_offset: int | None
+
+
+def search_params(text: str, offset: int, limit: int) -> dict | None:
+    """
+    Параметры SEARCH_QUERY для текста запроса.
+
+    Слова запроса объединяются через И, длинные слова ищутся по префиксу,
+    чтобы результаты появлялись по мере набора (inline-режим).
+
+    :return: Параметры запроса или None, если в тексте нет ни одного слова
+    """
+    words = re.findall(r"[^\W_]+", text.lower())[:SEARCH_MAX_WORDS]
+    if not words:
+        return None
+    tsquery = " & ".join(
+        f"{word}:*" if len(word) >= SEARCH_PREFIX_MIN_LENGTH else word
+        for word in words
+    )
+    # Лишний результат показывает, есть ли следующая страница
+    return {"tsquery": tsquery, "text": " ".join(words), "limit": limit + 1, "offset": offset}
+
+
+async def search_services(text: str, offset: int = 0, limit: int = 10) -> ServiceSearchPage:
+    """
+    Найти опубликованные услуги по названию и описанию.
+
+    :param text: Текст запроса пользователя
+    :param offset: Сколько результатов пропустить (страница)
+    :param limit: Размер страницы
+    :return: Страница результатов, отсортированных по релевантности
+    """
+    params = search_params(text, offset, limit)
+    if params is None:
+        return ServiceSearchPage(items=[], offset=offset, next_offset=None)
+
+    async with database.get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            logger_module.logger.trace_db(SEARCH_QUERY, params)
+            await cur.execute(SEARCH_QUERY, params, prepare=True)
+            rows = await cur.fetchall()
+
+    items = [
+        ServiceItem(
+            name=row[1],
+            is_folder=False,
+            service_id=row[0],
+            cost=float(row[2]),
+            cost_per=row[3],
+            owner=row[4],
+            description=row[5]
+        )
+        for row in rows[:limit]
+    ]
+    return ServiceSearchPage(
+        items=items,
+        offset=offset,
+        next_offset=offset + limit if len(rows) > limit else None
+    )
 
 
 @dataclass(frozen=True)
 class Service:
+    """
+    Услуга.
+
+    image - ссылка на фото в хранилище медиафайлов. Функции чтения загружают ее
+    только с with_image=True, иначе image = None.
+    """
     id: int | None
     directory: str
     name: str
@@ -123,33 +370,52 @@ class Service:
     status: str
 
 
-async def find_service(service_id: int) -> Service | None:
+# Колонки, которые читаются всегда; image добавляется в конец только по запросу
+SERVICE_COLUMNS = "id, directory, name, cost, cost_per, description, owner, status"
+
+
+def _service_columns(with_image: bool) -> str:
+    return SERVICE_COLUMNS + ", image" if with_image else SERVICE_COLUMNS
+
+
+def _service_from_row(row: tuple, with_image: bool) -> Service:
+    return Service(
+        id=row[0],
+        directory=row[1],
+        name=row[2],
+        cost=float(row[3]),
+        cost_per=row[4],
+        description=row[5],
+        owner=row[6],
+        image=row[8] if with_image else None,
+        status=row[7],
+    )
+
+
+async def find_service(service_id: int, with_image: bool = False) -> Service | None:
+    """
+    Найти услугу по id.
+
+    :param service_id: id услуги
+    :param with_image: Загрузить ли ссылку на фото (иначе Service.image = None)
+    :return: Service или None, если услуга не найдена
+    """
     async with database.get_db_connection() as conn:
         async with conn.cursor() as cur:
-            query = """
-                SELECT id, directory, name, cost, cost_per, description, owner, image, status
+            query = f"""
+                SELECT {_service_columns(with_image)}
                 FROM services
                 WHERE id = %s
             """
             values = (service_id,)
             logger_module.logger.trace_db(query, values)
-            await cur.execute(query, values)
+            await cur.execute(query, values, prepare=True)
             row = await cur.fetchone()
 
             if row is None:
                 return None
 
-            return Service(
-                id=row[0],
-                directory=row[1],
-                name=row[2],
-                cost=float(row[3]),
-                cost_per=row[4],
-                description=row[5],
-                owner=row[6],
-                image=row[7],
-                status=row[8],
-            )
+            return _service_from_row(row, with_image)
 
 
 async def create_service(service: Service) -> int | None:
@@ -176,7 +442,10 @@ async def create_service(service: Service) -> int | None:
             await cur.execute(query, values)
             new_id_row = await cur.fetchone()
             await conn.commit()
-            return new_id_row[0] if new_id_row else None
+            if new_id_row is None:
+                return None
+            _patch_catalog(replace(service, id=new_id_row[0]))
+            return new_id_row[0]
 
 
 ALLOWED_FIELDS = {
@@ -191,10 +460,19 @@ ALLOWED_FIELDS = {
 }
 
 
-async def update_service_fields(service_id: int, **fields) -> Service | None:
+async def update_service_fields(service_id: int, with_image: bool = False, **fields) -> Service | None:
+    """
+    Обновить поля услуги.
+
+    :param service_id: id услуги
+    :param with_image: Вернуть ли ссылку на фото; при обновлении image она возвращается всегда
+    :param fields: Новые значения полей из ALLOWED_FIELDS
+    :return: Обновленная Service или None, если услуга не найдена
+    """
     updates = {k: v for k, v in fields.items() if k in ALLOWED_FIELDS}
     if not updates:
         return None
+    with_image = with_image or "image" in updates
 
     set_clause = ", ".join([f"{key} = %s" for key in updates.keys()])
     values = list(updates.values())
@@ -204,27 +482,18 @@ async def update_service_fields(service_id: int, **fields) -> Service | None:
         UPDATE services
         SET {set_clause}
         WHERE id = %s
-        RETURNING id, directory, name, cost, cost_per,
-                  description, owner, image, status
+        RETURNING {_service_columns(with_image)}
     """
     logger_module.logger.trace_db(query, values)
 
     async with database.get_db_connection() as conn:
         async with conn.cursor() as cur:
-            await cur.execute(query, values)
+            await cur.execute(query, values, prepare=False)
             row = await cur.fetchone()
             await conn.commit()
 
             if row:
-                return Service(
-                    id=row[0],
-                    directory=row[1],
-                    name=row[2],
-                    cost=float(row[3]),
-                    cost_per=row[4],
-                    description=row[5],
-                    owner=row[6],
-                    image=row[7],
-                    status=row[8]
-                )
+                service = _service_from_row(row, with_image)
+                _patch_catalog(service)
+                return service
             return None
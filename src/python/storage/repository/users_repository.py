@@ -1,14 +1,25 @@
 import asyncio
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
+from itertools import islice
 from typing import Optional, FrozenSet
 
+import psycopg
+
 from python.storage import database
 from python import logger as logger_module
 
 
 @dataclass(frozen=True)
 class Resident:
+    """
+    Заявка резидента.
+
+    image - ссылка на фото подтверждения в хранилище медиафайлов. Функции чтения
+    загружают ее только с with_image=True, иначе image = None.
+    """
     id: int
     user_id: int
     username: str
@@ -26,59 +37,6 @@ class Resident:
     lang: Optional[str]
 
 
-async def init_database_module() -> None:
-    async with database.get_db_connection() as conn:
-        async with conn.cursor() as cur:
-            query = """
-                    CREATE TABLE IF NOT EXISTS users
-                    (
-                        id       SERIAL PRIMARY KEY,
-                        user_id  BIGINT NOT NULL UNIQUE,
-                        username TEXT   NOT NULL,
-                        fullname TEXT   NOT NULL,
-                        lang     TEXT
-                    ) \
-                    """
-            logger_module.logger.trace_db(query)
-            await cur.execute(query)
-            query = """
-                    CREATE TABLE IF NOT EXISTS residents
-                    (
-                        id                    SERIAL PRIMARY KEY,
-                        user_id               BIGINT    NOT NULL UNIQUE,
-                        username              TEXT,
-                        fullname              TEXT      NOT NULL,
-                        name                  TEXT      NOT NULL,
-                        surname               TEXT      NOT NULL,
-                        room                  INTEGER,
-                        image                 TEXT,
-                        status                TEXT               DEFAULT 'moderation',
-                        processed_by          BIGINT,
-                        processed_by_fullname TEXT,
-                        processed_by_username TEXT,
-                        refuse_reason         TEXT,
-                        created_at            TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                        lang                  TEXT
-                    ) \
-                    """
-            logger_module.logger.trace_db(query)
-            await cur.execute(query)
-            query = """
-                    CREATE TABLE IF NOT EXISTS requests
-                    (
-                        id           SERIAL PRIMARY KEY,
-                        user_id      BIGINT    NOT NULL UNIQUE,
-                        created_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                        processed    BOOLEAN   NOT NULL DEFAULT FALSE,
-                        greeting_msg INTEGER,
-                        lang         TEXT
-                    ) \
-                    """
-            logger_module.logger.trace_db(query)
-            await cur.execute(query)
-            await conn.commit()
-
-
 @dataclass(frozen=True, slots=True)
 class UserRecord:
     user_id: int
@@ -87,28 +45,181 @@ class UserRecord:
     lang: Optional[str]
 
 
+# Сколько пользователей записывать одним запросом
+USER_BATCH_SIZE = 500
+# Как часто записывать накопленных пользователей, даже если пачка не набралась
+USER_FLUSH_SECONDS = 0.5
+# Пауза перед повторной записью после ошибки БД
+USER_RETRY_SECONDS = 5
+# Сколько пользователей может ждать записи, прежде чем check_user начнет ждать
+USER_QUEUE_LIMIT = 10_000
+
+# Сколько последних сохраненных пользователей помнить, чтобы не писать неизменившиеся данные
+USER_CACHE_SIZE = 50_000
+# Через сколько секунд пользователь записывается заново, даже если данные не менялись
+USER_CACHE_TTL = 6 * 60 * 60
+
+# user_id -> последняя версия записи, ожидающая сохранения
+_pending_users: dict[int, UserRecord] = {}
+# user_id -> (хэш последней сохраненной записи, time.monotonic() сохранения), от старых к новым
+_saved_users: OrderedDict[int, tuple[int, float]] = OrderedDict()
+_cache_hits = 0
+_cache_misses = 0
+_batch_full = asyncio.Event()
+_has_room = asyncio.Event()
+_has_room.set()
+_flush_lock = asyncio.Lock()
+
+
+@dataclass(frozen=True, slots=True)
+class UserCacheStats:
+    hits: int
+    misses: int
+    size: int
+
+
+def get_user_cache_stats() -> UserCacheStats:
+    """Счетчики кэша сохраненных пользователей: hits - пропущенные записи в БД."""
+    return UserCacheStats(hits=_cache_hits, misses=_cache_misses, size=len(_saved_users))
+
+
+def _is_saved(user: UserRecord) -> bool:
+    """Проверить, что в БД уже лежат именно эти данные пользователя (по хэшу записи)."""
+    saved = _saved_users.get(user.user_id)
+    if saved is None or saved[0] != hash(user) or time.monotonic() - saved[1] > USER_CACHE_TTL:
+        return False
+    _saved_users.move_to_end(user.user_id)
+    return True
+
+
+def _mark_saved(users: list[UserRecord]) -> None:
+    """Запомнить хэши сохраненных записей, вытесняя давно не встречавшихся пользователей."""
+    now = time.monotonic()
+    for user in users:
+        _saved_users[user.user_id] = (hash(user), now)
+        _saved_users.move_to_end(user.user_id)
+    while len(_saved_users) > USER_CACHE_SIZE:
+        _saved_users.popitem(last=False)
+
+
 async def check_user(user: UserRecord):
-    async def _task():
-        async with database.get_db_connection() as conn:
-            async with conn.cursor() as cur:
-                query = """
-                        INSERT INTO users (user_id, username, fullname, lang)
-                        VALUES (%s, %s, %s, %s)
-                        ON CONFLICT (user_id) DO UPDATE
-                            SET username = EXCLUDED.username,
-                                fullname = EXCLUDED.fullname,
-                                lang     = EXCLUDED.lang \
-                        """
-                values = (user.user_id, user.username, user.fullname, user.lang)
-                logger_module.logger.trace_db(query, values)
-                await cur.execute(
-                    query,
-                    values
-                )
-                await conn.commit()
-
-    # Запускаем без await — фоново
-    asyncio.create_task(_task())
+    """
+    Поставить пользователя в очередь на сохранение в таблицу users.
+
+    Если с последнего сохранения данные пользователя не менялись,
+    БД не трогается. Записи копятся в памяти и сохраняются фоновой задачей user_writer()
+    пачками по USER_BATCH_SIZE. Повторные записи одного пользователя
+    до сохранения схлопываются в последнюю. Если очередь переполнена
+    (БД не успевает или недоступна), вызов ждет, пока освободится место.
+
+    :param user: Данные пользователя из Telegram
+    """
+    global _cache_hits, _cache_misses
+    if _is_saved(user):
+        _cache_hits += 1
+        return
+    _cache_misses += 1
+
+    while len(_pending_users) >= USER_QUEUE_LIMIT and user.user_id not in _pending_users:
+        _has_room.clear()
+        await _has_room.wait()
+    _pending_users[user.user_id] = user
+    if len(_pending_users) >= USER_BATCH_SIZE:
+        _batch_full.set()
+
+
+async def _upsert_users(users: list[UserRecord]) -> None:
+    """Сохранить пачку пользователей одним многострочным INSERT ... ON CONFLICT."""
+    async with database.get_db_connection() as conn:
+        async with conn.cursor() as cur:
+            query = f"""
+                    INSERT INTO users (user_id, username, fullname, lang)
+                    VALUES {", ".join(["(%s, %s, %s, %s)"] * len(users))}
+                    ON CONFLICT (user_id) DO UPDATE
+                        SET username = EXCLUDED.username,
+                            fullname = EXCLUDED.fullname,
+                            lang     = EXCLUDED.lang \
+                    """
+            # users.username - NOT NULL, а у пользователя Telegram username может не быть
+            values = [
+                value for user in users for value in (user.user_id, user.username or "", user.fullname, user.lang)
+            ]
+            logger_module.logger.trace_db(query, values)
+            await cur.execute(query, values, prepare=False)
+            await conn.commit()
+
+
+def _requeue(users: list[UserRecord]) -> None:
+    # Более новые версии записей, пришедшие во время запроса, не затираем
+    for user in users:
+        _pending_users.setdefault(user.user_id, user)
+
+
+async def _upsert_users_one_by_one(users: list[UserRecord]) -> list[UserRecord]:
+    """
+    Сохранить пачку по одной записи, пропуская записи, которые БД отвергает.
+
+    :param users: Пачка, которую БД не приняла целиком из-за данных
+    :return: Сохраненные записи
+    """
+    saved = []
+    for index, user in enumerate(users):
+        try:
+            await _upsert_users([user])
+        except (psycopg.DataError, psycopg.IntegrityError) as e:
+            logger_module.logger.error(f"Users writer: dropped user {user.user_id}, rejected by database", e)
+        except Exception:
+            _requeue(users[index:])
+            _mark_saved(saved)
+            raise
+        else:
+            saved.append(user)
+    return saved
+
+
+async def flush_users() -> None:
+    """
+    Сохранить всех пользователей из очереди.
+
+    Вызывается фоновой задачей и при остановке бота.
+    При ошибке записи пачка возвращается в очередь; если БД отвергла данные
+    пачки, она сохраняется по одной записи, а отвергнутые записи отбрасываются.
+    """
+    async with _flush_lock:
+        while _pending_users:
+            keys = list(islice(_pending_users, USER_BATCH_SIZE))
+            batch = [_pending_users.pop(key) for key in keys]
+            if len(_pending_users) < USER_BATCH_SIZE:
+                _batch_full.clear()
+            _has_room.set()
+            try:
+                await _upsert_users(batch)
+            except (psycopg.DataError, psycopg.IntegrityError) as e:
+                logger_module.logger.warning(
+                    f"Users writer: batch of {len(batch)} rejected by database ({e}), saving one by one")
+                batch = await _upsert_users_one_by_one(batch)
+            except Exception:
+                _requeue(batch)
+                raise
+            _mark_saved(batch)
+            logger_module.logger.trace(f"Users writer: saved {len(batch)} user(s)")
+
+
+async def user_writer() -> None:
+    """
+    Фоновая задача: сохраняет пользователей раз в USER_FLUSH_SECONDS
+    или сразу, как только набирается пачка из USER_BATCH_SIZE записей.
+    """
+    while True:
+        try:
+            await asyncio.wait_for(_batch_full.wait(), USER_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await flush_users()
+        except Exception as e:
+            logger_module.logger.error(f"Failed to save users, {len(_pending_users)} waiting", e)
+            await asyncio.sleep(USER_RETRY_SECONDS)
 
 
 async def add_resident(
@@ -133,7 +244,7 @@ async def add_resident(
     :param surname: Фамилия (из анкеты)
     :param room: Комната (может быть None)
     :param status: Статус (по умолчанию 'waiting')
-    :param image: Изображение подтверждения в base64 (JPG)
+    :param image: Ссылка на фото подтверждения в хранилище медиафайлов (media_store)
     :param lang: Код языка пользователя
     :return: id записи в таблице residents
     """
@@ -152,31 +263,48 @@ async def add_resident(
             return row[0]
 
 
-async def get_resident_by_id(user_id: int) -> Resident | None:
+# Колонки, которые читаются всегда; image добавляется в конец только по запросу
+RESIDENT_COLUMNS = """id, user_id, username, fullname, name, surname, room, status,
+                  processed_by, processed_by_fullname, processed_by_username,
+                  refuse_reason, created_at, lang"""
+
+
+def _resident_columns(with_image: bool) -> str:
+    return RESIDENT_COLUMNS + ", image" if with_image else RESIDENT_COLUMNS
+
+
+def _resident_from_row(row: tuple, with_image: bool) -> Resident:
+    return Resident(
+        id=row[0],
+        user_id=row[1],
+        username=row[2],
+        fullname=row[3],
+        name=row[4],
+        surname=row[5],
+        room=row[6],
+        status=row[7],
+        processed_by=row[8],
+        processed_by_fullname=row[9],
+        processed_by_username=row[10],
+        refuse_reason=row[11],
+        created_at=row[12],
+        image=row[14] if with_image else None,
+        lang=row[13]
+    )
+
+
+async def get_resident_by_id(user_id: int, with_image: bool = False) -> Resident | None:
     """
     Возвращает пользователя из таблицы users по его id (PRIMARY KEY).
 
     :param user_id: id из таблицы users (не Telegram user_id!)
+    :param with_image: Загрузить ли ссылку на фото (иначе Resident.image = None)
     :return: User или None, если не найден
     """
     async with database.get_db_connection() as conn:
         async with conn.cursor() as cur:
-            query = """
-                    SELECT id,
-                           user_id,
-                           username,
-                           fullname,
-                           name,
-                           surname,
-                           room,
-                           status,
-                           processed_by,
-                           processed_by_fullname,
-                           processed_by_username,
-                           refuse_reason,
-                           created_at,
-                           image,
-                           lang
+            query = f"""
+                    SELECT {_resident_columns(with_image)}
                     FROM residents
                     WHERE id = %s \
                     """
@@ -184,30 +312,15 @@ async def get_resident_by_id(user_id: int) -> Resident | None:
             logger_module.logger.trace_db(query, values)
             await cur.execute(
                 query,
-                values
+                values,
+                prepare=True
             )
             row = await cur.fetchone()
 
             if not row:
                 return None
 
-            return Resident(
-                id=row[0],
-                user_id=row[1],
-                username=row[2],
-                fullname=row[3],
-                name=row[4],
-                surname=row[5],
-                room=row[6],
-                status=row[7],
-                processed_by=row[8],
-                processed_by_fullname=row[9],
-                processed_by_username=row[10],
-                refuse_reason=row[11],
-                created_at=row[12],
-                image=row[13],
-                lang=row[14]
-            )
+            return _resident_from_row(row, with_image)
 
 
 ALLOWED_USER_FIELDS = {
@@ -217,15 +330,17 @@ ALLOWED_USER_FIELDS = {
 }
 
 
-async def update_resident_fields(resident_id: int, **fields) -> Optional[Resident]:
+async def update_resident_fields(resident_id: int, with_image: bool = False, **fields) -> Optional[Resident]:
     """
     Обновляет указанные поля пользователя в таблице users.
-    Возвращает объект User после обновления или None, если запись не найдена
+    Возвращает объект User после обновления или None, если запись не найдена.
+    Ссылка на фото возвращается только с with_image=True или при обновлении image.
     """
     # Оставляем только разрешённые поля
     updates = {k: v for k, v in fields.items() if k in ALLOWED_USER_FIELDS}
     if not updates:
         return None
+    with_image = with_image or "image" in updates
 
     # Формируем SET часть SQL
     set_clause = ", ".join([f"{key} = %s" for key in updates.keys()])
@@ -236,37 +351,19 @@ async def update_resident_fields(resident_id: int, **fields) -> Optional[Residen
         UPDATE residents
         SET {set_clause}
         WHERE id = %s
-        RETURNING id, user_id, username, fullname, name, surname, room, status,
-                  processed_by, processed_by_fullname, processed_by_username,
-                  refuse_reason, created_at, image, lang
+        RETURNING {_resident_columns(with_image)}
     """
 
     logger_module.logger.trace_db(query, values)
 
     async with database.get_db_connection() as conn:
         async with conn.cursor() as cur:
-            await cur.execute(query, values)
+            await cur.execute(query, values, prepare=False)
             row = await cur.fetchone()
             await conn.commit()
 
             if row:
-                return Resident(
-                    id=row[0],
-                    user_id=row[1],
-                    username=row[2],
-                    fullname=row[3],
-                    name=row[4],
-                    surname=row[5],
-                    room=row[6],
-                    status=row[7],
-                    processed_by=row[8],
-                    processed_by_fullname=row[9],
-                    processed_by_username=row[10],
-                    refuse_reason=row[11],
-                    created_at=row[12],
-                    image=row[13],
-                    lang=row[14]
-                )
+                return _resident_from_row(row, with_image)
             return None
 
 
@@ -312,14 +409,15 @@ async def create_or_replace_request(user_id: int, greeting_msg: int, lang: str)
     """
     Создаёт запись в таблице requests для указанного user_id.
     Если запись уже есть — удаляет её и вставляет заново с дефолтными значениями.
+    Оба запроса и commit отправляются одним пакетом (pipeline).
     """
-    async with database.get_db_connection() as conn:
+    async with database.get_db_pipeline() as conn:
         async with conn.cursor() as cur:
             # Сначала удаляем, если есть
             delete_query = "DELETE FROM requests WHERE user_id = %s"
             delete_values = (user_id,)
             logger_module.logger.trace_db(delete_query, delete_values)
-            await cur.execute(delete_query, delete_values)
+            await cur.execute(delete_query, delete_values, prepare=True)
 
             # Теперь вставляем новую запись
             insert_query = """
@@ -328,7 +426,7 @@ async def create_or_replace_request(user_id: int, greeting_msg: int, lang: str)
                            """
             insert_values = (user_id, greeting_msg, lang)
             logger_module.logger.trace_db(insert_query, insert_values)
-            await cur.execute(insert_query, insert_values)
+            await cur.execute(insert_query, insert_values, prepare=True)
             await conn.commit()
 
 
@@ -350,7 +448,7 @@ async def pop_unprocessed_requests_older_than(hours: int) -> FrozenSet[RequestIn
             query = """
                     UPDATE requests
                     SET processed = TRUE
-                    WHERE processed = FALSE
+                    WHERE NOT processed
                       AND created_at <= NOW() - (%s * INTERVAL '1 hour')
                     RETURNING user_id, created_at, greeting_msg, lang \
                     """
@@ -380,7 +478,7 @@ async def mark_request_processed(user_id: int) -> int:
                     """
             values = (user_id,)
             logger_module.logger.trace_db(query, values)
-            await cur.execute(query, values)
+            await cur.execute(query, values, prepare=True)
             updated_count = cur.rowcount
             await conn.commit()
             return updated_count
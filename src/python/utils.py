@@ -1,5 +1,4 @@
 import asyncio
-import base64
 import os
 import traceback
 from asyncio import sleep
@@ -13,9 +12,12 @@ from aiogram.types import (ChatMember, Message, ReactionTypeEmoji, CallbackQuery
                            ChatMemberLeft, ChatMemberBanned)
 from aiogram.filters import Command, CommandStart, CommandObject, BaseFilter
 from python import logger as logger_module
-from python.storage import config as config_module
+from python.storage import config as config_module, media_store
 from python.storage.strings import get_string
 
+# Размер части при потоковом скачивании файлов
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 def get_week_number(current_date: datetime) -> int:
     """
@@ -394,9 +396,10 @@ async def download_photos(
         progress_callback: Optional[Callable[[int, int], Awaitable[None]]] = None
 ) -> List[str]:
     """
-    Скачивает все фото или видео из списка file_ids через nginx и возвращает список Base64-строк.
+    Скачивает все фото или видео из списка file_ids через nginx в хранилище медиафайлов
+    и возвращает список ссылок на файлы (см. media_store).
     """
-    base64_photos = []
+    refs = []
     if progress_callback:
         await progress_callback(0, len(file_ids))
     async with aiohttp.ClientSession() as session:
@@ -412,15 +415,14 @@ async def download_photos(
                     # Формируем URL для скачивания
                     download_url = f"{config_module.config.telegram.server}/file/{relative_path}"
 
-                    # Скачиваем файл
+                    # Скачиваем файл сразу в хранилище, не собирая его в памяти
                     async with session.get(download_url) as response:
                         if response.status != 200:
                             raise Exception(f"Ошибка скачивания: {response.status}, URL: {download_url}")
-                        file_bytes = await response.read()
-
-                    # Преобразуем в Base64
-                    photo_b64 = base64.b64encode(file_bytes).decode('utf-8')
-                    base64_photos.append(photo_b64)
+                        async with media_store.BlobWriter() as writer:
+                            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                                await writer.write(chunk)
+                    refs.append(writer.ref)
 
                     break
                 except Exception as e:
@@ -433,7 +435,7 @@ async def download_photos(
 
             if progress_callback:
                 await progress_callback(i + 1, len(file_ids))
-    return base64_photos
+    return refs
 
 
 async def download_video(
@@ -442,7 +444,8 @@ async def download_video(
         progress_callback: Optional[Callable[[int], Awaitable[None]]] = None
 ) -> str | None:
     """
-    Downloads a video through nginx (local Telegram Bot API) and returns Base64 encoded data.
+    Downloads a video through nginx (local Telegram Bot API) into the media store.
+    The file is streamed to disk chunk by chunk and never held in memory as a whole.
     Calls the progress_callback with the download percentage (only on change).
 
     Args:
@@ -451,7 +454,7 @@ async def download_video(
         progress_callback: Optional callback function to report download progress (percentage).
 
     Returns:
-        Base64 encoded string of the video or None if file_id is invalid.
+        Media store reference of the video or None if file_id is invalid.
     """
     if not file_id:
         return None
@@ -468,41 +471,35 @@ async def download_video(
 
     # Download file with progress tracking
     async with aiohttp.ClientSession() as session:
-        async with session.get(download_url) as response:
-            if response.status != 200:
-                raise Exception(f"Download error: {response.status}, URL: {download_url}")
+        for att in range(10):
+            try:
+                async with session.get(download_url) as response:
+                    if response.status != 200:
+                        raise Exception(f"Download error: {response.status}, URL: {download_url}")
 
-            for att in range(10):
-                try:
                     # Get total size of the file (if available)
                     total_size = int(response.headers.get('Content-Length', 0))
-                    downloaded = 0
                     last_reported_percentage = -1  # Track last reported percentage to avoid duplicates
-                    data_bytes = bytearray()
 
                     # Read response in chunks to track progress
-                    chunk_size = 1024 * 1024  # 1MB chunks
-                    async for chunk in response.content.iter_chunked(chunk_size):
-                        data_bytes.extend(chunk)
-                        downloaded += len(chunk)
-
-                        # Calculate and report progress if total_size is known
-                        if total_size > 0 and progress_callback:
-                            percentage = int((downloaded / total_size) * 100)
-                            if percentage != last_reported_percentage:
-                                last_reported_percentage = percentage
-                                await progress_callback(percentage)
-                    break
-                except Exception as e:
-                    if att < 10:
-                        logger_module.logger.warning(f"Downloading attempt {att}")
-                        await asyncio.sleep(0.2)
-                        continue
-                    else:
-                        raise IOError("Failed to download after 10 attempts") from e
-
-    # Encode to Base64
-    return base64.b64encode(data_bytes).decode("utf-8")
+                    async with media_store.BlobWriter() as writer:
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            await writer.write(chunk)
+
+                            # Calculate and report progress if total_size is known
+                            if total_size > 0 and progress_callback:
+                                percentage = int((writer.size / total_size) * 100)
+                                if percentage != last_reported_percentage:
+                                    last_reported_percentage = percentage
+                                    await progress_callback(percentage)
+                return writer.ref
+            except Exception as e:
+                if att < 9:
+                    logger_module.logger.warning(f"Downloading attempt {att}")
+                    await asyncio.sleep(0.2)
+                    continue
+                else:
+                    raise IOError("Failed to download after 10 attempts") from e
 
 
 def list_files_recursively(directory_path):